@@ -0,0 +1,98 @@
+'''
+A local Arrow Flight server that speaks the subset of the Dremio Flight protocol used by
+`DremioReader(transport='flight')`: basic auth handshake returning a bearer token,
+`GetFlightInfo` with the sql text as the command, and `DoGet` on the returned ticket.
+
+Every query returns the same table, which is enough to measure transport throughput.
+
+Usage:
+    python benchmarks/dremio_flight_server.py --rows 1000000 --port 32010
+'''
+import argparse
+import base64
+import secrets
+
+import numpy as np
+import pyarrow as pa
+from pyarrow import flight
+
+class _BasicAuthMiddleware(flight.ServerMiddleware):
+    def __init__(self,bearer_token) -> None:
+        self.bearer_token = bearer_token
+
+    def sending_headers(self):
+        return {'authorization':f'Bearer {self.bearer_token}'}
+
+class _BasicAuthMiddlewareFactory(flight.ServerMiddlewareFactory):
+    '''
+    Accept any `Basic user:token` whose password matches, answer with a bearer token, and
+    require that bearer token on every later call.
+    '''
+    def __init__(self,password) -> None:
+        self.password       = password
+        self.bearer_tokens  = set()
+
+    def start_call(self,info,headers):
+        auth_header = next(iter(headers.get('authorization',[])),'')
+        if auth_header.startswith('Basic '):
+            _,_,password = base64.b64decode(auth_header[6:]).decode().partition(':')
+            if password != self.password:
+                raise flight.FlightUnauthenticatedError('invalid username or token')
+            bearer_token = secrets.token_hex(16)
+            self.bearer_tokens.add(bearer_token)
+            return _BasicAuthMiddleware(bearer_token)
+        if auth_header.startswith('Bearer ') and auth_header[7:] in self.bearer_tokens:
+            return None
+        raise flight.FlightUnauthenticatedError('no valid bearer token')
+
+class _NoopAuthHandler(flight.ServerAuthHandler):
+    '''
+    The handshake itself is a no-op, authentication happens in the header middleware.
+    '''
+    def authenticate(self,outgoing,incoming):
+        pass
+
+    def is_valid(self,token):
+        return ''
+
+class DremioFlightTestServer(flight.FlightServerBase):
+    def __init__(self,table,location='grpc+tcp://localhost:0',password='token',**kwargs) -> None:
+        super().__init__(
+            location
+            ,auth_handler   = _NoopAuthHandler()
+            ,middleware     = {'auth':_BasicAuthMiddlewareFactory(password)}
+            ,**kwargs
+        )
+        self.table = table
+
+    def get_flight_info(self,context,descriptor):
+        endpoint = flight.FlightEndpoint(descriptor.command,[])
+        return flight.FlightInfo(self.table.schema,descriptor,[endpoint],self.table.num_rows,self.table.nbytes)
+
+    def do_get(self,context,ticket):
+        return flight.RecordBatchStream(self.table)
+
+def make_sample_table(rows) -> pa.Table:
+    rng = np.random.default_rng(0)
+    return pa.table({
+        'id'            : pa.array(np.arange(rows,dtype='int64'))
+        ,'amount'       : pa.array(rng.random(rows)*1000)
+        ,'quantity'     : pa.array(rng.integers(0,100,rows,dtype='int64'))
+        ,'region'       : pa.array(rng.choice(['east','west','north','south'],rows))
+        ,'event_time'   : pa.array(np.datetime64('2023-01-01') + rng.integers(0,10**6,rows).astype('timedelta64[s]'))
+    })
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=1000000)
+    parser.add_argument('--port',type=int,default=32010)
+    parser.add_argument('--password',default='token')
+    args = parser.parse_args()
+
+    server = DremioFlightTestServer(
+        make_sample_table(args.rows)
+        ,location   = f'grpc+tcp://localhost:{args.port}'
+        ,password   = args.password
+    )
+    print(f'serving {args.rows} rows on grpc+tcp://localhost:{server.port}')
+    server.serve()
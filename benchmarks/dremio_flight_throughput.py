@@ -0,0 +1,60 @@
+'''
+Compare the row throughput of `DremioReader(transport='flight')` with `pd.read_sql`.
+
+The flight side runs against the local test server in `dremio_flight_server.py`. There is
+no Dremio ODBC driver here, so the `pd.read_sql` side reads the same rows from an
+in-memory sqlite database, which has the same per-row Python conversion cost.
+
+Usage:
+    python benchmarks/dremio_flight_throughput.py --rows 1000000
+'''
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0,str(Path(__file__).resolve().parent.parent / 'src'))
+sys.path.insert(0,str(Path(__file__).resolve().parent))
+
+from azdsdr.readers import DremioReader
+from dremio_flight_server import DremioFlightTestServer,make_sample_table
+
+def timed(func):
+    start  = time.perf_counter()
+    result = func()
+    return result,time.perf_counter() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=1000000)
+    args = parser.parse_args()
+
+    table = make_sample_table(args.rows)
+    sql   = 'select * from sample_table'
+
+    with DremioFlightTestServer(table,password='token') as server:
+        dr = DremioReader(
+            username        = 'bench@example.com'
+            ,token          = 'token'
+            ,host           = 'localhost'
+            ,transport      = 'flight'
+            ,flight_port    = server.port
+            ,flight_tls     = False
+        )
+        arrow_table,arrow_sec = timed(lambda: dr.run_sql_arrow(sql))
+        flight_df,flight_sec  = timed(lambda: dr.run_sql(sql))
+
+    connection = sqlite3.connect(':memory:')
+    table.to_pandas().to_sql('sample_table',connection,index=False)
+    odbc_df,read_sql_sec = timed(lambda: pd.read_sql(sql,connection))
+
+    print(f"{'path':<32}{'seconds':>10}{'rows/sec':>16}")
+    for name,rows,seconds in [
+        ('flight -> pyarrow.Table',arrow_table.num_rows,arrow_sec)
+        ,('flight -> pandas',len(flight_df),flight_sec)
+        ,('pd.read_sql (sqlite)',len(odbc_df),read_sql_sec)
+    ]:
+        print(f"{name:<32}{seconds:>10.3f}{rows/seconds:>16,.0f}")
@@ -0,0 +1,118 @@
+'''
+Compare peak memory (RSS) and rows/sec of `DremioReader.run_sql_typed` with the
+`pd.read_sql` path used by `DremioReader.run_sql`.
+
+There is no Dremio ODBC driver here, so both paths read the same rows from a sqlite
+file. The sqlite cursor is wrapped to report column types in `cursor.description`,
+like the Dremio ODBC driver does. Each path runs in its own process so the peak RSS
+of one does not hide the other. Unix only, peak RSS comes from `resource.getrusage`.
+
+Usage:
+    python benchmarks/dremio_typed_fetch.py --rows 2000000
+'''
+import argparse
+import datetime
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0,str(Path(__file__).resolve().parent.parent / 'src'))
+
+columns = [
+    ('id',int)
+    ,('amount',float)
+    ,('quantity',int)
+    ,('region',str)
+    ,('product',str)
+    ,('event_date',str)
+]
+
+class _TypedCursor:
+    '''
+    sqlite cursor reporting python types in `description`, like pyodbc does
+    '''
+    def __init__(self,cursor) -> None:
+        self.cursor = cursor
+
+    @property
+    def description(self):
+        return [(name,type_code,None,None,None,None,True) for name,type_code in columns]
+
+    def __getattr__(self,name):
+        return getattr(self.cursor,name)
+
+class _TypedConnection:
+    def __init__(self,connection) -> None:
+        self.connection = connection
+
+    def cursor(self):
+        return _TypedCursor(self.connection.cursor())
+
+def make_sample_db(db_path,rows) -> None:
+    import numpy as np
+    rng        = np.random.default_rng(0)
+    connection = sqlite3.connect(db_path)
+    connection.execute('create table sample_table (id integer, amount real, quantity integer, region text, product text, event_date text)')
+    regions    = ['east','west','north','south']
+    products   = [f'product_{i}' for i in range(200)]
+    start      = datetime.date(2023,1,1)
+    batch_rows = 100000
+    for offset in range(0,rows,batch_rows):
+        n = min(batch_rows,rows - offset)
+        connection.executemany(
+            'insert into sample_table values (?,?,?,?,?,?)'
+            ,zip(
+                range(offset,offset + n)
+                ,rng.random(n).tolist()
+                ,rng.integers(0,100,n).tolist()
+                ,rng.choice(regions,n).tolist()
+                ,rng.choice(products,n).tolist()
+                ,[str(start + datetime.timedelta(days=int(d))) for d in rng.integers(0,365,n)]
+            )
+        )
+    connection.commit()
+    connection.close()
+
+def run_path(path_name,db_path,queue) -> None:
+    import resource
+    import pandas as pd
+    from azdsdr.readers.dremio import DremioReader
+
+    sql        = 'select * from sample_table'
+    connection = sqlite3.connect(db_path)
+    start      = time.perf_counter()
+    if path_name == 'pd.read_sql':
+        df = pd.read_sql(sql,connection)
+    else:
+        dr              = DremioReader.__new__(DremioReader)
+        dr.transport    = 'odbc'
+        dr.connection   = _TypedConnection(connection)
+        df              = dr.run_sql_typed(sql,engine='cursor')
+    elapsed    = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak_rss   = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb= peak_rss / 1024 / 1024 if sys.platform == 'darwin' else peak_rss / 1024
+    queue.put((len(df),elapsed,peak_rss_mb,df.memory_usage(deep=True).sum() / 1024 / 1024))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=2000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir,'sample.db')
+        make_sample_db(db_path,args.rows)
+
+        print(f"{'path':<20}{'seconds':>10}{'rows/sec':>14}{'peak RSS MB':>14}{'frame MB':>12}")
+        ctx = multiprocessing.get_context('spawn')
+        for path_name in ['pd.read_sql','run_sql_typed']:
+            queue   = ctx.Queue()
+            process = ctx.Process(target=run_path,args=(path_name,db_path,queue))
+            process.start()
+            rows,elapsed,peak_rss_mb,frame_mb = queue.get()
+            process.join()
+            print(f"{path_name:<20}{elapsed:>10.2f}{rows/elapsed:>14,.0f}{peak_rss_mb:>14.1f}{frame_mb:>12.1f}")
@@ -0,0 +1,61 @@
+'''
+Measure the cold-start import cost of each azdsdr entry point.
+
+Every entry point is imported in a fresh interpreter so nothing is shared between
+runs. The script prints the median wall time and the number of modules loaded by
+the import, which makes it easy to spot a heavy SDK leaking back into import time.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5]
+'''
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+src_path = Path(__file__).resolve().parent.parent / 'src'
+
+entry_points = [
+    'import azdsdr'
+    ,'import azdsdr.readers'
+    ,'import azdsdr.tools'
+    ,'from azdsdr.readers import DremioReader'
+    ,'from azdsdr.readers import KustoReader'
+    ,'from azdsdr.readers import CosmosReader'
+    ,'from azdsdr.readers import AzureBlobReader'
+    ,'from azdsdr.readers import Pipelines'
+]
+
+probe = '''
+import sys,time
+before = set(sys.modules)
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in ('pandas','pyodbc','azure','IPython','matplotlib') if m in sys.modules)
+print(elapsed,len(set(sys.modules)-before),','.join(heavy) or '-')
+'''
+
+def measure(stmt,repeat):
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable,'-c',probe.format(stmt=stmt)]
+            ,capture_output = True
+            ,text           = True
+            ,check          = True
+            ,env            = {'PYTHONPATH':str(src_path)}
+        ).stdout.split()
+        times.append(float(output[0]))
+    return statistics.median(times),int(output[1]),output[2]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat',type=int,default=5)
+    args = parser.parse_args()
+
+    print(f"{'entry point':<45}{'median ms':>10}{'modules':>9}  heavy deps loaded")
+    for stmt in entry_points:
+        median_s,module_cnt,heavy = measure(stmt,args.repeat)
+        print(f"{stmt:<45}{median_s*1000:>10.2f}{module_cnt:>9}  {heavy}")
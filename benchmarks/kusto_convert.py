@@ -0,0 +1,90 @@
+'''
+Compare the time to turn a Kusto result table into a DataFrame with the Kusto SDK's
+`dataframe_from_result_table` and azdsdr's column oriented `kusto_result_to_frame`.
+
+The result tables are synthetic `KustoResultTable` objects holding the raw json values
+the service returns (ISO datetime strings, `d.hh:mm:ss.fffffff` timespans, decimals as
+strings, dynamic objects), so only the conversion is measured, not the network.
+
+Usage:
+    python benchmarks/kusto_convert.py --rows 2000000
+'''
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0,str(Path(__file__).resolve().parent.parent / 'src'))
+
+columns = [
+    ('id','long')
+    ,('amount','real')
+    ,('price','decimal')
+    ,('quantity','int')
+    ,('is_valid','bool')
+    ,('region','string')
+    ,('event_time','datetime')
+    ,('duration','timespan')
+    ,('properties','dynamic')
+]
+
+def make_result_table(rows,column_names):
+    import numpy as np
+    from azure.kusto.data._models import KustoResultTable
+    rng         = np.random.default_rng(0)
+    start       = datetime.datetime(2023,1,1)
+    seconds     = rng.integers(0,365 * 86400,rows).tolist()
+    ticks       = rng.integers(0,10**7,rows).tolist()
+    values = {
+        'id'            : list(range(rows))
+        ,'amount'       : rng.random(rows).round(6).tolist()
+        ,'price'        : [f'{v:.2f}' for v in (rng.random(rows) * 100).tolist()]
+        ,'quantity'     : rng.integers(0,100,rows).tolist()
+        ,'is_valid'     : (rng.random(rows) > 0.5).tolist()
+        ,'region'       : rng.choice(['east','west','north','south'],rows).tolist()
+        ,'event_time'   : [
+            (start + datetime.timedelta(seconds=s)).strftime('%Y-%m-%dT%H:%M:%S') + f'.{t:07d}Z'
+            for s,t in zip(seconds,ticks)
+        ]
+        ,'duration'     : [
+            f'{s // 86400}.{s // 3600 % 24:02d}:{s // 60 % 60:02d}:{s % 60:02d}.{t:07d}' if s >= 86400
+            else f'{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}'
+            for s,t in zip((v % (3 * 86400) for v in seconds),ticks)
+        ]
+        ,'properties'   : [{'k':v % 10} for v in range(rows)]
+    }
+    # every 100th row is null, like sparse Kusto columns
+    raw_rows = [list(r) for r in zip(*(values[name] for name in column_names))]
+    for row in raw_rows[::100]:
+        row[1:] = [None] * (len(row) - 1)
+    return KustoResultTable({
+        'TableName'     : 'PrimaryResult'
+        ,'TableKind'    : 'PrimaryResult'
+        ,'Columns'      : [{'ColumnName':name,'ColumnType':column_type} for name,column_type in columns if name in column_names]
+        ,'Rows'         : raw_rows
+    })
+
+def time_it(convert,table) -> float:
+    start = time.perf_counter()
+    convert(table)
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=2000000)
+    args = parser.parse_args()
+
+    from azure.kusto.data.helpers import dataframe_from_result_table
+    from azdsdr.readers.kusto_convert import kusto_result_to_frame
+
+    # warm up the lazy pandas/pyarrow imports outside of the timings
+    kusto_result_to_frame(make_result_table(10,[name for name,_ in columns]))
+
+    print(f"{'columns':<14}{'sdk sec':>10}{'azdsdr sec':>12}{'speedup':>10}")
+    cases = [(column_type,[name]) for name,column_type in columns] + [('all',[name for name,_ in columns])]
+    for case_name,column_names in cases:
+        table       = make_result_table(args.rows,column_names)
+        sdk_sec     = time_it(dataframe_from_result_table,table)
+        azdsdr_sec  = time_it(kusto_result_to_frame,table)
+        print(f"{case_name:<14}{sdk_sec:>10.2f}{azdsdr_sec:>12.2f}{sdk_sec/azdsdr_sec:>9.1f}x")
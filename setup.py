@@ -13,6 +13,7 @@ setup(
     install_requires=[
         'numpy'
         ,'pandas'
+        ,'pyarrow'
         ,'pyodbc'
         ,'azure-cli'
         ,'azure-kusto-data'
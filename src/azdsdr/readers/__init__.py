@@ -0,0 +1,47 @@
+'''
+Data readers for Dremio, Kusto, Cosmos and Azure Blob, plus the `Pipelines` helpers.
+
+Each reader lives in its own submodule and is only imported the first time it is
+accessed, e.g. `from azdsdr.readers import KustoReader` loads `azdsdr.readers.kusto`
+and nothing else. The SDKs behind a reader (pandas, pyodbc, azure-kusto-*,
+azure-storage-blob) are imported when the reader object is built.
+'''
+import importlib
+
+# public name -> submodule that defines it
+_lazy_attrs = {
+    'DremioReader'          : 'dremio'
+    ,'KustoReader'           : 'kusto'
+    ,'AsyncKustoReader'      : 'kusto_async'
+    ,'KustoSchemaCatalog'    : 'kusto_schema'
+    ,'IngestTracker'         : 'kusto_ingest'
+    ,'KustoMirror'           : 'kusto_mirror'
+    ,'CosmosReader'          : 'cosmos'
+    ,'ScopeJobManager'       : 'scope_jobs'
+    ,'ScopeJobError'         : 'scope_jobs'
+    ,'AzureBlobReader'       : 'blob'
+    ,'Pipelines'             : 'pipelines'
+    ,'AzCliTokenProvider'    : 'auth'
+    ,'ResultCache'           : 'cache'
+    ,'AdaptiveScheduler'     : 'scheduler'
+    ,'QueryStatsRecorder'    : 'kusto_stats'
+    ,'kusto_result_to_frame' : 'kusto_convert'
+    ,'infer_kusto_schema'    : 'kusto_types'
+    ,'infer_csv_schema'      : 'kusto_types'
+    ,'config_file_path'      : 'config'
+    ,'config_obj'            : 'config'
+    ,'load_config'           : 'config'
+    ,'update_config'         : 'config'
+}
+
+__all__ = list(_lazy_attrs)
+
+def __getattr__(name):
+    module_name = _lazy_attrs.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f'.{module_name}',__name__)
+    return getattr(module,name)
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attrs))
@@ -0,0 +1,208 @@
+# region Azure CLI token cache
+from datetime import datetime
+from pathlib import Path
+import subprocess
+import threading
+import shutil
+import json
+import time
+import os
+
+token_cache_file_path = Path.home() / '.azdsdr_token_cache.json'
+
+class _FileLock:
+    '''
+    Exclusive inter-process lock on a side `.lock` file, used to guard the token cache file.
+    '''
+    def __init__(self,lock_file_path) -> None:
+        self.lock_file_path = str(lock_file_path)
+        self.f              = None
+
+    def __enter__(self):
+        self.f = open(self.lock_file_path,'a+')
+        if os.name == 'nt':
+            import msvcrt
+            while True:
+                try:
+                    self.f.seek(0)
+                    msvcrt.locking(self.f.fileno(),msvcrt.LK_LOCK,1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 seconds, keep waiting
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(self.f.fileno(),fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self,*exc):
+        if os.name == 'nt':
+            import msvcrt
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(),msvcrt.LK_UNLCK,1)
+        else:
+            import fcntl
+            fcntl.flock(self.f.fileno(),fcntl.LOCK_UN)
+        self.f.close()
+        self.f = None
+
+class AzCliTokenProvider:
+    '''
+    Get access tokens from `az account get-access-token` and cache them, so the
+    Azure CLI is only called when no valid token is cached.
+
+    Tokens are cached per resource in memory and in a json file shared by all
+    processes of the current user (`~/.azdsdr_token_cache.json` by default). The
+    file is guarded by a lock file, so concurrent workers wait for a single `az`
+    call instead of all calling it. When a token gets close to its expiry it is
+    refreshed in a background thread while the current token keeps being served.
+
+    The object is callable and returns the token string, which is what
+    `KustoConnectionStringBuilder.with_token_provider` expects.
+
+    Args:
+        resource (str): the resource to get the token for, e.g. the Kusto cluster url.
+        cache_file_path (str): path of the on-disk token cache file.
+        refresh_margin_min (int): start a background refresh when the token expires within these minutes.
+        az_path (str): the Azure CLI executable.
+
+    Example:
+        ```
+        from azdsdr.readers.auth import get_az_cli_token_provider
+        token_provider = get_az_cli_token_provider("https://help.kusto.windows.net")
+        token          = token_provider()
+        ```
+    '''
+    # a token expiring within this many seconds is refreshed synchronously
+    min_valid_sec = 60
+
+    def __init__(
+        self
+        ,resource
+        ,cache_file_path    = None
+        ,refresh_margin_min = 5
+        ,az_path            = 'az'
+    ) -> None:
+        self.resource           = resource
+        self.cache_file_path    = Path(cache_file_path or token_cache_file_path)
+        self.lock_file_path     = self.cache_file_path.with_name(self.cache_file_path.name + '.lock')
+        self.refresh_margin_sec = refresh_margin_min * 60
+        self.az_path            = az_path
+        self.token              = None
+        self.expires_on         = 0
+        self._lock              = threading.Lock()
+        self._refresh_thread    = None
+
+    def __call__(self) -> str:
+        return self.get_token()
+
+    def get_token(self) -> str:
+        '''
+        Return a valid access token for the resource.
+        '''
+        with self._lock:
+            remaining_sec = self.expires_on - time.time()
+            if self.token and remaining_sec > self.refresh_margin_sec:
+                return self.token
+            if self.token and remaining_sec > self.min_valid_sec:
+                # still usable, refresh it without blocking the caller
+                self._start_background_refresh()
+                return self.token
+
+        self.refresh()
+        return self.token
+
+    async def get_token_async(self) -> str:
+        '''
+        Async version of `get_token` for the aio Kusto client, the Azure CLI call runs in a
+        worker thread so the event loop is never blocked.
+        '''
+        with self._lock:
+            if self.token and self.expires_on - time.time() > self.refresh_margin_sec:
+                return self.token
+        import asyncio
+        return await asyncio.to_thread(self.get_token)
+
+    def refresh(self,force=False) -> None:
+        '''
+        Reload the token from the disk cache, or from the Azure CLI when the cached one
+        is missing or close to expiry. Set `force` to always call the Azure CLI.
+        '''
+        with _FileLock(self.lock_file_path):
+            cache = self._read_cache_file()
+            entry = cache.get(self.resource)
+            if (
+                force
+                or not entry
+                or entry['expires_on'] - time.time() <= self.refresh_margin_sec
+            ):
+                entry = self._get_token_from_az_cli()
+                cache = self._read_cache_file()
+                cache[self.resource] = entry
+                self._write_cache_file(cache)
+
+        with self._lock:
+            self.token      = entry['access_token']
+            self.expires_on = entry['expires_on']
+
+    def _start_background_refresh(self) -> None:
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._background_refresh,daemon=True)
+        self._refresh_thread.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as err:
+            # the next get_token call will retry synchronously once the token is about to expire
+            print('background token refresh error')
+            print(err)
+
+    def _get_token_from_az_cli(self) -> dict:
+        az_exe = shutil.which(self.az_path) or self.az_path
+        cmd    = [az_exe,'account','get-access-token','--resource',self.resource,'--output','json']
+        result = subprocess.run(cmd,capture_output=True,text=True)
+        if result.returncode != 0:
+            raise Exception(f"Get access token from Azure CLI error, please run `az login` first. {result.stderr.strip()}")
+        token_obj = json.loads(result.stdout)
+
+        # newer Azure CLI versions return a POSIX timestamp, older ones only a local time string
+        if 'expires_on' in token_obj:
+            expires_on = float(token_obj['expires_on'])
+        else:
+            expires_on = datetime.strptime(token_obj['expiresOn'][:19],'%Y-%m-%d %H:%M:%S').timestamp()
+        return {
+            'access_token'  : token_obj['accessToken']
+            ,'expires_on'   : expires_on
+        }
+
+    def _read_cache_file(self) -> dict:
+        try:
+            with open(self.cache_file_path,'r') as f:
+                return json.load(f)
+        except (FileNotFoundError,json.JSONDecodeError):
+            return {}
+
+    def _write_cache_file(self,cache:dict) -> None:
+        # write to a temp file and rename, so readers never see a half written cache
+        temp_file_path = self.cache_file_path.with_name(f"{self.cache_file_path.name}.{os.getpid()}.tmp")
+        fd = os.open(temp_file_path,os.O_WRONLY | os.O_CREAT | os.O_TRUNC,0o600)
+        with os.fdopen(fd,'w') as f:
+            json.dump(cache,f)
+        os.replace(temp_file_path,self.cache_file_path)
+
+_token_providers      = {}
+_token_providers_lock = threading.Lock()
+
+def get_az_cli_token_provider(resource,**kwargs) -> AzCliTokenProvider:
+    '''
+    Return the process wide `AzCliTokenProvider` of the resource, create it at the first call.
+    All readers built for the same resource share the provider and its in-memory token.
+    '''
+    resource = resource.rstrip('/')
+    with _token_providers_lock:
+        if resource not in _token_providers:
+            _token_providers[resource] = AzCliTokenProvider(resource,**kwargs)
+        return _token_providers[resource]
+# endregion
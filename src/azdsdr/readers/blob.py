@@ -0,0 +1,296 @@
+# region Azure Blob
+from datetime import datetime,timedelta
+import hashlib
+import uuid
+import os
+
+from .config import load_config,update_config
+from .scheduler import resolve_scheduler
+
+def _blob_ranges(size:int,chunk_size:int) -> list:
+    '''
+    (offset, length) of the ranges covering a blob of `size` bytes
+    '''
+    return [(offset,min(chunk_size,size - offset)) for offset in range(0,size,chunk_size)]
+
+def _check_md5(blob_file_path:str,expected,actual:bytes) -> None:
+    if expected and bytes(expected) != actual:
+        raise Exception(f'MD5 mismatch of blob file {blob_file_path}, the download is corrupted')
+
+class AzureBlobReader:
+    '''
+    Args:
+        * container_name is required
+        * The class will retrieve blob_conn_str from configuration file is the parameter is set as None
+        * scheduler, an optional `azdsdr.readers.AdaptiveScheduler` (or True for the process wide one),
+          limits the concurrent calls per storage account and retries throttled (503/"server is busy") calls
+
+    Functions from this class support the following Features:
+    * Download file, as parallel ranges
+    * Download file into a memory buffer
+    * Upload file
+    * Get Blob SAS token
+    * Get Blob SAS Url
+    * Delete file
+    '''
+    def __init__(self,container_name,blob_conn_str=None,scheduler=None):
+        from azure.storage.blob import BlobServiceClient
+        if blob_conn_str:
+            self.connect_string         = blob_conn_str
+            # update the azure blob connection string with the newest one
+            update_config('azure_blob_connstr',blob_conn_str)
+        else:
+            # get connect_string from configure file
+            self.connect_string = load_config()['azure_blob_connstr']
+
+        self.blob_service_client    = BlobServiceClient.from_connection_string(self.connect_string)
+        #self.blob_service_client.max_single_put_size = 4*1024*1024              # 4M
+        #self.blob_service_client.timeout = 60*20                                # 10 mins
+        self.container_client       = self.blob_service_client.get_container_client(container_name)
+        self.scheduler              = resolve_scheduler(scheduler)
+        self.backend                = f'blob|{self.blob_service_client.account_name}'
+
+    def _call(self,fn,*args,**kwargs):
+        '''
+        Call the storage service, through the scheduler when the reader has one
+        '''
+        if self.scheduler is None:
+            return fn(*args,**kwargs)
+        return self.scheduler.run(self.backend,fn,*args,**kwargs)
+
+    def _read_blob(self,blob_client) -> bytes:
+        return self._call(lambda: blob_client.download_blob().readall())
+
+    def _download_ranges(self,blob_client,props,write_range,max_concurrency,chunk_size,verify) -> None:
+        '''
+        Download a blob as concurrent range requests, `write_range(offset,downloader)` stores
+        every range. The ranges are pinned to the ETag of `props`, so a blob changed during the
+        download raises instead of mixing two versions. With `verify`, every range request is
+        checked against its transactional MD5.
+        '''
+        from concurrent.futures import ThreadPoolExecutor
+        from azure.core import MatchConditions
+        ranges = _blob_ranges(props.size,chunk_size)
+        if not ranges:
+            return
+
+        def fetch(offset,length):
+            downloader = blob_client.download_blob(
+                offset              = offset
+                ,length             = length
+                ,etag               = props.etag
+                ,match_condition    = MatchConditions.IfNotModified
+                ,validate_content   = verify
+            )
+            write_range(offset,downloader)
+
+        with ThreadPoolExecutor(max_workers=max(1,min(max_concurrency,len(ranges)))) as executor:
+            futures = [executor.submit(self._call,fetch,offset,length) for offset,length in ranges]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def download_file(
+        self
+        ,blob_file_path
+        ,local_file_path
+        ,max_concurrency    = 8
+        ,chunk_size         = 4 * 1024 * 1024
+        ,verify             = True
+    ) -> str:
+        '''
+        Download a single file. The blob is fetched as `chunk_size` ranges, up to
+        `max_concurrency` at the same time, and every range is streamed to its offset in the
+        preallocated local file, the blob is never held in memory.
+
+        Args:
+            blob_file_path (str): the blob path in the container
+            local_file_path (str): the local file path
+            max_concurrency (int): max number of range requests at the same time
+            chunk_size (int): size of a range request in bytes
+            verify (bool): check every range with its transactional MD5, and the whole file
+                with the Content-MD5 of the blob when it has one
+
+        Example:
+            ```
+            abr.download_file('exports/big.parquet','big.parquet',max_concurrency=16,chunk_size=16*1024*1024)
+            ```
+        '''
+        blob_client = self.container_client.get_blob_client(blob_file_path)
+        props       = self._call(blob_client.get_blob_properties)
+
+        def write_range(offset,downloader):
+            # one handle per range, a retried range writes over its own bytes again
+            with open(local_file_path,'r+b') as f:
+                f.seek(offset)
+                downloader.readinto(f)
+
+        with open(local_file_path,'wb') as f:
+            f.truncate(props.size)
+        try:
+            self._download_ranges(blob_client,props,write_range,max_concurrency,chunk_size,verify)
+            if verify and props.content_settings.content_md5:
+                md5 = hashlib.md5()
+                with open(local_file_path,'rb') as f:
+                    for block in iter(lambda: f.read(chunk_size),b''):
+                        md5.update(block)
+                _check_md5(blob_file_path,props.content_settings.content_md5,md5.digest())
+        except BaseException:
+            os.remove(local_file_path)
+            raise
+        return f"blob file {blob_file_path} is downloaded to {local_file_path}"
+
+    def download_to_buffer(
+        self
+        ,blob_file_path
+        ,max_concurrency    = 8
+        ,chunk_size         = 4 * 1024 * 1024
+        ,verify             = True
+    ) -> memoryview:
+        '''
+        Same as `download_file`, but the ranges are copied into one preallocated buffer, for
+        consumers reading the blob from memory, e.g. `pq.read_table(pa.BufferReader(view))`.
+
+        Returns:
+            memoryview: the blob content
+        '''
+        blob_client = self.container_client.get_blob_client(blob_file_path)
+        props       = self._call(blob_client.get_blob_properties)
+        view        = memoryview(bytearray(props.size))
+
+        def write_range(offset,downloader):
+            position = offset
+            for chunk in downloader.chunks():
+                view[position:position + len(chunk)] = chunk
+                position += len(chunk)
+
+        self._download_ranges(blob_client,props,write_range,max_concurrency,chunk_size,verify)
+        if verify and props.content_settings.content_md5:
+            _check_md5(blob_file_path,props.content_settings.content_md5,hashlib.md5(view).digest())
+        return view
+
+    def download_file_list(self,blob_file_path_list,local_file_path) -> str:
+        '''
+        Download a list of file with the same schema
+        '''
+        # write the complete csv file with header
+        blob_client = self.container_client.get_blob_client(blob_file_path_list[0])
+        with open(local_file_path,'wb') as f:
+            f.write(self._read_blob(blob_client))
+
+        if len(blob_file_path_list) == 1:
+            return f"Single blob file is downloaded to {local_file_path}"
+
+        # write the following files without header
+        try:
+            for blob_file_path in blob_file_path_list[1:]:
+                blob_client = self.container_client.get_blob_client(blob_file_path)
+                # write to a temp file
+                with open("temp.csv",'ab') as f:
+                    f.write(self._read_blob(blob_client))
+                # remove teh first line and then write back to the target file
+                with open(local_file_path,'a') as f_target:
+                    with open('temp.csv','r+') as f:
+                        lines = f.readlines()
+                        f.seek(0)
+                        f.truncate()
+                        f_target.writelines(lines[1:])
+        except:
+            raise Exception('write csv file error')
+        finally:
+            os.remove('temp.csv')
+
+        return f"All blob files are downloaded to {local_file_path}"
+
+    def upload_file(self,blob_file_path,local_file_path):
+        '''
+        Upload a local small file (< 9mb) to blob storage
+        '''
+        try:
+            blob_client = self.container_client.get_blob_client(blob_file_path)
+            with open(local_file_path,'rb') as f:
+                def upload():
+                    # a retried upload reads the file from the start
+                    f.seek(0)
+                    blob_client.upload_blob(
+                        f
+                        ,blob_type="BlockBlob"
+                        ,overwrite=True
+                        ,max_concurrency=12)
+                self._call(upload)
+        except BaseException as err:
+            print('Upload file error')
+            print(err)
+
+    def upload_file_chunks(self,blob_file_path,local_file_path):
+        '''
+        Upload large file to blob
+        '''
+        from azure.storage.blob import BlobBlock
+        try:
+            blob_client = self.container_client.get_blob_client(blob_file_path)
+            # upload data
+            block_list=[]
+            chunk_size=1024*1024*4
+            with open(local_file_path,'rb') as f:
+                while True:
+                    read_data = f.read(chunk_size)
+                    if not read_data:
+                        break # done
+                    blk_id = str(uuid.uuid4())
+                    self._call(blob_client.stage_block,block_id=blk_id,data=read_data)
+                    block_list.append(BlobBlock(block_id=blk_id))
+            self._call(blob_client.commit_block_list,block_list)
+        except BaseException as err:
+            print('Upload file error')
+            print(err)
+
+    def get_blob_sas_token(self,expire_days = 1):
+        '''
+        Get the SAS token for current container
+        '''
+        from azure.storage.blob import (
+            ResourceTypes
+            ,AccountSasPermissions
+            ,generate_account_sas
+        )
+        sas_token = generate_account_sas(
+            self.blob_service_client.account_name,
+            account_key     = self.blob_service_client.credential.account_key,
+            resource_types  = ResourceTypes(object=True),
+            permission      = AccountSasPermissions(read=True),
+            expiry          = datetime.utcnow() + timedelta(days=expire_days)
+        )
+        return sas_token
+
+    def get_blob_sas_url(self,blob_file_path,expire_days=1):
+        '''
+        Get the blob file SAS url with read permission. set expiration in one day.
+        '''
+        sas_token       = self.get_blob_sas_token(expire_days=expire_days)
+        blob_client     = self.container_client.get_blob_client(blob_file_path)
+        url             = blob_client.url
+        blob_sas_url    = f'{url}?{sas_token}'
+        return blob_sas_url
+
+    def delete_blob_file(self,blob_file_path):
+        '''
+        Delete a blob file
+        '''
+        try:
+            blob_client = self.container_client.get_blob_client(blob_file_path)
+            self._call(blob_client.delete_blob)
+        except:
+            print('Delete file error')
+
+    def delete_blob_files(self,blob_file_path_list):
+        try:
+            for f_path in blob_file_path_list:
+                self.delete_blob_file(f_path)
+        except:
+            print('Delete file error')
+
+# endregion
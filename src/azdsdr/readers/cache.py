@@ -0,0 +1,226 @@
+# region query result cache
+from concurrent.futures import Future
+from pathlib import Path
+import threading
+import hashlib
+import json
+import time
+import re
+import os
+
+# quoted strings are kept as is, whitespace runs outside of them are collapsed
+_query_token_re = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")|\s+""")
+
+def _collapse_whitespace(match) -> str:
+    if match.group(1):
+        return match.group(1)
+    # a line break ends `//` and `--` comments, so it is kept
+    return '\n' if '\n' in match.group(0) else ' '
+
+def normalize_query(query:str) -> str:
+    '''
+    Normalize query text for cache keys: strip it and collapse whitespace outside of string
+    literals, whitespace runs holding a line break become one line break.
+    '''
+    return _query_token_re.sub(_collapse_whitespace,query.strip())
+
+class ResultCache:
+    '''
+    An opt-in, disk-backed cache of query results shared by `KustoReader` and `DremioReader`.
+
+    Every result is stored as a Parquet file in `cache_dir`, next to a small json file holding
+    its expiry time. Entries expire after their TTL, and when the total size goes over
+    `max_size_mb` the least recently used entries are evicted. Because all state lives in the
+    cache folder, several processes can share the same cache.
+
+    Concurrent callers in the same process asking for the same query wait for a single
+    execution instead of all sending it to the cluster.
+
+    Args:
+        cache_dir (str): the cache folder, default is `~/.azdsdr_cache`
+        ttl_sec (int): default time to live of an entry in seconds
+        max_size_mb (int): max total size of the cached Parquet files
+
+    Example:
+        ```
+        from azdsdr.readers import KustoReader,ResultCache
+        cache = ResultCache(ttl_sec=3600,max_size_mb=2048)
+        kr    = KustoReader(cluster=cluster,db=db,result_cache=cache)
+        r     = kr.run_kql(kql)     # sent to the cluster
+        r     = kr.run_kql(kql)     # served from the cache
+        print(cache.stats())
+        ```
+    '''
+    def __init__(self,cache_dir=None,ttl_sec=3600,max_size_mb=1024) -> None:
+        self.cache_dir      = Path(cache_dir or Path.home() / '.azdsdr_cache').expanduser()
+        self.ttl_sec        = ttl_sec
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.cache_dir.mkdir(parents=True,exist_ok=True)
+        self._lock          = threading.Lock()
+        self._inflight      = {}
+        self._stats         = {'hits':0,'misses':0,'evictions':0,'expired':0,'dedup_waits':0}
+
+    def make_key(self,scope:str,query:str) -> str:
+        '''
+        Build the cache key from the query scope (e.g. cluster and database) and the normalized query text
+        '''
+        return hashlib.sha256(f"{scope}\n{normalize_query(query)}".encode('utf-8')).hexdigest()
+
+    def _data_path(self,key) -> Path:
+        return self.cache_dir / f'{key}.parquet'
+
+    def _meta_path(self,key) -> Path:
+        return self.cache_dir / f'{key}.json'
+
+    def _count(self,name,n=1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self) -> dict:
+        '''
+        Return the hit, miss, eviction, expiration and dedup counters of this cache object
+        '''
+        with self._lock:
+            return dict(self._stats)
+
+    def get(self,key):
+        '''
+        Return the cached DataFrame of the key, or None if there is no valid entry.
+        '''
+        import pandas as pd
+        import pyarrow as pa
+        try:
+            with open(self._meta_path(key),'r') as f:
+                meta = json.load(f)
+        except (FileNotFoundError,json.JSONDecodeError):
+            return None
+
+        if meta['expires_at'] < time.time():
+            self._count('expired')
+            self.delete(key)
+            return None
+
+        data_path = self._data_path(key)
+        try:
+            df = pd.read_parquet(data_path)
+            # the modify time is used as the last access time for LRU eviction
+            os.utime(data_path)
+        except pa.ArrowInvalid as err:
+            # a truncated or corrupt file, drop the entry so the query runs again
+            print(f'cached result {key} can not be read, removed: {err}')
+            self.delete(key)
+            return None
+        except (FileNotFoundError,OSError):
+            return None
+        return df
+
+    def put(self,key,df,ttl_sec=None) -> bool:
+        '''
+        Store a DataFrame, return False if the DataFrame can not be saved as Parquet.
+        '''
+        ttl_sec     = self.ttl_sec if ttl_sec is None else ttl_sec
+        data_path   = self._data_path(key)
+        temp_path   = data_path.with_name(f'{data_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            df.to_parquet(temp_path,index=False)
+        except Exception as err:
+            # e.g. Kusto dynamic columns holding mixed python objects
+            print(f'result can not be cached as parquet: {err}')
+            if temp_path.exists():
+                temp_path.unlink()
+            return False
+        os.replace(temp_path,data_path)
+        meta_temp_path = self._meta_path(key).with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(meta_temp_path,'w') as f:
+            json.dump({'expires_at':time.time() + ttl_sec},f)
+        os.replace(meta_temp_path,self._meta_path(key))
+        self.evict()
+        return True
+
+    def delete(self,key) -> None:
+        for path in (self._meta_path(key),self._data_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        '''
+        Remove every entry from the cache folder
+        '''
+        for path in self.cache_dir.glob('*.parquet'):
+            self.delete(path.stem)
+
+    def evict(self) -> int:
+        '''
+        Remove expired entries, then the least recently used ones until the cache fits in
+        `max_size_mb`. Return the number of evicted entries.
+        '''
+        now     = time.time()
+        entries = []
+        for data_path in self.cache_dir.glob('*.parquet'):
+            try:
+                stat = data_path.stat()
+                with open(self._meta_path(data_path.stem),'r') as f:
+                    expires_at = json.load(f)['expires_at']
+            except (FileNotFoundError,json.JSONDecodeError,KeyError):
+                continue
+            entries.append((stat.st_mtime,stat.st_size,expires_at,data_path.stem))
+
+        total_size  = sum(e[1] for e in entries)
+        evicted     = 0
+        # expired entries first, then the oldest accessed ones
+        for mtime,size,expires_at,key in sorted(entries,key=lambda e:(e[2] >= now,e[0])):
+            if expires_at >= now and total_size <= self.max_size_bytes:
+                break
+            self.delete(key)
+            total_size -= size
+            evicted += 1
+        if evicted:
+            self._count('evictions',evicted)
+        return evicted
+
+    def get_or_run(self,scope:str,query:str,run,ttl_sec=None):
+        '''
+        Return the cached result of the query, or call `run()` to execute it and cache the result.
+        Concurrent calls with the same key wait for the one running execution.
+        A `None` result (failed query) is returned but not cached.
+        '''
+        key = self.make_key(scope,query)
+        df  = self.get(key)
+        if df is not None:
+            self._count('hits')
+            return df
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner  = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self._stats['misses'] += 1
+            else:
+                self._stats['dedup_waits'] += 1
+
+        if not owner:
+            df = future.result()
+            return df.copy() if df is not None else None
+
+        try:
+            # the entry may have been stored between the first lookup and taking ownership
+            df = self.get(key)
+            if df is not None:
+                future.set_result(df)
+                return df
+            df = run()
+            if df is not None:
+                self.put(key,df,ttl_sec=ttl_sec)
+            future.set_result(df)
+            return df
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key,None)
+# endregion
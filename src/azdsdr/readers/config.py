@@ -0,0 +1,39 @@
+# region prepare config
+from pathlib import Path
+import json
+
+config_file_path = Path.home() / '.azdsdr_conf.json'
+
+# the configuration is loaded on first use instead of at import time, so that
+# importing azdsdr.readers never touches the home folder.
+_config_obj = None
+
+def load_config() -> dict:
+    '''
+    Load the `~/.azdsdr_conf.json` configuration, create an empty one if it does not exist yet.
+    The loaded object is cached, later calls return the same dict.
+    '''
+    global _config_obj
+    if _config_obj is None:
+        # make sure the existence of a configure
+        if not Path.exists(config_file_path):
+            with open(config_file_path,'w') as f:
+                f.write("{}")
+
+        with open(config_file_path,'r') as f:
+            _config_obj = json.load(f)
+    return _config_obj
+
+def update_config(key,value):
+    config_obj = load_config()
+    config_obj[key] = value
+    config_obj_json = json.dumps(config_obj)
+    with open(config_file_path,'w') as f:
+        f.write(config_obj_json)
+
+def __getattr__(name):
+    # keep `config_obj` available as a module attribute for existing callers
+    if name == 'config_obj':
+        return load_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+# endregion
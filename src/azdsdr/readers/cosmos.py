@@ -0,0 +1,465 @@
+# region Cosmos
+from typing import TYPE_CHECKING,Iterator
+import weakref
+import uuid
+import time
+import os
+import re
+
+from .scope_jobs import ScopeJobError,ScopeJobManager,parse_job_id,parse_job_state,success_states,failure_states
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+_scope_query_outputs = ('pandas','chunks','parquet')
+_output_name_re      = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+def _process_output(process) -> tuple:
+    '''
+    (return code, decoded stdout) of a `subprocess.CompletedProcess`, (None, text) of an output string
+    '''
+    stdout = getattr(process,'stdout',process)
+    if isinstance(stdout,bytes):
+        stdout = stdout.decode('utf-8',errors='replace')
+    return getattr(process,'returncode',None),stdout or ''
+
+def _strip_header_prefix(file_path:str,prefix='#Field:',block_size=1 << 20) -> None:
+    '''
+    Remove `prefix` from the first line of a file in place. The rest of the file is shifted
+    left block by block, so memory use does not depend on the file size and no second copy
+    is written to disk.
+    '''
+    prefix = prefix.encode('utf-8')
+    with open(file_path,'r+b') as f:
+        header = f.readline()
+        if prefix not in header:
+            return
+        new_header  = header.replace(prefix,b'')
+        read_pos    = len(header)
+        write_pos   = len(new_header)
+        f.seek(0)
+        f.write(new_header)
+        while True:
+            f.seek(read_pos)
+            block = f.read(block_size)
+            if not block:
+                break
+            f.seek(write_pos)
+            f.write(block)
+            read_pos  += len(block)
+            write_pos += len(block)
+        f.truncate(write_pos)
+
+def _open_csv(csv_path:str,column_types=None) -> 'pa.csv.CSVStreamingReader':
+    '''
+    Open a streaming csv reader, its column types are inferred from the first 16 MB block
+    '''
+    import pyarrow.csv as pcsv
+    return pcsv.open_csv(
+        csv_path
+        ,read_options       = pcsv.ReadOptions(block_size=16 << 20)
+        ,convert_options    = pcsv.ConvertOptions(column_types=column_types or {})
+    )
+
+def _iter_csv_tables(csv_path:str,chunk_rows=100000,column_types=None) -> Iterator['pa.Table']:
+    '''
+    Stream a csv file as pyarrow Tables of `chunk_rows` rows. Column types are inferred from
+    the first block of the file, so every table has the same schema.
+    '''
+    import pyarrow as pa
+    # closed also when the iteration stops early, so the file can be removed on Windows
+    with _open_csv(csv_path,column_types) as reader:
+        pending,pending_rows = [],0
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            while pending_rows >= chunk_rows:
+                table   = pa.Table.from_batches(pending,schema=reader.schema)
+                yield table.slice(0,chunk_rows)
+                rest    = table.slice(chunk_rows)
+                pending,pending_rows = rest.to_batches(),rest.num_rows
+        if pending_rows > 0:
+            yield pa.Table.from_batches(pending,schema=reader.schema)
+
+def _remove_file(file_path:str) -> None:
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+def _iter_csv_frames(csv_path:str,chunk_rows=100000,column_types=None,remove_file=False) -> Iterator['pd.DataFrame']:
+    '''
+    Stream a csv file as DataFrame chunks. With `remove_file`, the file is removed when the
+    iterator is exhausted or closed, or else when it is garbage collected or at interpreter
+    exit, also if it was never started.
+    '''
+    def frames():
+        try:
+            for table in _iter_csv_tables(csv_path,chunk_rows,column_types):
+                yield table.to_pandas()
+        finally:
+            if remove_file:
+                _remove_file(csv_path)
+    iterator = frames()
+    if remove_file:
+        weakref.finalize(iterator,_remove_file,csv_path)
+    return iterator
+
+def _csv_to_parquet(csv_path:str,parquet_path:str,chunk_rows=100000,column_types=None) -> int:
+    '''
+    Convert a csv file into a parquet file chunk by chunk, one row group per chunk, return the row count
+    '''
+    import pyarrow.parquet as pq
+    row_cnt = 0
+    writer  = None
+    try:
+        # the writer takes the schema of the tables, inferred once by their reader
+        for table in _iter_csv_tables(csv_path,chunk_rows,column_types):
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path,table.schema)
+            writer.write_table(table)
+            row_cnt += table.num_rows
+        if writer is None:
+            # no rows, still write the columns
+            with _open_csv(csv_path,column_types) as reader:
+                writer = pq.ParquetWriter(parquet_path,reader.schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    return row_cnt
+
+class CosmosReader:
+    '''
+    The Cosmos Reader can only be used inside of Microsoft Corp Network
+    '''
+    def __init__(self,scope_exe_path,client_account,vc_path) -> None:
+        '''
+        Initialize the CosmosReader object.
+
+        <TODO> detect if the os is Windows or not, if not, pop warning message
+
+        Args:
+            scope_exe_path (str): the path to the scope.exe file.
+            client_account (str): email address for Azure CLI authentication.
+            vc_path (str):
+        '''
+        self.scope_exe_path = scope_exe_path
+        self.client_account = client_account
+        self.vc_path        = vc_path
+
+    def _scope_args(self,*args) -> list:
+        return [self.scope_exe_path,*args,'-on','useaadauthentication','-u',self.client_account]
+
+    def _submit_args(self,scope_script_path:str) -> list:
+        return self._scope_args('submit','-i',scope_script_path,'-vc',self.vc_path)
+
+    def _jobstatus_args(self,job_id:str) -> list:
+        return self._scope_args('jobstatus',job_id,'-vc',self.vc_path)
+
+    def run_scope(self,scope_script_path) -> 'subprocess.CompletedProcess':
+        '''
+        Submit a scope script, pass the returned process to `check_job_status` to wait for the job.
+
+        Returns:
+            subprocess.CompletedProcess: the `scope.exe submit` process, with its return code and stdout
+        '''
+        import subprocess
+        args = self._submit_args(scope_script_path)
+        print(">",' '.join(args))
+        return subprocess.run(args,capture_output=True)
+
+    def check_job_status(self,submit_process,check_times = 60,check_gap_min=2,max_unknown_checks=5) -> str:
+        '''
+        Poll the job submitted by `run_scope` until it is finished.
+
+        Args:
+            submit_process (subprocess.CompletedProcess): the output of `run_scope`, or the submit
+                output text when the return code is unknown
+            check_times (int): max number of status checks
+            check_gap_min (float): minutes between two checks
+            max_unknown_checks (int): give up when this many checks in a row print no known state
+
+        Returns:
+            str: the final job state, `CompletedSuccess`. A failed submit, a failed, cancelled or
+                timed out job raises a `ScopeJobError`.
+        '''
+        import subprocess
+        returncode,stdout = _process_output(submit_process)
+        if returncode not in (0,None):
+            stderr = _process_output(getattr(submit_process,'stderr',b''))[1]
+            raise ScopeJobError(f'scope submit failed with return code {returncode}:\n{stdout}{stderr}')
+        op_guid = parse_job_id(stdout,returncode)
+        print('op_guid:',op_guid)
+        if op_guid is None:
+            raise ScopeJobError(f'scope script error, no job id in the submit output:\n{stdout}')
+
+        args    = self._jobstatus_args(op_guid)
+        state   = None
+        unknown = 0
+        for _ in range(check_times):
+            time.sleep(60*check_gap_min)
+            _,stdout    = _process_output(subprocess.run(args,capture_output=True))
+            new_state   = parse_job_state(stdout)
+            unknown     = 0 if new_state else unknown + 1
+            if unknown >= max_unknown_checks:
+                raise ScopeJobError(f'scope job {op_guid} has no known state after {unknown} checks:\n{stdout}')
+            state = new_state or state
+            if state in success_states:
+                print("scope job is completed")
+                return state
+            if state in failure_states:
+                raise ScopeJobError(f'scope job {op_guid} ended as {state}:\n{stdout}')
+            print('still in processing',state or '')
+        raise ScopeJobError(f'scope job {op_guid} is still {state} after {check_times} checks')
+
+    def job_manager(self,**kwargs) -> ScopeJobManager:
+        '''
+        A `ScopeJobManager` submitting scripts with this reader, the keyword arguments are
+        passed to `ScopeJobManager`.
+        '''
+        return ScopeJobManager(self,**kwargs)
+
+    def run_scope_many(self,scope_script_paths:list,callback=None,**kwargs) -> list:
+        '''
+        Submit many scope scripts at the same time and wait until all their jobs are finished.
+        The jobs are polled together by one `ScopeJobManager` loop, instead of one
+        `check_job_status` loop per job. Use `job_manager` instead inside of a running event
+        loop, e.g. a notebook.
+
+        Args:
+            scope_script_paths (list): local scope script files
+            callback (callable): called with every `ScopeJob` when it is finished
+            kwargs: `ScopeJobManager` arguments, e.g. `min_poll_sec`, `max_poll_sec`
+
+        Returns:
+            list: one `ScopeJob` per script, in order, check `job.succeeded`, `job.state` and `job.job_id`
+
+        Example:
+            ```
+            jobs = cr.run_scope_many(['job1.script','job2.script'],max_poll_sec=300)
+            failed = [job for job in jobs if not job.succeeded]
+            ```
+        '''
+        import asyncio
+        manager = self.job_manager(**kwargs)
+        return asyncio.run(manager.run_scripts(scope_script_paths,callback=callback))
+
+    def download_file_as_csv(self,source_file_path:str,target_file_path:str) -> None:
+        '''
+        Download target ss file from Cosmos, and save as csv file. The function will also remove the "#Field:" from the csv header,
+        in place and with constant memory, so large exports do not need to fit in memory.
+
+        Args:
+            source_file_path (str): the file path without vc path included. e.g.: /users/username/filename.ss
+            local_file_path (str): the full local file path. e.g.: c:/cosmos_folder/filename.ss
+
+        Return:
+            None
+        '''
+        import subprocess
+        vc_file_path    = self.vc_path + source_file_path
+        args            = self._scope_args('export',vc_file_path,target_file_path,'-delims',',')
+
+        print(">",' '.join(args))
+        output_str = str(subprocess.run(args,capture_output=True))
+        print(output_str)
+
+        # Remove "#Field:" from the header
+        _strip_header_prefix(target_file_path,'#Field:')
+
+        print('download done')
+
+    def delete_file_from_cosmos(self,target_file_path:str):
+        '''
+        Delete file from cosmos
+
+        Args:
+            target_file_path (str):the file path without vc path included. e.g.: /users/username/filename.ss
+        '''
+        import subprocess
+        vc_file_path = self.vc_path + target_file_path
+        args = self._scope_args('delete',vc_file_path)
+        print('>',' '.join(args))
+        output_str = str(subprocess.run(args,capture_output=True))
+        print(output_str)
+
+    def _run_query_script(self,scope_script:str,output_paths:dict) -> None:
+        '''
+        Declare `@name` = cosmos path for every output, save the script to a temp file, run it
+        and wait until the job is done. The temp script file is always removed.
+        '''
+        output_declares = ''.join(f'#DECLARE {name} string = "{path}";\n' for name,path in output_paths.items())
+        scope_script    = output_declares + scope_script
+        print(scope_script)
+        temp_script_path = f'execution_temp_{uuid.uuid4()}.script'
+        with open(temp_script_path,'w',encoding="utf-8") as f:
+            f.write(scope_script)
+        try:
+            submit_process = self.run_scope(temp_script_path)
+            self.check_job_status(submit_process,check_times=720)
+        finally:
+            os.remove(temp_script_path)
+
+    def scope_query(
+        self
+        ,scope_script:str
+        ,temp_data_path = "/users/anzhu/query_temp"
+        ,temp_query_data = 'temp_query_data.csv'
+        ,output         = 'pandas'
+        ,chunk_rows     = 100000
+        ,parquet_path   = None
+        ,column_types   = None
+    ):
+        '''
+        With run_scope and download_file_as_csv function, the function goes a
+        step further to load the csv file into Pandas data frame.
+
+        Step 1. save scope_script to "temp.script"
+        Step 2. call run_scope function to submit the job, then remove the temp script file
+        Step 3. use check_job_status to check the job status until the job done
+        Step 4. use download_file_as_csv function to download the output data as csv
+        Step 5. Delete the temp query and data from cosmos
+        Step 6. load the csv file into pandas DataFrame, DataFrame chunks or a parquet file
+
+        For large outputs, `output='chunks'` and `output='parquet'` stream the local csv file
+        with pyarrow, only `chunk_rows` rows are in memory at a time. The column types are
+        inferred from the first rows of the file, use `column_types` when a column is empty
+        there.
+
+        Args
+            scope_script (str): the scope script writing its result to `@output`
+            temp_data_path (str): cosmos path prefix of the temp output stream
+            temp_query_data (str): local path of the downloaded csv file
+            output (str): `pandas` for one DataFrame, `chunks` for an iterator of DataFrame
+                chunks, `parquet` to convert the output into `parquet_path`
+            chunk_rows (int): rows per chunk, or per parquet row group
+            parquet_path (str): the local parquet file of `output='parquet'`
+            column_types (dict): {column: pyarrow type} overriding the inferred types of the
+                chunked outputs
+
+        Returns:
+            pd.DataFrame, Iterator of pd.DataFrame, or the number of rows written to `parquet_path`.
+            The chunk iterator removes the local csv file once it is exhausted or closed. An
+            iterator dropped before that removes it when garbage collected, or at interpreter
+            exit, call `close()` on it to remove the file at once.
+
+        Example:
+            ```
+            for df in cr.scope_query(scope_script,output='chunks',chunk_rows=500000):
+                print(len(df))
+            row_cnt = cr.scope_query(scope_script,output='parquet',parquet_path='result.parquet')
+            ```
+        '''
+        import pandas as pd
+        if output not in _scope_query_outputs:
+            raise ValueError(f"output should be one of {_scope_query_outputs}, got {output}")
+        if output == 'parquet' and not parquet_path:
+            raise ValueError("parquet_path is needed with output='parquet'")
+        guid             = str(uuid.uuid4())
+        # Step 0.
+        vc_temp_file_path = f"{temp_data_path}_{guid}.ss"
+
+        try:
+            # Step 1. - 3.
+            self._run_query_script(scope_script,{'output':vc_temp_file_path})
+
+            # Step 4.
+            self.download_file_as_csv(vc_temp_file_path,temp_query_data)
+        except:
+            _remove_file(temp_query_data)
+            raise
+        finally:
+            # Step 5. also when the job or the download fails
+            self.delete_file_from_cosmos(vc_temp_file_path)
+
+        # Step 6.
+        if output == 'chunks':
+            return _iter_csv_frames(temp_query_data,chunk_rows,column_types,remove_file=True)
+        try:
+            if output == 'parquet':
+                return _csv_to_parquet(temp_query_data,parquet_path,chunk_rows,column_types)
+            return pd.read_csv(temp_query_data)
+        finally:
+            os.remove(temp_query_data)
+
+    def scope_query_outputs(
+        self
+        ,scope_script:str
+        ,output_names:list
+        ,temp_data_path = "/users/anzhu/query_temp"
+        ,local_dir      = '.'
+        ,output         = 'pandas'
+        ,chunk_rows     = 100000
+        ,column_types   = None
+        ,max_workers    = 4
+    ) -> dict:
+        '''
+        Run a scope script with several outputs in one job, e.g. related aggregates of the same
+        large streams, instead of one job per output re-scanning the inputs.
+
+        A temp cosmos stream is declared for every name of `output_names`, the script writes to
+        them with `OUTPUT ... TO @name`. When the job is done, the outputs are downloaded in
+        parallel. All the temp streams and local files are removed, also when the job fails.
+
+        Args:
+            scope_script (str): the scope script writing to `@name` for every output name
+            output_names (list): names of the outputs, e.g. ['daily','by_market']
+            temp_data_path (str): cosmos path prefix of the temp output streams
+            local_dir (str): folder of the downloaded csv files, and of the parquet files
+            output (str): `pandas` for DataFrames, `parquet` to convert every output into
+                `local_dir/<name>.parquet`
+            chunk_rows (int): rows per parquet row group
+            column_types (dict): {output name: {column: pyarrow type}} for the parquet outputs
+            max_workers (int): max number of outputs downloaded at the same time
+
+        Returns:
+            dict: {output name: pd.DataFrame}, or {output name: number of rows} with `output='parquet'`
+
+        Example:
+            ```
+            scope_script = """
+            data = SSTREAM "/shares/my_stream.ss";
+            daily = SELECT Date, COUNT() AS cnt FROM data GROUP BY Date;
+            by_market = SELECT Market, COUNT() AS cnt FROM data GROUP BY Market;
+            OUTPUT daily TO SSTREAM @daily;
+            OUTPUT by_market TO SSTREAM @by_market;
+            """
+            dfs = cr.scope_query_outputs(scope_script,['daily','by_market'])
+            dfs['daily'].head()
+            ```
+        '''
+        import pandas as pd
+        from concurrent.futures import ThreadPoolExecutor
+        if output not in ('pandas','parquet'):
+            raise ValueError(f"output should be 'pandas' or 'parquet', got {output}")
+        output_names = list(output_names)
+        if not output_names or len(set(output_names)) != len(output_names):
+            raise ValueError(f'output_names should be distinct names, got {output_names}')
+        for name in output_names:
+            if not _output_name_re.fullmatch(name):
+                raise ValueError(f'output name {name} is not a valid scope parameter name')
+        column_types = column_types or {}
+        guid         = str(uuid.uuid4())
+        vc_paths     = {name:f"{temp_data_path}_{guid}_{name}.ss" for name in output_names}
+        local_paths  = {name:os.path.join(local_dir,f'temp_query_data_{guid}_{name}.csv') for name in output_names}
+
+        def fetch(name):
+            self.download_file_as_csv(vc_paths[name],local_paths[name])
+            if output == 'parquet':
+                parquet_path = os.path.join(local_dir,f'{name}.parquet')
+                return _csv_to_parquet(local_paths[name],parquet_path,chunk_rows,column_types.get(name))
+            return pd.read_csv(local_paths[name])
+
+        workers = max(1,min(max_workers,len(output_names)))
+        try:
+            self._run_query_script(scope_script,vc_paths)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = dict(zip(output_names,executor.map(fetch,output_names)))
+        finally:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self.delete_file_from_cosmos,vc_paths.values()))
+            for local_path in local_paths.values():
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+        return results
+
+# endregion
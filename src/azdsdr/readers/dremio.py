@@ -0,0 +1,701 @@
+# region Dremio
+from typing import TYPE_CHECKING,Iterator
+import datetime
+import decimal
+import threading
+import re
+import warnings
+
+from .config import load_config,update_config
+from .pool import ConnectionPool
+from .scheduler import resolve_scheduler
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+# pandas dtypes for the python types reported in pyodbc `cursor.description`, nullable
+# dtypes are used so the dtype of a column is the same in every chunk.
+_pandas_dtypes = {
+    int                 : 'Int64'
+    ,float              : 'float64'
+    ,decimal.Decimal    : 'float64'
+    ,bool               : 'boolean'
+    ,datetime.datetime  : 'datetime64[ns]'
+    ,datetime.date      : 'datetime64[ns]'
+}
+
+_cacheable_sql_re = re.compile(r'\s*(\(\s*)*(select|with|values)\b',re.IGNORECASE)
+
+def _pandas_dtype(type_code) -> str:
+    return _pandas_dtypes.get(type_code,'object')
+
+def _arrow_type(column_description) -> 'pa.DataType':
+    import pyarrow as pa
+    _,type_code,_,_,precision,scale,_ = column_description
+    if type_code is bool:
+        return pa.bool_()
+    if type_code is int:
+        return pa.int64()
+    if type_code is float:
+        return pa.float64()
+    if type_code is decimal.Decimal:
+        if precision and 0 < precision <= 38:
+            return pa.decimal128(precision,scale or 0)
+        return pa.decimal128(38,scale or 10)
+    if type_code is datetime.datetime:
+        return pa.timestamp('us')
+    if type_code is datetime.date:
+        return pa.date32()
+    if type_code is datetime.time:
+        return pa.time64('us')
+    if type_code in (bytes,bytearray):
+        return pa.binary()
+    return pa.string()
+
+def _arrow_schema(description) -> 'pa.Schema':
+    import pyarrow as pa
+    return pa.schema([(d[0],_arrow_type(d)) for d in description])
+
+def _fetch_chunks(cursor,chunk_rows) -> Iterator[list]:
+    '''
+    Yield lists of at most `chunk_rows` rows from an executed cursor
+    '''
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        yield rows
+
+def _rows_to_frame(rows,description) -> 'pd.DataFrame':
+    import pandas as pd
+    columns = [d[0] for d in description]
+    df      = pd.DataFrame.from_records([tuple(r) for r in rows],columns=columns,coerce_float=True)
+    return df.astype({d[0]:_pandas_dtype(d[1]) for d in description})
+
+def _arrow_to_frame(batch) -> 'pd.DataFrame':
+    import pandas as pd
+    import pyarrow as pa
+    # same nullable dtypes as the odbc chunks, so integer columns do not turn into float when a chunk has nulls
+    types_mapper = {
+        pa.int64()  : pd.Int64Dtype()
+        ,pa.int32() : pd.Int64Dtype()
+        ,pa.bool_() : pd.BooleanDtype()
+    }.get
+    return batch.to_pandas(types_mapper=types_mapper)
+
+def _read_sql(sql_query,connection) -> 'pd.DataFrame':
+    import pandas as pd
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore',UserWarning)
+        return pd.read_sql(sql_query,connection)
+
+def _downcast_int_type(col) -> 'pa.DataType':
+    '''
+    Return the smallest signed integer type holding every value of the integer column
+    '''
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    min_max = pc.min_max(col)
+    col_min,col_max = min_max['min'].as_py(),min_max['max'].as_py()
+    if col_min is None:
+        return pa.int8()
+    for int_type,bits in ((pa.int8(),8),(pa.int16(),16),(pa.int32(),32)):
+        if -2**(bits-1) <= col_min and col_max < 2**(bits-1):
+            return int_type
+    return pa.int64()
+
+def _compact_frame(
+    table
+    ,category_ratio = 0.5
+    ,downcast_int   = True
+    ,downcast_float = False
+    ,decimal_to_float = True
+) -> 'pd.DataFrame':
+    '''
+    Convert a pyarrow Table to pandas with compact dtypes, the columns are shrunk in Arrow
+    before the conversion so no large intermediate object column is built.
+
+    Args:
+        table (pa.Table): the table to convert
+        category_ratio (float): string columns whose distinct count is at most this ratio of
+            the row count become pandas categoricals. Set as 0 to keep strings as is.
+        downcast_int (bool): store integer columns in the smallest integer type holding their values
+        downcast_float (bool): store float columns as float32, lossy
+        decimal_to_float (bool): convert decimal columns to float64 instead of python Decimal objects
+    '''
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns = []
+    for field,col in zip(table.schema,table.columns):
+        col_type = field.type
+        if pa.types.is_integer(col_type) and downcast_int:
+            col = col.cast(_downcast_int_type(col))
+        elif pa.types.is_floating(col_type) and downcast_float:
+            col = col.cast(pa.float32())
+        elif pa.types.is_decimal(col_type) and decimal_to_float:
+            col = col.cast(pa.float64())
+        elif (
+            (pa.types.is_string(col_type) or pa.types.is_large_string(col_type))
+            and category_ratio > 0
+            and len(col) > 0
+            and pc.count_distinct(col).as_py() <= category_ratio * len(col)
+        ):
+            col = col.dictionary_encode()
+        columns.append(col)
+    table = pa.Table.from_arrays(columns,names=table.column_names)
+
+    # nullable pandas dtypes keep integer and bool columns with nulls from turning into float/object
+    types_mapper = {
+        pa.int8()   : pd.Int8Dtype()
+        ,pa.int16() : pd.Int16Dtype()
+        ,pa.int32() : pd.Int32Dtype()
+        ,pa.int64() : pd.Int64Dtype()
+        ,pa.bool_() : pd.BooleanDtype()
+    }.get
+    return table.to_pandas(types_mapper=types_mapper,self_destruct=True,split_blocks=True)
+
+def _sql_literal(value) -> str:
+    '''
+    Format a python value as a Dremio sql literal, used in partition filters
+    '''
+    if isinstance(value,datetime.datetime):
+        return f"TIMESTAMP '{value.strftime('%Y-%m-%d %H:%M:%S.%f')[:23]}'"
+    if isinstance(value,datetime.date):
+        return f"DATE '{value.isoformat()}'"
+    if isinstance(value,str):
+        return "'" + value.replace("'","''") + "'"
+    return str(value)
+
+def _split_points(min_value,max_value,partitions) -> list:
+    '''
+    Return `partitions - 1` evenly spaced split points between min_value and max_value
+    '''
+    points = []
+    for i in range(1,partitions):
+        if isinstance(min_value,int):
+            point = min_value + (max_value - min_value) * i // partitions
+        else:
+            point = min_value + (max_value - min_value) * i / partitions
+        # a small integer or date range can not be split in as many partitions
+        if point > min_value and (not points or point > points[-1]):
+            points.append(point)
+    return points
+
+def _partition_queries(sql_query,partition_column,split_points) -> list:
+    '''
+    Rewrite the query into len(split_points)+1 range filtered queries covering every row,
+    rows with a null partition value go to the first partition.
+    '''
+    sql_query   = sql_query.strip().rstrip(';')
+    col         = f"azdsdr_src.{partition_column}"
+    bounds      = [None] + list(split_points) + [None]
+    queries     = []
+    for lower,upper in zip(bounds[:-1],bounds[1:]):
+        conditions = []
+        if lower is not None:
+            conditions.append(f"{col} >= {_sql_literal(lower)}")
+        if upper is not None:
+            conditions.append(f"{col} < {_sql_literal(upper)}")
+        where = ' AND '.join(conditions) or '1 = 1'
+        if lower is None:
+            where = f"({where}) OR {col} IS NULL"
+        queries.append(f"SELECT * FROM ({sql_query}) AS azdsdr_src WHERE {where}")
+    return queries
+
+def _rows_to_record_batch(rows,schema) -> 'pa.RecordBatch':
+    import pyarrow as pa
+    columns = list(zip(*rows))
+    arrays  = [pa.array(columns[i],type=field.type) for i,field in enumerate(schema)]
+    return pa.RecordBatch.from_arrays(arrays,schema=schema)
+
+class DremioReader:
+    def __init__(
+        self
+        ,username
+        ,token      = None
+        ,host       = "dremio-mcds.trafficmanager.net"
+        ,port       = 31010
+        ,driver     = "Dremio Connector"
+        ,transport  = "odbc"
+        ,flight_port= 32010
+        ,flight_tls = True
+        ,pool_size  = 4
+        ,result_cache = None
+        ,scheduler  = None
+    ) -> None:
+        '''
+        Initialize the Dremio connection, the connection object will be saved for sql queries
+
+        Args:
+            username (str): your dremio login email in format <alias>@microsoft.com
+            token (str): steps to generate the token: click username -> Account Settings -> Personal Access Tokens.
+                         The token need to be provided at the first time using it. the token will be cached in file
+                         `~/.azdsdr_conf.json` file.
+            host (str): your target dremio host
+            port (int): the port to connect dremko, default value set as 31010
+            driver (str): the odbc driver name you give when you setup the Dremio odbc driver.
+            transport (str): `odbc` or `flight`. `flight` reads the result as Arrow columnar batches from the
+                         Dremio Arrow Flight endpoint, without converting every row to Python objects. If the
+                         flight connection fails, the reader falls back to odbc.
+            flight_port (int): the Dremio Arrow Flight port, default value set as 32010
+            flight_tls (bool): connect to the Arrow Flight endpoint with TLS
+            pool_size (int): max number of odbc connections opened by `run_sql_many` and other concurrent calls.
+            result_cache (ResultCache): an optional `azdsdr.readers.ResultCache`, `run_sql` and `run_sql_many`
+                         results of select queries are cached there.
+            scheduler (AdaptiveScheduler): send queries through this shared `azdsdr.readers.AdaptiveScheduler`,
+                         which limits the concurrent queries per host and retries throttled and busy errors.
+                         True uses the process wide scheduler.
+
+        Example:
+            ```
+            from azdsdr.readers import DremioReader
+            username    = "abc@abc.com"
+            dr          = DremioReader(username=username)
+            ```
+        '''
+        if transport not in ('odbc','flight'):
+            raise ValueError(f"transport should be 'odbc' or 'flight', got {transport}")
+
+        # load token from configuration file if token is not provided.
+        if not token:
+            token = load_config()['dremio_token']
+        else:
+            # the token is provided in the parameter. add or update the original token
+            update_config('dremio_token',token)
+
+        # raise exception if no token is provided.
+        if not token:
+            raise Exception('No dremio token is found from config file either parameter.')
+
+        self.transport      = transport
+        self.host           = host
+        self.username       = username
+        self.result_cache   = result_cache
+        self.connection     = None
+        self.flight_client  = None
+        self.pool_size      = pool_size
+        self._pool          = None
+        self._pool_lock     = threading.Lock()
+        self.scheduler      = resolve_scheduler(scheduler)
+        self.backend        = f'dremio|{host}'
+        # also used with the flight transport, by `run_sql_typed(engine='arrow-odbc')`
+        self._odbc_conn_str = f"Driver={driver};ConnectionType=Direct;HOST={host};PORT={port};AuthenticationType=Plain;UID={username};PWD={token};ssl=1"
+        if transport == 'flight':
+            try:
+                self._connect_flight(username,token,host,flight_port,flight_tls)
+            except Exception as err:
+                warnings.warn(f"Connect to dremio via arrow flight error, fall back to odbc. {err}")
+                self.transport = 'odbc'
+
+        if self.transport == 'odbc':
+            import pyodbc
+            try:
+                self.connection = pyodbc.connect(self._odbc_conn_str,autocommit=True)
+            except:
+                self.connection = None
+                raise Exception('Connect to dremio via pyodbc error. Please check host, port, username and Dremio token.')
+
+    def _connect_flight(self,username,token,host,flight_port,flight_tls) -> None:
+        from pyarrow import flight
+        scheme              = 'grpc+tls' if flight_tls else 'grpc+tcp'
+        self.flight_client  = flight.FlightClient(f"{scheme}://{host}:{flight_port}")
+        # dremio takes the personal access token as the basic auth password and returns a bearer token header
+        bearer_header       = self.flight_client.authenticate_basic_token(username,token)
+        self.flight_options = flight.FlightCallOptions(headers=[bearer_header])
+
+    def _call(self,sql_query:str,fn,*args,**kwargs):
+        '''
+        Send a query to Dremio, through the scheduler when the reader has one. Throttled
+        calls are only retried for read-only queries, DDL and DML may have run already.
+        '''
+        if self.scheduler is None:
+            return fn(*args,**kwargs)
+        idempotent = _cacheable_sql_re.match(sql_query) is not None
+        return self.scheduler.run(self.backend,fn,*args,idempotent=idempotent,**kwargs)
+
+    def run_sql(self,sql_query:str) -> 'pd.DataFrame':
+        '''
+        run input sql query on Dremio and return the result as Pandas Dataframe
+
+        Args:
+            sql_query (str): The sql query used to query Dremio data
+
+        Returns:
+            pd.DataFrame: pandas DataFrame containing results of SQL query from Dremio
+        '''
+        return self._run_cached(sql_query,self._run_sql)
+
+    def _run_sql(self,sql_query:str) -> 'pd.DataFrame':
+        if self.transport == 'flight':
+            return self.run_sql_arrow(sql_query).to_pandas()
+        return self._call(sql_query,_read_sql,sql_query,self.connection)
+
+    def _run_cached(self,sql_query:str,run) -> 'pd.DataFrame':
+        # only read-only queries are served from the result cache
+        if self.result_cache is not None and _cacheable_sql_re.match(sql_query):
+            return self.result_cache.get_or_run(
+                f'dremio|{self.host}|{self.username}'
+                ,sql_query
+                ,lambda: run(sql_query)
+            )
+        return run(sql_query)
+
+    @property
+    def pool(self) -> ConnectionPool:
+        '''
+        The odbc connection pool used by concurrent calls, created at the first use.
+        '''
+        with self._pool_lock:
+            if self._pool is None:
+                import pyodbc
+                self._pool = ConnectionPool(
+                    lambda: pyodbc.connect(self._odbc_conn_str,autocommit=True)
+                    ,max_size = self.pool_size
+                )
+            return self._pool
+
+    def _run_sql_pooled(self,sql_query:str) -> 'pd.DataFrame':
+        if self.transport == 'flight':
+            # the flight client is thread-safe, no pool is needed. Not cached here, like the odbc path,
+            # `_run_sql_pooled_cached` adds the cache
+            return self._run_sql(sql_query)
+        with self.pool.connection() as conn:
+            return self._call(sql_query,_read_sql,sql_query,conn)
+
+    def _run_sql_pooled_cached(self,sql_query:str) -> 'pd.DataFrame':
+        return self._run_cached(sql_query,self._run_sql_pooled)
+
+    def run_sql_many(self,sql_queries:list,max_workers=None) -> list:
+        '''
+        Run a list of independent sql queries concurrently, each query runs on its own
+        connection borrowed from the connection pool.
+
+        Args:
+            sql_queries (list): list of sql queries
+            max_workers (int): max number of queries running at the same time, default is `pool_size`
+
+        Returns:
+            list: results in the same order as the input queries. The result of a failed query is
+                  the exception it raised, so one failed query does not lose the other results.
+
+        Example:
+            ```
+            rs = dr.run_sql_many([sql1,sql2,sql3],max_workers=3)
+            for sql,r in zip([sql1,sql2,sql3],rs):
+                if isinstance(r,Exception):
+                    print('query failed',sql,r)
+            ```
+        '''
+        from concurrent.futures import ThreadPoolExecutor
+        max_workers = max_workers or self.pool_size
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._run_sql_pooled_cached,sql) for sql in sql_queries]
+        results = []
+        for i,future in enumerate(futures):
+            error = future.exception()
+            if error is not None:
+                print(f'query {i} failed: {error}')
+                results.append(error)
+            else:
+                results.append(future.result())
+        return results
+
+    def _plan_partitions(self,sql_query,partition_column,partitions,boundaries) -> list:
+        if boundaries is None:
+            bounds_sql = (
+                f"SELECT MIN(azdsdr_src.{partition_column}) AS min_value, MAX(azdsdr_src.{partition_column}) AS max_value "
+                f"FROM ({sql_query.strip().rstrip(';')}) AS azdsdr_src"
+            )
+            r = self._run_sql_pooled(bounds_sql)
+            min_value,max_value = r['min_value'][0],r['max_value'][0]
+            # numpy and pandas scalars to plain python values
+            min_value,max_value = [v.item() if hasattr(v,'item') else v for v in (min_value,max_value)]
+            if hasattr(min_value,'to_pydatetime'):
+                min_value,max_value = min_value.to_pydatetime(),max_value.to_pydatetime()
+            if min_value is None or min_value != min_value:
+                # empty result or only null partition values
+                boundaries = []
+            else:
+                boundaries = _split_points(min_value,max_value,partitions)
+        return _partition_queries(sql_query,partition_column,sorted(boundaries))
+
+    def iter_sql_partitioned(
+        self
+        ,sql_query:str
+        ,partition_column:str
+        ,partitions     = 8
+        ,boundaries     = None
+        ,max_workers    = None
+    ) -> Iterator:
+        '''
+        Same as `run_sql_partitioned`, but yield `(partition_index, pd.DataFrame)` as soon as each
+        partition is done, so the partitions can be processed or written out one by one.
+        '''
+        from concurrent.futures import ThreadPoolExecutor,as_completed
+        queries     = self._plan_partitions(sql_query,partition_column,partitions,boundaries)
+        max_workers = max_workers or min(len(queries),self.pool_size)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._run_sql_pooled,q):i for i,q in enumerate(queries)}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future],future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def run_sql_partitioned(
+        self
+        ,sql_query:str
+        ,partition_column:str
+        ,partitions     = 8
+        ,boundaries     = None
+        ,max_workers    = None
+    ) -> 'pd.DataFrame':
+        '''
+        Split one large query into range filtered queries on `partition_column` and run them
+        concurrently on separate pooled connections, then merge the results in partition order.
+
+        The query is wrapped as `SELECT * FROM (<sql_query>) AS azdsdr_src WHERE <range filter>`. Without
+        `boundaries`, the min and max of the column are queried first and split in even ranges.
+
+        Args:
+            sql_query (str): The sql query used to query Dremio data
+            partition_column (str): a numeric, date or timestamp column of the query result, quote it
+                with double quotes if needed
+            partitions (int): number of partitions when boundaries are not provided
+            boundaries (list): optional split points, N split points make N+1 partitions
+            max_workers (int): max number of partitions running at the same time, default is `pool_size`
+
+        Returns:
+            pd.DataFrame: pandas DataFrame containing results of SQL query from Dremio
+
+        Example:
+            ```
+            df = dr.run_sql_partitioned(sql,partition_column='event_date',partitions=16)
+            ```
+        '''
+        import pandas as pd
+        results = dict(self.iter_sql_partitioned(
+            sql_query
+            ,partition_column
+            ,partitions     = partitions
+            ,boundaries     = boundaries
+            ,max_workers    = max_workers
+        ))
+        return pd.concat([results[i] for i in sorted(results)],ignore_index=True)
+
+    def close(self) -> None:
+        '''
+        Close the odbc connection and all pooled connections
+        '''
+        if self._pool is not None:
+            self._pool.close()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def run_sql_arrow(self,sql_query:str) -> 'pa.Table':
+        '''
+        run input sql query on Dremio and return the result as pyarrow Table. With the `flight`
+        transport the Arrow batches from Dremio are used as is, no per-row conversion happens.
+
+        Args:
+            sql_query (str): The sql query used to query Dremio data
+
+        Returns:
+            pa.Table: pyarrow Table containing results of SQL query from Dremio
+        '''
+        import pyarrow as pa
+        schema,batches = self._open_arrow_stream(sql_query)
+        return pa.Table.from_batches(batches,schema=schema)
+
+    def run_sql_typed(
+        self
+        ,sql_query:str
+        ,chunk_rows         = 100000
+        ,category_ratio     = 0.5
+        ,downcast_int       = True
+        ,downcast_float     = False
+        ,decimal_to_float   = True
+        ,engine             = 'auto'
+    ) -> 'pd.DataFrame':
+        '''
+        run input sql query on Dremio and return the result as a Pandas Dataframe with compact dtypes.
+
+        Rows are fetched in batches into typed Arrow column buffers built from the result schema,
+        instead of the object columns `pd.read_sql` makes. Then low cardinality strings become
+        categoricals and numbers are downcast, which can cut the memory of large extracts by several times.
+
+        Args:
+            sql_query (str): The sql query used to query Dremio data
+            chunk_rows (int): number of rows fetched per batch
+            category_ratio (float): string columns whose distinct count is at most this ratio of
+                the row count become categoricals. Set as 0 to keep all strings.
+            downcast_int (bool): store integer columns in the smallest integer type holding their values
+            downcast_float (bool): store float columns as float32, lossy
+            decimal_to_float (bool): convert decimal columns to float64 instead of python Decimal objects
+            engine (str): `cursor` builds the Arrow batches from pyodbc `fetchmany` rows, it needs the
+                `odbc` transport. `arrow-odbc` uses the optional `arrow-odbc` package to fill the column
+                buffers straight from the driver, it needs the Dremio odbc driver also with the `flight`
+                transport. `auto` uses Arrow Flight with the `flight` transport, else `arrow-odbc` if it
+                is installed.
+
+        Returns:
+            pd.DataFrame: pandas DataFrame containing results of SQL query from Dremio
+        '''
+        import pyarrow as pa
+        if engine not in ('auto','cursor','arrow-odbc'):
+            raise ValueError(f"engine should be 'auto', 'cursor' or 'arrow-odbc', got {engine}")
+        if engine == 'cursor' and self.transport != 'odbc':
+            raise ValueError(f"engine 'cursor' needs the odbc transport, the reader uses {self.transport}")
+        if engine == 'auto' and self.transport == 'odbc':
+            try:
+                import arrow_odbc
+                engine = 'arrow-odbc'
+            except ImportError:
+                engine = 'cursor'
+
+        if engine == 'arrow-odbc':
+            from arrow_odbc import read_arrow_batches_from_odbc
+            reader  = self._call(
+                sql_query
+                ,read_arrow_batches_from_odbc
+                ,query               = sql_query
+                ,connection_string  = self._odbc_conn_str
+                ,batch_size         = chunk_rows
+            )
+            table   = pa.Table.from_batches(reader,schema=reader.schema)
+        else:
+            schema,batches = self._open_arrow_stream(sql_query,chunk_rows)
+            table   = pa.Table.from_batches(batches,schema=schema)
+
+        return _compact_frame(
+            table
+            ,category_ratio     = category_ratio
+            ,downcast_int       = downcast_int
+            ,downcast_float     = downcast_float
+            ,decimal_to_float   = decimal_to_float
+        )
+
+    def _execute(self,sql_query:str):
+        cursor = self.connection.cursor()
+        try:
+            self._call(sql_query,cursor.execute,sql_query)
+        except:
+            cursor.close()
+            raise
+        return cursor
+
+    def _open_arrow_stream(self,sql_query:str,chunk_rows=100000):
+        '''
+        Run the query and return the result schema and an iterator of pyarrow.RecordBatch
+        '''
+        if self.transport == 'flight':
+            from pyarrow import flight
+            descriptor  = flight.FlightDescriptor.for_command(sql_query)
+            flight_info = self._call(sql_query,self.flight_client.get_flight_info,descriptor,self.flight_options)
+            return flight_info.schema,self._iter_flight_batches(flight_info)
+
+        cursor = self._execute(sql_query)
+        try:
+            schema = _arrow_schema(cursor.description)
+        except:
+            cursor.close()
+            raise
+        return schema,self._iter_cursor_batches(cursor,schema,chunk_rows)
+
+    def _iter_flight_batches(self,flight_info) -> Iterator['pa.RecordBatch']:
+        for endpoint in flight_info.endpoints:
+            reader = self.flight_client.do_get(endpoint.ticket,self.flight_options)
+            for chunk in reader:
+                if chunk.data is not None:
+                    yield chunk.data
+
+    def _iter_cursor_batches(self,cursor,schema,chunk_rows) -> Iterator['pa.RecordBatch']:
+        try:
+            for rows in _fetch_chunks(cursor,chunk_rows):
+                yield _rows_to_record_batch(rows,schema)
+        finally:
+            cursor.close()
+
+    def iter_sql(self,sql_query:str,chunk_rows=100000,output='pandas') -> Iterator:
+        '''
+        Run input sql query on Dremio and stream the result in chunks, only one chunk is held
+        in memory at a time. The column types come from the result schema, so every chunk
+        has the same dtypes (nullable `Int64`/`boolean` for integer and bool columns).
+
+        With the `flight` transport, the chunks are the record batches sent by Dremio and
+        `chunk_rows` is not used.
+
+        Args:
+            sql_query (str): The sql query used to query Dremio data
+            chunk_rows (int): max number of rows of each chunk
+            output (str): `pandas` to yield pd.DataFrame chunks, `arrow` to yield pyarrow.RecordBatch chunks
+
+        Returns:
+            Iterator: pd.DataFrame or pyarrow.RecordBatch chunks
+
+        Example:
+            ```
+            for df in dr.iter_sql(sql,chunk_rows=50000):
+                print(len(df))
+            ```
+        '''
+        if output not in ('pandas','arrow'):
+            raise ValueError(f"output should be 'pandas' or 'arrow', got {output}")
+
+        if self.transport == 'flight':
+            _,batches = self._open_arrow_stream(sql_query)
+            for batch in batches:
+                yield batch if output == 'arrow' else _arrow_to_frame(batch)
+            return
+
+        cursor = self._execute(sql_query)
+        try:
+            description = cursor.description
+            if output == 'arrow':
+                schema = _arrow_schema(description)
+                for rows in _fetch_chunks(cursor,chunk_rows):
+                    yield _rows_to_record_batch(rows,schema)
+            else:
+                for rows in _fetch_chunks(cursor,chunk_rows):
+                    yield _rows_to_frame(rows,description)
+        finally:
+            cursor.close()
+
+    def write_sql_to_file(self,sql_query:str,file_path:str,file_format='parquet',chunk_rows=100000) -> int:
+        '''
+        Run input sql query on Dremio and stream the result into a local parquet or csv file
+        chunk by chunk, memory usage stays bounded whatever the result size.
+
+        Args:
+            sql_query (str): The sql query used to query Dremio data
+            file_path (str): the local output file path
+            file_format (str): `parquet` or `csv`
+            chunk_rows (int): number of rows fetched and written at a time, one parquet row group per chunk
+
+        Returns:
+            int: number of rows written
+        '''
+        if file_format not in ('parquet','csv'):
+            raise ValueError(f"file_format should be 'parquet' or 'csv', got {file_format}")
+        if file_format == 'parquet':
+            from pyarrow.parquet import ParquetWriter as writer_class
+        else:
+            from pyarrow.csv import CSVWriter as writer_class
+
+        row_cnt         = 0
+        schema,batches  = self._open_arrow_stream(sql_query,chunk_rows)
+        try:
+            # the writer is created from the schema, so an empty result still gets a valid file
+            with writer_class(file_path,schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    row_cnt += batch.num_rows
+        finally:
+            batches.close()
+        return row_cnt
+# endregion
@@ -0,0 +1,1083 @@
+# region Kusto
+from typing import TYPE_CHECKING,Iterator
+import json
+from datetime import timedelta
+import traceback
+import copy
+import uuid
+import time
+import re
+
+from .kusto_convert import _kusto_arrow_type,kusto_rows_to_frame,kusto_result_to_frame
+from .kusto_schema import KustoSchemaCatalog,is_schema_command
+from .kusto_ingest import IngestHandle,IngestTracker,_frame_chunks,ingest_frame_chunk,ingestion_path
+from .scheduler import resolve_scheduler
+from .kusto_stats import QueryStatsRecorder
+from .kusto_mirror import KustoMirror
+from .kusto_types import coerce_frame_to_schema,create_csv_mapping_kql,create_table_kql,csv_mapping_name,infer_csv_schema,infer_kusto_schema
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+def _build_properties(timeout_hours):
+    from azure.kusto.data import ClientRequestProperties
+    properties = ClientRequestProperties()
+    properties.set_option(properties.results_defer_partial_query_failures_option_name, True)
+    properties.set_option(properties.request_timeout_option_name, timedelta(seconds=60 * 60 * timeout_hours))
+    return properties
+
+# queries and `.show` commands, safe to run again when the cluster throttles; other management
+# commands (`.append`, `.set-or-replace`, ingestion) may have run before the throttled response
+_read_only_kql_re = re.compile(r'\s*(?:[^.\s]|\.show\b)',re.IGNORECASE)
+
+def _print_kusto_error(error) -> None:
+    print('something wrong')
+    print("Is semantic error:", error.is_semantic_error())
+    print("Has partial results:", error.has_partial_results())
+    traceback.print_exc()
+
+# region query batching
+# string literals and comments, where a `;` does not end a statement
+_kql_literal_re = re.compile(r'''```[\s\S]*?```|//[^\n]*|@'[^']*'|@"[^"]*"|'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"''')
+
+def _strip_statement_end(kql:str) -> str:
+    return kql.strip().rstrip(';').rstrip()
+
+def _is_batchable_kql(kql:str) -> bool:
+    '''
+    A query can share a request with other queries if it is a single tabular statement.
+    `let`/`set`/`declare` statements would leak into the other queries of the batch, and
+    control commands can not be mixed with queries.
+    '''
+    kql = _strip_statement_end(kql)
+    return not kql.startswith('.') and ';' not in _kql_literal_re.sub('',kql)
+
+def _pack_kql_batches(kql_list:list,max_batch_queries:int,max_batch_chars:int) -> list:
+    '''
+    Greedily pack query indexes, in input order, into batches within the query count and text size limits
+    '''
+    batches = []
+    batch   = []
+    chars   = 0
+    for i,kql in enumerate(kql_list):
+        if not _is_batchable_kql(kql):
+            batches.append([i])
+            continue
+        size = len(kql) + 3
+        if batch and (len(batch) >= max_batch_queries or chars + size > max_batch_chars):
+            batches.append(batch)
+            batch,chars = [],0
+        batch.append(i)
+        chars += size
+    if batch:
+        batches.append(batch)
+    return batches
+# endregion
+
+# region metadata kql, shared by KustoReader and AsyncKustoReader
+def _table_exist_kql(table_name) -> str:
+    return f'''
+        .show database schema
+        | where isnotempty(TableName)
+        | where TableName =~ '{table_name}'
+        | distinct TableName
+        '''
+
+def _list_tables_kql(folder_name=None) -> str:
+    if folder_name:
+        return f'''.show database schema
+            | where isnotempty(TableName)
+            | where isempty(ColumnName)
+            | where Folder contains "{folder_name}"
+            | project
+                DatabaseName
+                ,TableName
+                ,Folder
+                ,DocString
+            | order by
+                TableName asc'''
+    return '''.show database schema
+            | where isnotempty(TableName)
+            | distinct
+                DatabaseName
+                ,TableName
+                ,Folder
+                ,DocString
+            | order by
+                TableName asc
+            '''
+
+def _table_schema_kql(table_name) -> str:
+    return f'''
+        {table_name}
+        | getschema
+        | order by ColumnOrdinal asc
+        '''
+
+def _table_folder_kql(table_name) -> str:
+    return f'''
+        .show table {table_name} details
+        '''
+
+def _schema_string(r) -> str:
+    '''
+    Turn a `getschema` result into "ColumnName1:type2,ColumnName2:type2"
+    '''
+    col_name_type_pair_list = []
+    for _,row in r[["ColumnName","ColumnType"]].iterrows():
+        pair_string = f"{row['ColumnName']}:{row['ColumnType']}"
+        col_name_type_pair_list.append(pair_string)
+    return ",".join(col_name_type_pair_list)
+# endregion
+
+# region parquet output
+# row number column added to stored query results, pages are row number ranges
+_page_row_column = 'azdsdr_row'
+
+def _write_parquet_chunks(chunks,file_path) -> int:
+    '''
+    Write (columns, raw rows) chunks into a parquet file, one row group per chunk
+    '''
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    row_cnt = 0
+    writer  = None
+    try:
+        for columns,rows in chunks:
+            if writer is None:
+                schema = pa.schema([(c.column_name,_kusto_arrow_type(c.column_type)) for c in columns])
+                writer = pq.ParquetWriter(file_path,schema)
+            df = kusto_rows_to_frame(rows,columns)
+            for c in columns:
+                if c.column_type.lower() == 'dynamic':
+                    df[c.column_name] = [None if v is None else json.dumps(v) for v in df[c.column_name]]
+            writer.write_table(pa.Table.from_pandas(df,schema=schema,preserve_index=False))
+            row_cnt += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return row_cnt
+# endregion
+
+class KustoReader:
+    def __init__(self
+                ,cluster              = "https://help.kusto.windows.net"
+                ,db                   = "Samples"
+                ,ingest_cluster_str   = None
+                ,timeout_hours        = 1
+                ,use_token_cache      = True
+                ,result_cache         = None
+                ,schema_cache_ttl_sec = 300
+                ,ingest_mode          = 'queued'
+                ,streaming_max_mb     = 4
+                ,scheduler            = None
+                ,query_stats          = True
+                ) -> None:
+        '''
+        Initilize Kusto connection with additional timeout settings
+
+        Args:
+            use_token_cache (bool): get Azure CLI tokens through the shared token cache of
+                `azdsdr.readers.auth`, so the `az` command is not called again by every reader
+                object and worker process. Set as False to let the Kusto SDK call `az` itself.
+            result_cache (ResultCache): an optional `azdsdr.readers.ResultCache`, `run_kql` results
+                of queries (not control commands) are cached there.
+            schema_cache_ttl_sec (int): `is_table_exist`, `list_tables`, `get_table_schema` and
+                `get_table_folder` are answered from a `KustoSchemaCatalog` of the database, which
+                is checked for changes after these seconds. Set as None to query the cluster at every call.
+            ingest_mode (str): 'queued' (default) or 'streaming'. In streaming mode payloads up to
+                `streaming_max_mb` are sent to the streaming endpoint of the query cluster and are
+                visible in seconds, larger or throttled payloads fall back to queued ingestion.
+                The table needs a streaming ingestion policy.
+            streaming_max_mb (float): max payload size sent through streaming ingestion
+            scheduler (AdaptiveScheduler): send queries and ingestions through this shared
+                `azdsdr.readers.AdaptiveScheduler`, which limits the concurrent calls per cluster
+                and retries throttled ones. True uses the process wide scheduler.
+            query_stats (QueryStatsRecorder): record the client request id, wall time and server
+                resource consumption of every query in this `azdsdr.readers.QueryStatsRecorder`.
+                True (default) keeps the last 1000 queries in `kr.query_stats`, None disables it.
+        '''
+        from azure.kusto.data import KustoClient
+        self.use_token_cache = use_token_cache
+        kcsb                = self._build_kcsb(cluster)
+        self.cluster        = cluster
+        self.db = db
+        self.result_cache   = result_cache
+        self.kusto_client   = KustoClient(kcsb)
+        self.timeout_hours  = timeout_hours
+        self.properties     = _build_properties(timeout_hours)
+        self.schema_catalog = KustoSchemaCatalog(self,ttl_sec=schema_cache_ttl_sec) if schema_cache_ttl_sec is not None else None
+        self.ingest_cluster     = None
+        self.ingest_client      = None
+        if ingest_cluster_str:
+            from azure.kusto.ingest import QueuedIngestClient
+            self.ingest_cluster  = self._build_kcsb(ingest_cluster_str)
+            self.ingest_client   = QueuedIngestClient(self.ingest_cluster)
+        self.ingest_mode        = ingest_mode
+        self.streaming_max_mb   = streaming_max_mb
+        self._managed_ingest_client = None
+        self.scheduler          = resolve_scheduler(scheduler)
+        self.backend            = f'kusto|{cluster}'
+        self.ingest_backend     = f'kusto-ingest|{ingest_cluster_str}'
+        self.query_stats        = QueryStatsRecorder() if query_stats is True else (query_stats or None)
+
+    def _build_kcsb(self,cluster_url):
+        '''
+        Build the connection string of a query or ingest cluster with Azure CLI authentication
+        '''
+        from azure.kusto.data import KustoConnectionStringBuilder
+        if self.use_token_cache:
+            from .auth import get_az_cli_token_provider
+            return KustoConnectionStringBuilder.with_token_provider(cluster_url,get_az_cli_token_provider(cluster_url))
+        return KustoConnectionStringBuilder.with_az_cli_authentication(cluster_url)
+
+    @property
+    def managed_ingest_client(self):
+        '''
+        The `ManagedStreamingIngestClient` of streaming mode, created at the first use. Without
+        `ingest_cluster_str`, the SDK derives the ingest cluster of its queued fallback from the
+        query cluster url (`https://ingest-<cluster>`).
+        '''
+        if self._managed_ingest_client is None:
+            from azure.kusto.ingest import ManagedStreamingIngestClient
+            self._managed_ingest_client = ManagedStreamingIngestClient(self._build_kcsb(self.cluster),self.ingest_cluster)
+        return self._managed_ingest_client
+
+    def _select_ingest_client(self,payload_size:int,ingest_mode=None):
+        '''
+        Return the streaming client for payloads small enough to stream in streaming mode, else the queued client
+        '''
+        ingest_mode = ingest_mode or self.ingest_mode
+        if ingest_mode not in ('queued','streaming'):
+            raise Exception(f"Unsupported ingest_mode {ingest_mode}, use 'queued' or 'streaming'.")
+        if ingest_mode == 'streaming' and payload_size <= self.streaming_max_mb * 1024 * 1024:
+            return self.managed_ingest_client
+        return self._queued_ingest_client(ingest_mode)
+
+    def _queued_ingest_client(self,ingest_mode=None):
+        '''
+        Return the queued client of the ingest cluster. In streaming mode, a reader built without
+        `ingest_cluster_str` uses the queued client of the managed client.
+        '''
+        if self.ingest_client is not None:
+            return self.ingest_client
+        if (ingest_mode or self.ingest_mode) == 'streaming':
+            return self.managed_ingest_client.queued_client
+        raise Exception(
+            'Queued ingestion needs the ingest cluster, build the KustoReader with `ingest_cluster_str`, '
+            "e.g. https://ingest-<cluster>.kusto.windows.net, or use ingest_mode='streaming'."
+        )
+
+    def _call(self,fn,*args,backend=None,idempotent=True,**kwargs):
+        '''
+        Call the Kusto client, through the scheduler when the reader has one. Throttled calls
+        are only retried when `idempotent`.
+        '''
+        if self.scheduler is None:
+            return fn(*args,**kwargs)
+        return self.scheduler.run(backend or self.backend,fn,*args,idempotent=idempotent,**kwargs)
+
+    def _request_properties(self):
+        '''
+        A copy of the request properties with a new client request id, the id is sent as
+        `x-ms-client-request-id` and shows up in `.show queries`
+        '''
+        properties                      = copy.copy(self.properties)
+        properties.client_request_id    = f'azdsdr.KustoReader;{uuid.uuid4()}'
+        return properties
+
+    def _execute(self,kql:str):
+        properties  = self._request_properties()
+        response    = None
+        error       = None
+        start       = time.perf_counter()
+        try:
+            response = self._call(
+                self.kusto_client.execute
+                ,database   = self.db
+                ,query      = kql
+                ,properties = properties
+                ,idempotent = _read_only_kql_re.match(kql) is not None
+            )
+            return response
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            if self.query_stats is not None:
+                self.query_stats.record(
+                    kql
+                    ,properties.client_request_id
+                    ,time.perf_counter() - start
+                    ,database   = self.db
+                    ,response   = response
+                    ,error      = error
+                )
+
+    def run_kql(self,kql:str,cache_ttl_sec=None,parse_dynamic=False) -> 'pd.DataFrame':
+        '''
+        Run the input Kusto script on target cluster and database, This function
+        will return the first result set of execution.
+
+        Args:
+            kql (str): the Kusto script in plain string
+            cache_ttl_sec (int): time to live of the cached result when the reader has a
+                `result_cache`, default is the cache's ttl.
+            parse_dynamic (bool): decode `dynamic` values returned as json text, by default
+                `dynamic` columns are kept as returned by the service.
+
+        Returns:
+            pd.Dataframe: pandas Dataframe containing results of Kusto.
+        '''
+        # control commands like .create/.drop/.show are never served from the cache
+        if self.result_cache is not None and not kql.lstrip().startswith('.'):
+            return self.result_cache.get_or_run(
+                f'kusto|{self.cluster}|{self.db}' + ('|parse_dynamic' if parse_dynamic else '')
+                ,kql
+                ,lambda: self._run_kql(kql,parse_dynamic)
+                ,ttl_sec = cache_ttl_sec
+            )
+        if self.schema_catalog is not None and is_schema_command(kql):
+            # tables may have been created, dropped or altered, reload the catalog at the next lookup
+            self.schema_catalog.invalidate()
+        return self._run_kql(kql,parse_dynamic)
+
+    def _run_kql(self,kql:str,parse_dynamic=False) -> 'pd.DataFrame':
+        from azure.kusto.data.exceptions import KustoServiceError
+        r_df = None
+        try:
+            r = self._execute(kql).primary_results[0]
+            r_df = kusto_result_to_frame(r,parse_dynamic=parse_dynamic)
+        except KustoServiceError as error:
+            _print_kusto_error(error)
+            return None
+        return r_df
+
+    def run_kql_all(self,kql:str,parse_dynamic=False) -> list:
+        '''
+        Run the input Kusto script on target cluster and database, This function
+        will return all result set
+
+        Args:
+            kql (str): the Kusto script in plain string
+            parse_dynamic (bool): decode `dynamic` values returned as json text
+
+        Returns:
+            list: list of pd.Dataframe.
+        '''
+        from azure.kusto.data.exceptions import KustoServiceError
+        r_df_list = []
+        try:
+            r_set = self._execute(kql).primary_results
+            for r in r_set:
+                r_df_list.append(kusto_result_to_frame(r,parse_dynamic=parse_dynamic))
+        except KustoServiceError as error:
+            _print_kusto_error(error)
+            return None
+        return r_df_list
+
+    def run_kql_batch(self,kql_list:list,max_batch_queries=20,max_batch_chars=100000,parse_dynamic=False) -> list:
+        '''
+        Run a list of independent Kusto queries with as few requests as possible. Queries are
+        packed into `;` separated batches, each batch pays the HTTP, auth and queueing latency
+        once, and every result set is mapped back to its query.
+
+        Queries with several statements (`let`, `set`, ...) and control commands are sent
+        alone, since their statements would apply to the other queries of the batch. When a
+        batch fails, it is split in halves and retried until the failing queries are isolated.
+
+        Args:
+            kql_list (list): list of Kusto queries
+            max_batch_queries (int): max number of queries in one request
+            max_batch_chars (int): max size of the query text of one request
+            parse_dynamic (bool): decode `dynamic` values returned as json text
+
+        Returns:
+            list: the first result set of each query as pd.DataFrame, in input order. The result
+                  of a failed query is the exception it raised, so one failed query does not lose
+                  the other results.
+
+        Example:
+            ```
+            rs = kr.run_kql_batch([kql1,kql2,kql3])
+            for kql,r in zip([kql1,kql2,kql3],rs):
+                if isinstance(r,Exception):
+                    print('query failed',kql,r)
+            ```
+        '''
+        results = [None] * len(kql_list)
+        for batch in _pack_kql_batches(kql_list,max_batch_queries,max_batch_chars):
+            self._run_kql_batch(kql_list,batch,results,parse_dynamic)
+        return results
+
+    def _run_kql_batch(self,kql_list:list,batch:list,results:list,parse_dynamic=False) -> None:
+        from azure.kusto.data.exceptions import KustoServiceError,KustoNetworkError
+        if len(batch) == 1:
+            kql = kql_list[batch[0]]
+        else:
+            kql = '\n;\n'.join(_strip_statement_end(kql_list[i]) for i in batch)
+        try:
+            r_set = self._execute(kql).primary_results
+            if len(batch) == 1 and r_set:
+                results[batch[0]] = kusto_result_to_frame(r_set[0],parse_dynamic=parse_dynamic)
+                return
+            if len(r_set) == len(batch):
+                for i,r in zip(batch,r_set):
+                    results[i] = kusto_result_to_frame(r,parse_dynamic=parse_dynamic)
+                return
+            # e.g. a query using `fork` returns several result sets
+            error = Exception(f'{len(r_set)} result sets returned for {len(batch)} queries')
+        except KustoNetworkError as err:
+            # the request did not reach the cluster, splitting the batch would not help
+            for i in batch:
+                print(f'query {i} failed: {err}')
+                results[i] = err
+            return
+        except KustoServiceError as err:
+            error = err
+
+        if len(batch) == 1:
+            print(f'query {batch[0]} failed: {error}')
+            results[batch[0]] = error
+            return
+        half = len(batch) // 2
+        self._run_kql_batch(kql_list,batch[:half],results,parse_dynamic)
+        self._run_kql_batch(kql_list,batch[half:],results,parse_dynamic)
+
+    def _execute_streaming_query(self,kql:str,properties) -> tuple:
+        '''
+        Same as `KustoClient.execute_streaming_query`, but also return the http response, so its
+        connection can be closed when the rows are not read to the end. On SDK versions without
+        these internals the public call is used, and the response is None.
+        '''
+        client  = self.kusto_client
+        timeout = timedelta(seconds=60 * 60 * self.timeout_hours)
+        try:
+            from azure.kusto.data.client_base import ExecuteRequestParams
+            from azure.kusto.data.response import KustoStreamingResponseDataSet
+            from azure.kusto.data.streaming_response import JsonTokenReader,StreamingDataSetEnumerator
+        except ImportError:
+            return client.execute_streaming_query(self.db,kql,timeout=timeout,properties=properties),None
+        request = ExecuteRequestParams._from_query(
+            kql
+            ,self.db
+            ,properties
+            ,client._request_headers
+            ,timeout
+            ,client._mgmt_default_timeout
+            ,client._client_server_delta
+            ,client.client_details
+        )
+        http_response = client._execute(client._query_endpoint,request,properties,stream_response=True)
+        http_response.raw.decode_content = True
+        return KustoStreamingResponseDataSet(StreamingDataSetEnumerator(JsonTokenReader(http_response.raw))),http_response
+
+    def _iter_kql_chunks(self,kql:str,chunk_rows:int):
+        '''
+        Run the query with the streaming API and yield (columns, list of raw rows) chunks of
+        the first result set, rows are read from the response as it arrives. The response is
+        closed when the consumer stops early. Only the client request id and wall time of a
+        streamed query are recorded in `query_stats`.
+
+        With a scheduler, the query holds a concurrency slot until the response headers arrive,
+        reading the rows is not counted by the limiter.
+        '''
+        properties      = self._request_properties()
+        error           = None
+        http_response   = None
+        start           = time.perf_counter()
+        try:
+            response,http_response = self._call(
+                self._execute_streaming_query
+                ,kql
+                ,properties
+                ,idempotent = _read_only_kql_re.match(kql) is not None
+            )
+            table   = next(response.iter_primary_results())
+            rows    = []
+            row_cnt = 0
+            # raw json rows, typed in bulk by kusto_rows_to_frame instead of per KustoResultRow
+            for row in table.raw_rows:
+                rows.append(row)
+                row_cnt += 1
+                if len(rows) >= chunk_rows:
+                    yield table.columns,rows
+                    rows = []
+            if rows or row_cnt == 0:
+                yield table.columns,rows
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            if http_response is not None:
+                http_response.close()
+            if self.query_stats is not None:
+                self.query_stats.record(kql,properties.client_request_id,time.perf_counter() - start,database=self.db,error=error)
+
+    def iter_kql(self,kql:str,chunk_rows=100000,parse_dynamic=False) -> Iterator['pd.DataFrame']:
+        '''
+        Run the input Kusto script with the streaming query API and yield the first result set
+        as DataFrame chunks while the response arrives. Only one chunk is held in memory, so
+        results close to the Kusto truncation limit do not need twice their size in memory.
+        Every chunk has the same dtypes, derived from the Kusto column types. Stopping early,
+        e.g. with `break`, closes the response once the iterator is closed or collected.
+
+        Args:
+            kql (str): the Kusto script in plain string
+            chunk_rows (int): max number of rows of each chunk
+            parse_dynamic (bool): decode `dynamic` values returned as json text
+
+        Returns:
+            Iterator: pd.DataFrame chunks
+
+        Example:
+            ```
+            for df in kr.iter_kql("StormEvents",chunk_rows=50000):
+                print(len(df))
+            ```
+        '''
+        for columns,rows in self._iter_kql_chunks(kql,chunk_rows):
+            yield kusto_rows_to_frame(rows,columns,parse_dynamic=parse_dynamic)
+
+    def run_kql_to_parquet(self,kql:str,file_path:str,chunk_rows=100000) -> int:
+        '''
+        Stream the first result set of the input Kusto script into a local parquet file, one
+        row group per chunk, without holding the whole result in memory. `dynamic` columns are
+        written as json strings.
+
+        Args:
+            kql (str): the Kusto script in plain string
+            file_path (str): the local parquet file path
+            chunk_rows (int): number of rows per row group
+
+        Returns:
+            int: number of rows written
+        '''
+        chunks = self._iter_kql_chunks(kql,chunk_rows)
+        try:
+            return _write_parquet_chunks(chunks,file_path)
+        finally:
+            # closes the response also when writing fails
+            chunks.close()
+
+    def _store_query_result(self,kql:str,expires_after_hours:float) -> tuple:
+        '''
+        Persist the query result on the cluster with a row number column, return its name and row count
+        '''
+        name = f'azdsdr_{uuid.uuid4().hex}'
+        self._execute(
+            f".set stored_query_result {name} with (previewCount = 0, expiresAfter = {expires_after_hours}h) <|\n"
+            f"{_strip_statement_end(kql)}\n| serialize {_page_row_column} = row_number()"
+        )
+        r = self._execute(f'stored_query_result("{name}") | count').primary_results[0]
+        return name,r.raw_rows[0][0]
+
+    def _fetch_page(self,name:str,first_row:int,last_row:int) -> tuple:
+        table = self._execute(
+            f'stored_query_result("{name}")\n'
+            f'| where {_page_row_column} between ({first_row} .. {last_row})\n'
+            f'| order by {_page_row_column} asc\n'
+            f'| project-away {_page_row_column}'
+        ).primary_results[0]
+        return table.columns,table.raw_rows
+
+    def _iter_pages(self,kql:str,page_rows:int,max_workers:int,expires_after_hours:float):
+        '''
+        Yield (columns, raw rows) of every page in order, at most `max_workers` pages are
+        fetched or waiting at the same time. The stored result is dropped at the end.
+        '''
+        from concurrent.futures import ThreadPoolExecutor
+        from collections import deque
+        name,row_cnt = self._store_query_result(kql,expires_after_hours)
+        try:
+            pages = [(first,min(first + page_rows - 1,row_cnt)) for first in range(1,row_cnt + 1,page_rows)]
+            if not pages:
+                # no rows, one empty page still gives the columns
+                pages = [(1,0)]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending = deque()
+                try:
+                    for first,last in pages:
+                        if len(pending) >= max_workers:
+                            yield pending.popleft().result()
+                        pending.append(executor.submit(self._fetch_page,name,first,last))
+                    while pending:
+                        yield pending.popleft().result()
+                finally:
+                    for future in pending:
+                        future.cancel()
+        finally:
+            try:
+                self._execute(f'.drop stored_query_result {name}')
+            except Exception as err:
+                print(f'drop stored query result {name} failed: {err}')
+
+    def run_kql_paged(
+        self
+        ,kql:str
+        ,page_rows          = 100000
+        ,max_workers        = 4
+        ,parse_dynamic      = False
+        ,expires_after_hours= 1
+    ) -> Iterator['pd.DataFrame']:
+        '''
+        Pull a result larger than the query result limits page by page. The result of the
+        input Kusto script is persisted on the cluster with `.set stored_query_result`, then
+        pages of `page_rows` rows are fetched concurrently, `max_workers` at a time, and yielded
+        in order as DataFrames. The stored result is dropped when the iteration ends or stops.
+
+        Args:
+            kql (str): a tabular Kusto query, its row order is kept
+            page_rows (int): number of rows of every page, keep a page under the 64 MB result limit
+            max_workers (int): max number of pages fetched or held in memory at the same time
+            parse_dynamic (bool): decode `dynamic` values returned as json text
+            expires_after_hours (float): the stored result expires after these hours even if the
+                drop at the end does not happen, e.g. when the process is killed
+
+        Returns:
+            Iterator: pd.DataFrame pages, see `kusto_rows_to_frame` for the dtypes
+
+        Example:
+            ```
+            for df in kr.run_kql_paged('BigTable | where Timestamp > ago(30d)',page_rows=200000,max_workers=8):
+                print(len(df))
+            ```
+        '''
+        for columns,rows in self._iter_pages(kql,page_rows,max_workers,expires_after_hours):
+            yield kusto_rows_to_frame(rows,columns,parse_dynamic=parse_dynamic)
+
+    def run_kql_paged_to_parquet(
+        self
+        ,kql:str
+        ,file_path:str
+        ,page_rows          = 100000
+        ,max_workers        = 4
+        ,expires_after_hours= 1
+    ) -> int:
+        '''
+        Same as `run_kql_paged`, write the pages in order into a local parquet file, one row
+        group per page. `dynamic` columns are written as json strings.
+
+        Returns:
+            int: number of rows written
+        '''
+        pages = self._iter_pages(kql,page_rows,max_workers,expires_after_hours)
+        try:
+            return _write_parquet_chunks(pages,file_path)
+        finally:
+            # drops the stored result also when writing fails
+            pages.close()
+
+    def mirror(self,source:str,watermark_column:str,local_dir:str,partition='day',overlap_sec=3600,max_workers=4) -> 'KustoMirror':
+        '''
+        Return a `KustoMirror`, a local Parquet copy of a table or query partitioned by
+        `watermark_column` and refreshed incrementally.
+
+        Example:
+            ```
+            mirror = kr.mirror('StormEvents','StartTime','./storm_events')
+            mirror.refresh(start='2007-01-01')
+            df = mirror.read(columns=['StartTime','State'],start='2007-06-01')
+            ```
+        '''
+        return KustoMirror(
+            self
+            ,source
+            ,watermark_column
+            ,local_dir
+            ,partition      = partition
+            ,overlap_sec    = overlap_sec
+            ,max_workers    = max_workers
+        )
+
+    def is_table_exist(self,table_name)->bool:
+        '''
+        Check if the target table is existed.
+        '''
+        if self.schema_catalog is not None:
+            return self.schema_catalog.is_table_exist(table_name)
+        r = self.run_kql(_table_exist_kql(table_name))
+        if r.size>0:
+            return True
+        else:
+            return False
+
+    def drop_table(self,table_name):
+        '''
+        Drop target table
+        '''
+        kql = f'''
+        .drop table {table_name}
+        '''
+        r = self._run_kql(kql)
+        if r is not None and self.schema_catalog is not None:
+            self.schema_catalog.drop_table(table_name)
+        return r
+
+    def _create_table(self,kusto_table_name,schema,kusto_folder='',create_mapping=True):
+        '''
+        (Re)create a table of the (column name, Kusto type) schema and its csv ingestion mapping
+        '''
+        if self.is_table_exist(kusto_table_name):
+            self.drop_table(kusto_table_name)
+        kql = create_table_kql(kusto_table_name,schema,kusto_folder)
+        print(kql)
+        r = self._run_kql(kql)
+        if r is None:
+            return r
+        if self.schema_catalog is not None:
+            self.schema_catalog.add_table(kusto_table_name,schema,kusto_folder)
+        if create_mapping:
+            mapping_name = csv_mapping_name(kusto_table_name)
+            if self._run_kql(create_csv_mapping_kql(kusto_table_name,mapping_name,schema)) is not None:
+                print(f'csv ingestion mapping {mapping_name} is created')
+        return r
+
+    def create_table_from_csv(
+        self
+        ,kusto_table_name
+        ,csv_file_path
+        ,kusto_folder   = ''
+        ,sample_rows    = 100000
+        ,chunk_rows     = 20000
+        ,column_types   = None
+        ,create_mapping = True
+    ):
+        '''
+        Create a new table based on the csv file structure
+        Steps
+        1. check target kusto table is exist
+        2. if yes, delete the target table
+        3. read up to `sample_rows` rows of the csv file, `chunk_rows` rows at a time
+        4. infer the column types: bool, long, real, datetime, guid, dynamic or string
+        5. build and run the create table kql
+        6. create the csv ingestion mapping `<table>_csv_mapping`, used by passing
+           `mapping_name` to `upload_csv_to_kusto` or `upload_csv_from_blob`
+
+        Args:
+            kusto_table_name (str): the table to create
+            csv_file_path (str): a csv file with a header line
+            kusto_folder (str): the table folder
+            sample_rows (int): number of rows used to infer the types, None to read the whole file
+            chunk_rows (int): number of rows read at a time, bounds the memory used
+            column_types (dict): explicit {column name: Kusto type} overrides,
+                e.g. {'zip_code':'string'}
+            create_mapping (bool): also create the csv ingestion mapping of the table
+
+        Example:
+            ```
+            kr.create_table_from_csv(
+                kusto_table_name    = 'target_table'
+                ,csv_file_path      = 'data.csv'
+                ,column_types       = {'zip_code':'string'}
+            )
+            kr.upload_csv_to_kusto('target_table','data.csv',mapping_name='target_table_csv_mapping')
+            ```
+        '''
+        schema = infer_csv_schema(
+            csv_file_path
+            ,sample_rows    = sample_rows
+            ,chunk_rows     = chunk_rows
+            ,column_types   = column_types
+        )
+        return self._create_table(kusto_table_name,schema,kusto_folder,create_mapping)
+
+    def create_table_from_df(
+        self
+        ,kusto_table_name
+        ,df_data
+        ,kusto_folder   = ''
+        ,sample_rows    = 100000
+        ,column_types   = None
+        ,create_mapping = True
+    ):
+        '''
+        Create a new table based on the DataFrame columns, dropping the existing one. Typed
+        columns get the type of their dtype, text and object columns are inferred from the
+        values of the first `sample_rows` rows, see `infer_kusto_schema`.
+
+        Args:
+            kusto_table_name (str): the table to create
+            df_data (pd.DataFrame): the data
+            kusto_folder (str): the table folder
+            sample_rows (int): number of rows used to infer text and object columns
+            column_types (dict): explicit {column name: Kusto type} overrides
+            create_mapping (bool): also create the csv ingestion mapping `<table>_csv_mapping`
+        '''
+        schema = infer_kusto_schema(df_data,sample_rows=sample_rows,column_types=column_types)
+        return self._create_table(kusto_table_name,schema,kusto_folder,create_mapping)
+
+    def upload_df_to_kusto(
+        self
+        ,target_table_name
+        ,df_data
+        ,data_format    = 'csv'
+        ,chunk_size_mb  = 100
+        ,max_workers    = 4
+        ,report_status  = False
+        ,extent_tags    = None
+        ,ingest_mode    = None
+        ,create_table   = False
+        ,column_types   = None
+        ,kusto_folder   = ''
+    ) -> 'IngestHandle':
+        '''
+        Upload Pandas Dataframe data to Kusto table.
+
+        Large frames are split into chunks of about `chunk_size_mb` in memory. Each chunk is
+        serialized in memory, to Parquet or gzip CSV, and queued for ingestion with its
+        uncompressed size as the raw size hint. Up to `max_workers` chunks are serialized and
+        uploaded at the same time, no temp file is written.
+
+        Args:
+            target_table_name (str): the Kusto table
+            df_data (pd.DataFrame): the data to upload
+            data_format (str): 'csv' (default), columns are matched by position, or 'parquet',
+                columns are matched by name
+            chunk_size_mb (int): target in-memory size of each chunk
+            max_workers (int): max number of chunks serialized and uploaded at the same time
+            report_status (bool): ask the ingestion service to report success and failure of every
+                chunk to the status queues, read by `wait_for_ingestion`. Only set it when the
+                upload is followed by `wait_for_ingestion`, unread messages stay in the queues
+            extent_tags (list): tags added to the extents created by this upload
+            ingest_mode (str): 'queued' or 'streaming', default is the reader's `ingest_mode`
+            create_table (bool): create the table in `kusto_folder` when it does not exist, with
+                the column types inferred from the frame, see `create_table_from_df`. Text
+                columns are then converted to their inferred types before upload.
+            column_types (dict): explicit {column name: Kusto type} overrides of the inferred types
+            kusto_folder (str): the folder of the created table
+
+        Returns:
+            IngestHandle: the chunks, their `IngestionResult` objects, ingestion path
+                ('streaming' or 'queued') and errors
+
+        Example:
+            ```
+            handle = kr.upload_df_to_kusto('target_table',df,chunk_size_mb=200,max_workers=8,report_status=True)
+            status = kr.wait_for_ingestion(handle)
+            ```
+        '''
+        from concurrent.futures import ThreadPoolExecutor
+        if data_format not in ('parquet','csv'):
+            raise Exception(f"Unsupported data_format {data_format}, use 'parquet' or 'csv'.")
+        if create_table and not self.is_table_exist(target_table_name):
+            schema = infer_kusto_schema(df_data,column_types=column_types)
+            if self._create_table(target_table_name,schema,kusto_folder,create_mapping=False) is None:
+                raise Exception(f'Create table {target_table_name} failed.')
+            df_data = coerce_frame_to_schema(df_data,schema)
+        # a reader without ingest cluster fails here rather than at every chunk
+        self._select_ingest_client(0,ingest_mode)
+        ingestion_props = self._ingestion_properties(target_table_name,data_format,report_status,extent_tags)
+        handle = IngestHandle(self.db,target_table_name,data_format,report_status=report_status,extent_tags=extent_tags)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for index,chunk in enumerate(_frame_chunks(df_data,chunk_size_mb)):
+                executor.submit(
+                    ingest_frame_chunk
+                    ,lambda payload_size: self._select_ingest_client(payload_size,ingest_mode)
+                    ,ingestion_props
+                    ,handle
+                    ,index
+                    ,chunk
+                    ,call = lambda send: self._call(send,backend=self.ingest_backend,idempotent=False)
+                )
+        print('ingest result',handle)
+        return handle
+
+    def _ingestion_properties(self,target_table_name,data_format,report_status,extent_tags,mapping_name=None,ignore_first_record=False):
+        '''
+        Ingestion properties shared by the DataFrame, csv file and blob uploads
+        '''
+        from azure.kusto.data import DataFormat
+        from azure.kusto.ingest import IngestionProperties,ReportLevel
+        return IngestionProperties(
+            database                = self.db
+            ,table                  = target_table_name
+            ,data_format            = DataFormat.PARQUET if data_format == 'parquet' else DataFormat.CSV
+            ,ingestion_mapping_reference = mapping_name
+            ,additional_tags        = extent_tags
+            ,report_level           = ReportLevel.FailuresAndSuccesses if report_status else ReportLevel.FailuresOnly
+            ,additional_properties  = {'ignoreFirstRecord': 'true'} if ignore_first_record else None
+        )
+
+    def _ingest_source(self,handle:'IngestHandle',send,raw_bytes:int) -> 'IngestHandle':
+        '''
+        Send one csv file or blob source and record it in the handle, like a DataFrame chunk
+        with an unknown row count
+        '''
+        chunk = {'index':len(handle.chunks),'rows':None,'raw_bytes':raw_bytes or 0}
+        try:
+            chunk['result'] = self._call(send,backend=self.ingest_backend,idempotent=False)
+            chunk['path']   = ingestion_path(chunk['result'])
+        except Exception as err:
+            print(f'ingest to {handle.table} failed: {err}')
+            chunk['error'] = err
+        handle._add_chunk(chunk)
+        print('ingest result',handle)
+        return handle
+
+    def upload_csv_to_kusto(
+        self
+        ,target_table_name
+        ,csv_path
+        ,ingest_mode    = None
+        ,mapping_name   = None
+        ,report_status  = False
+        ,extent_tags    = None
+    ) -> 'IngestHandle':
+        '''
+        Upload a local csv file with a header line to Kusto table. In streaming mode, a file up
+        to `streaming_max_mb` is sent through streaming ingestion.
+
+        Args:
+            target_table_name (str): the Kusto table
+            csv_path (str): the local csv file path, `.gz` and `.zip` files are sent compressed
+            ingest_mode (str): 'queued' or 'streaming', default is the reader's `ingest_mode`
+            mapping_name (str): csv ingestion mapping of the table, e.g. the one created by
+                `create_table_from_csv`
+            report_status (bool): report success and failure to the status queues, read by `wait_for_ingestion`,
+                only set it when the upload is followed by `wait_for_ingestion`
+            extent_tags (list): tags added to the extents created by this upload
+
+        Returns:
+            IngestHandle: one source with its `IngestionResult` and ingestion path, or its error
+        '''
+        import os
+        from azure.kusto.ingest import FileDescriptor
+        csv_path        = str(csv_path)
+        ingestion_props = self._ingestion_properties(target_table_name,'csv',report_status,extent_tags,mapping_name,ignore_first_record=True)
+        # the raw size hint of compressed files is estimated by the SDK from the gzip trailer or the zip entries
+        file_size       = os.path.getsize(csv_path)
+        file_descriptor = FileDescriptor(csv_path,None if csv_path.endswith(('.gz','.zip')) else file_size)
+        ingest_client   = self._select_ingest_client(file_size,ingest_mode)
+        handle          = IngestHandle(self.db,target_table_name,'csv',report_status=report_status,extent_tags=extent_tags)
+        return self._ingest_source(
+            handle
+            ,lambda: ingest_client.ingest_from_file(file_descriptor,ingestion_properties=ingestion_props)
+            ,file_descriptor.size
+        )
+
+    def upload_csv_from_blob(
+        self
+        ,target_table_name
+        ,blob_sas_url
+        ,mapping_name   = None
+        ,blob_size      = None
+        ,report_status  = False
+        ,extent_tags    = None
+    ) -> 'IngestHandle':
+        '''
+        Queue a csv blob with a header line for ingestion, the blob is read by the ingestion
+        service so no data goes through this machine.
+
+        Args:
+            target_table_name (str): the Kusto table
+            blob_sas_url (str): the blob url with a SAS token granting read access
+            mapping_name (str): csv ingestion mapping of the table, e.g. the one created by
+                `create_table_from_csv`
+            blob_size (int): the uncompressed size of the blob, read from the blob properties when not given
+            report_status (bool): report success and failure to the status queues, read by `wait_for_ingestion`,
+                only set it when the upload is followed by `wait_for_ingestion`
+            extent_tags (list): tags added to the extents created by this upload
+
+        Returns:
+            IngestHandle: one source with its `IngestionResult`, or its error
+        '''
+        from azure.kusto.ingest import BlobDescriptor
+        ingest_client   = self._queued_ingest_client()
+        ingestion_props = self._ingestion_properties(target_table_name,'csv',report_status,extent_tags,mapping_name,ignore_first_record=True)
+        blob_descriptor = BlobDescriptor(blob_sas_url,blob_size)
+        if not blob_size:
+            try:
+                blob_descriptor.fill_size()
+            except Exception as err:
+                # the size is only a hint for the ingestion service
+                print(f'read the size of the blob failed: {err}')
+        handle = IngestHandle(self.db,target_table_name,'csv',report_status=report_status,extent_tags=extent_tags)
+        return self._ingest_source(
+            handle
+            ,lambda: ingest_client.ingest_from_blob(blob_descriptor,ingestion_properties=ingestion_props)
+            ,blob_descriptor.size
+        )
+
+    def wait_for_ingestion(self,handle,timeout_sec=3600,expected_row_count=None,extent_tags=None,report_status=None) -> dict:
+        '''
+        Wait until every chunk of an upload has a final ingestion status, see `IngestTracker`.
+
+        Args:
+            handle (IngestHandle): the handle returned by `upload_df_to_kusto`, `upload_csv_to_kusto`
+                or `upload_csv_from_blob`, or a list of `IngestionResult`
+            timeout_sec (int): give up after these seconds
+            expected_row_count (int): also wait until the table, or its extents with `extent_tags`,
+                holds this many rows
+            extent_tags (list): count the rows of the extents having all these tags
+            report_status (bool): the sources were queued with status reporting, default is the
+                handle's `report_status`, set it for a list of `IngestionResult`
+
+        Returns:
+            dict: `done`, the `succeeded`, `failed` and `pending` source ids, `row_count` and `elapsed_sec`
+        '''
+        tracker = IngestTracker(
+            self
+            ,handle
+            ,expected_row_count = expected_row_count
+            ,extent_tags        = extent_tags
+            ,report_status      = report_status
+        )
+        status  = tracker.wait(timeout_sec=timeout_sec)
+        if status['failed']:
+            print(f"{len(status['failed'])} ingestions failed")
+        return status
+
+    def check_table_data(self,target_table_name,check_times = 30,check_gap_min=2) -> None:
+        '''
+        check data existence of a table, the table is checked after a few seconds first and the
+        gap grows up to `check_gap_min` mins, for at most `check_times * check_gap_min` mins.
+        To wait for the end of an upload, use `wait_for_ingestion` instead.
+        '''
+        deadline    = time.monotonic() + 60 * check_gap_min * check_times
+        gap_sec     = 5
+        while True:
+            kql     = f'''{target_table_name} | count'''
+            result  = self.run_kql(kql)
+            row_cnt = result["Count"].values[0]
+            if row_cnt > 0:
+                print('kusto ingest done')
+                return
+            if time.monotonic() + gap_sec > deadline:
+                break
+            print(f"table is empty, check again in {gap_sec} seconds")
+            time.sleep(gap_sec)
+            gap_sec = min(gap_sec * 2,60 * check_gap_min)
+
+        print('check done')
+
+    def list_tables(self,folder_name=None) -> list:
+        '''
+        Return all table names from the current kusto database
+        '''
+        if self.schema_catalog is not None:
+            return self.schema_catalog.list_tables(folder_name)
+        r = self.run_kql(_list_tables_kql(folder_name))
+        return r
+
+    def get_table_schema(self,table_name):
+        '''
+        Return the table schema in format as
+            "ColumnName1:type2,ColumnName2:type2"
+        The schema string can be useful to update table meta, for example, add docstring to the table.
+        '''
+        if self.schema_catalog is not None:
+            return self.schema_catalog.get_table_schema(table_name)
+        r = self.run_kql(_table_schema_kql(table_name))
+        return _schema_string(r)
+
+    def get_table_folder(self,table_name):
+        '''
+        Get target table's folder path string
+        '''
+        if self.schema_catalog is not None:
+            return self.schema_catalog.get_table_folder(table_name)
+        return self.run_kql(_table_folder_kql(table_name))['Folder'][0]
+
+# endregion
@@ -0,0 +1,190 @@
+# region async Kusto
+from typing import TYPE_CHECKING
+import asyncio
+
+from .kusto import (
+    _build_properties
+    ,_print_kusto_error
+    ,_table_exist_kql
+    ,_list_tables_kql
+    ,_table_schema_kql
+    ,_table_folder_kql
+    ,_schema_string
+)
+from .kusto_convert import kusto_result_to_frame
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+class AsyncKustoReader:
+    '''
+    Asyncio version of `KustoReader` built on `azure.kusto.data.aio`. Waiting for a query does not
+    hold a thread, so a single event loop can wait on many Kusto queries at once.
+
+    All calls of one reader share the same HTTP session, and at most `max_concurrency` queries
+    are in flight at the same time.
+
+    Example:
+        ```
+        import asyncio
+        from azdsdr.readers import AsyncKustoReader
+
+        async def main():
+            async with AsyncKustoReader(cluster=cluster,db=db,max_concurrency=8) as kr:
+                r  = await kr.run_kql("StormEvents | take 10")
+                rs = await kr.run_kql_many([kql1,kql2,kql3])
+
+        asyncio.run(main())
+        ```
+    '''
+    def __init__(self
+                ,cluster            = "https://help.kusto.windows.net"
+                ,db                 = "Samples"
+                ,timeout_hours      = 1
+                ,max_concurrency    = 16
+                ,use_token_cache    = True
+                ) -> None:
+        '''
+        Args:
+            cluster (str): the Kusto cluster url
+            db (str): the Kusto database
+            timeout_hours (int): server side timeout of every query
+            max_concurrency (int): max number of queries in flight at the same time
+            use_token_cache (bool): get Azure CLI tokens through the shared token cache of
+                `azdsdr.readers.auth`, set as False to let the Kusto SDK call `az` itself.
+        '''
+        self.cluster            = cluster
+        self.db                 = db
+        self.max_concurrency    = max_concurrency
+        self.use_token_cache    = use_token_cache
+        self.properties         = _build_properties(timeout_hours)
+        # the aio client opens its HTTP session at creation, so it is created in the running loop at the first call
+        self._kusto_client      = None
+        self._semaphore         = None
+
+    def _get_client(self):
+        if self._kusto_client is None:
+            from azure.kusto.data import KustoConnectionStringBuilder
+            from azure.kusto.data.aio import KustoClient
+            if self.use_token_cache:
+                from .auth import get_az_cli_token_provider
+                token_provider = get_az_cli_token_provider(self.cluster)
+                kcsb = KustoConnectionStringBuilder.with_async_token_provider(self.cluster,token_provider.get_token_async)
+            else:
+                kcsb = KustoConnectionStringBuilder.with_az_cli_authentication(self.cluster)
+            self._kusto_client  = KustoClient(kcsb)
+            self._semaphore     = asyncio.Semaphore(self.max_concurrency)
+        return self._kusto_client
+
+    async def close(self) -> None:
+        '''
+        Close the shared HTTP session
+        '''
+        if self._kusto_client is not None:
+            await self._kusto_client.close()
+            self._kusto_client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self,*exc):
+        await self.close()
+
+    async def _execute(self,kql:str):
+        kusto_client = self._get_client()
+        async with self._semaphore:
+            return await kusto_client.execute(self.db,kql,self.properties)
+
+    async def run_kql(self,kql:str,parse_dynamic=False) -> 'pd.DataFrame':
+        '''
+        Run the input Kusto script on target cluster and database, This function
+        will return the first result set of execution.
+
+        Args:
+            kql (str): the Kusto script in plain string
+            parse_dynamic (bool): decode `dynamic` values returned as json text
+
+        Returns:
+            pd.Dataframe: pandas Dataframe containing results of Kusto.
+        '''
+        from azure.kusto.data.exceptions import KustoServiceError
+        try:
+            r = (await self._execute(kql)).primary_results[0]
+        except KustoServiceError as error:
+            _print_kusto_error(error)
+            return None
+        return kusto_result_to_frame(r,parse_dynamic=parse_dynamic)
+
+    async def run_kql_all(self,kql:str,parse_dynamic=False) -> list:
+        '''
+        Run the input Kusto script on target cluster and database, This function
+        will return all result set
+
+        Args:
+            kql (str): the Kusto script in plain string
+            parse_dynamic (bool): decode `dynamic` values returned as json text
+
+        Returns:
+            list: list of pd.Dataframe.
+        '''
+        from azure.kusto.data.exceptions import KustoServiceError
+        try:
+            r_set = (await self._execute(kql)).primary_results
+        except KustoServiceError as error:
+            _print_kusto_error(error)
+            return None
+        return [kusto_result_to_frame(r,parse_dynamic=parse_dynamic) for r in r_set]
+
+    async def run_kql_many(self,kql_list:list,max_concurrency=None,return_exceptions=True) -> list:
+        '''
+        Run a list of Kusto scripts concurrently, `asyncio.gather` style, and return the first
+        result set of each in input order.
+
+        Args:
+            kql_list (list): list of Kusto scripts
+            max_concurrency (int): max number of these queries in flight at the same time, on top
+                of the reader's own `max_concurrency` limit
+            return_exceptions (bool): put the exception of a failed query in its result slot
+                instead of raising it
+
+        Returns:
+            list: list of pd.Dataframe
+        '''
+        if max_concurrency:
+            limit = asyncio.Semaphore(max_concurrency)
+            async def run_limited(kql):
+                async with limit:
+                    return await self.run_kql(kql)
+            tasks = [run_limited(kql) for kql in kql_list]
+        else:
+            tasks = [self.run_kql(kql) for kql in kql_list]
+        return await asyncio.gather(*tasks,return_exceptions=return_exceptions)
+
+    async def is_table_exist(self,table_name) -> bool:
+        '''
+        Check if the target table is existed.
+        '''
+        r = await self.run_kql(_table_exist_kql(table_name))
+        return r.size > 0
+
+    async def list_tables(self,folder_name=None) -> 'pd.DataFrame':
+        '''
+        Return all table names from the current kusto database
+        '''
+        return await self.run_kql(_list_tables_kql(folder_name))
+
+    async def get_table_schema(self,table_name) -> str:
+        '''
+        Return the table schema in format as
+            "ColumnName1:type2,ColumnName2:type2"
+        '''
+        r = await self.run_kql(_table_schema_kql(table_name))
+        return _schema_string(r)
+
+    async def get_table_folder(self,table_name) -> str:
+        '''
+        Get target table's folder path string
+        '''
+        r = await self.run_kql(_table_folder_kql(table_name))
+        return r['Folder'][0]
+# endregion
@@ -0,0 +1,214 @@
+# region Kusto result to DataFrame
+from typing import TYPE_CHECKING
+from operator import itemgetter
+import json
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+# stable dtypes of Kusto column types, nullable so a chunk with nulls keeps the same dtype
+_kusto_pandas_dtypes = {
+    'bool'      : 'boolean'
+    ,'int'      : 'Int32'
+    ,'long'     : 'Int64'
+    ,'real'     : 'float64'
+    ,'decimal'  : 'float64'
+    ,'datetime' : 'datetime64[ns, UTC]'
+    ,'timespan' : 'timedelta64[ns]'
+}
+
+def _kusto_arrow_type(column_type) -> 'pa.DataType':
+    import pyarrow as pa
+    return {
+        'bool'      : pa.bool_()
+        ,'int'      : pa.int32()
+        ,'long'     : pa.int64()
+        ,'real'     : pa.float64()
+        ,'decimal'  : pa.float64()
+        ,'datetime' : pa.timestamp('ns',tz='UTC')
+        ,'timespan' : pa.duration('ns')
+    }.get(column_type.lower(),pa.string())
+
+def _types_mapper(arrow_type):
+    import pyarrow as pa
+    import pandas as pd
+    if arrow_type == pa.int32():
+        return pd.Int32Dtype()
+    if arrow_type == pa.int64():
+        return pd.Int64Dtype()
+    if arrow_type == pa.bool_():
+        return pd.BooleanDtype()
+    return None
+
+def _real_array(values) -> 'pa.Array':
+    '''
+    real and decimal values, decimals and NaN/Infinity come as strings
+    '''
+    import pyarrow as pa
+    arr = pa.array(values)
+    if pa.types.is_null(arr.type):
+        return arr.cast(pa.float64())
+    if pa.types.is_string(arr.type):
+        # Arrow float parsing accepts "NaN" and "Inf" but not the "Infinity" of .NET
+        import pyarrow.compute as pc
+        arr = pc.replace_substring(arr,'Infinity','Inf')
+    return arr.cast(pa.float64())
+
+def _datetime_array(values) -> 'pa.Array':
+    import pyarrow as pa
+    return pa.array(values,type=pa.string()).cast(pa.timestamp('ns',tz='UTC'))
+
+def _timespan_array(values) -> 'pa.Array':
+    '''
+    Parse Kusto timespans in the `[-][d.]hh:mm:ss[.fffffff]` format with Arrow string kernels,
+    ticks (100ns) when the values are numbers. Checked kernels raise `ArrowInvalid` for values
+    out of the nanosecond range (about 106751 days), e.g. `timespan.max`, instead of wrapping around.
+    '''
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    arr = pa.array(values)
+    if pa.types.is_null(arr.type):
+        return arr.cast(pa.duration('ns'))
+    if pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type):
+        return pc.multiply_checked(arr.cast(pa.int64()),100).cast(pa.duration('ns'))
+    if not pa.types.is_string(arr.type):
+        raise pa.ArrowInvalid(f'unexpected timespan values of type {arr.type}')
+
+    negative    = pc.starts_with(arr,'-')
+    parts       = pc.split_pattern(pc.utf8_ltrim(arr,'-'),':')
+    if pc.any(pc.not_equal(pc.list_value_length(parts),3)).as_py():
+        raise pa.ArrowInvalid('unexpected timespan format')
+    day_hour    = pc.list_element(parts,0)
+    minutes     = pc.list_element(parts,1)
+    seconds     = pc.list_element(parts,2)
+    # "d.hh" or "hh", the hours are always the last two digits
+    days        = pc.utf8_slice_codeunits(day_hour,0,-3)
+    hours       = pc.utf8_slice_codeunits(day_hour,-2)
+    days        = pc.if_else(pc.equal(days,''),'0',days)
+    # "ss" or "ss.fffffff", right padded to nanoseconds
+    fraction    = pc.utf8_rpad(pc.utf8_slice_codeunits(seconds,3),9,'0')
+    seconds     = pc.utf8_slice_codeunits(seconds,0,2)
+
+    total_sec   = pc.add_checked(
+        pc.add_checked(pc.multiply_checked(days.cast(pa.int64()),86400),pc.multiply_checked(hours.cast(pa.int64()),3600))
+        ,pc.add_checked(pc.multiply_checked(minutes.cast(pa.int64()),60),seconds.cast(pa.int64()))
+    )
+    total_ns    = pc.add_checked(pc.multiply_checked(total_sec,1000000000),fraction.cast(pa.int64()))
+    total_ns    = pc.if_else(negative,pc.negate_checked(total_ns),total_ns)
+    return total_ns.cast(pa.duration('ns'))
+
+def _typed_array(arrow_type_name):
+    def convert(values) -> 'pa.Array':
+        import pyarrow as pa
+        return pa.array(values,type=getattr(pa,arrow_type_name)())
+    return convert
+
+_arrow_converters = {
+    'bool'      : _typed_array('bool_')
+    ,'int'      : _typed_array('int32')
+    ,'long'     : _typed_array('int64')
+    ,'real'     : _real_array
+    ,'decimal'  : _real_array
+    ,'datetime' : _datetime_array
+    ,'timespan' : _timespan_array
+}
+
+def _parse_timespan_value(value):
+    import pandas as pd
+    if value is None or value == '':
+        return pd.NaT
+    try:
+        if isinstance(value,(int,float)):
+            return pd.to_timedelta(value * 100,unit='ns')
+        negative = value.startswith('-')
+        value    = value.lstrip('-')
+        if '.' in value.split(':')[0]:
+            value = value.replace('.',' days ',1)
+        td = pd.to_timedelta(value)
+    except (ValueError,OverflowError):
+        # out of the nanosecond range, e.g. timespan.max
+        return pd.NaT
+    return -td if negative else td
+
+def _convert_column_slow(values,column_type) -> 'pd.Series':
+    '''
+    Value by value fallback for columns the Arrow kernels reject, e.g. mixed value types
+    or datetimes and timespans out of the nanosecond range, which become NaT.
+    '''
+    import pandas as pd
+    import numpy as np
+    s = pd.Series(values,dtype=object)
+    if column_type in ('real','decimal'):
+        s = s.replace({'NaN':np.nan,'Infinity':np.inf,'-Infinity':-np.inf})
+        return pd.to_numeric(s,errors='coerce').astype('float64')
+    if column_type == 'datetime':
+        return pd.to_datetime(s,format='ISO8601',utc=True,errors='coerce').astype('datetime64[ns, UTC]')
+    if column_type == 'timespan':
+        return s.map(_parse_timespan_value).astype('timedelta64[ns]')
+    return s.astype(_kusto_pandas_dtypes[column_type])
+
+def _parse_dynamic_values(values) -> list:
+    # v1 responses (control commands) return dynamic values as json text
+    return [json.loads(v) if isinstance(v,str) and v[:1] in ('{','[') else v for v in values]
+
+def kusto_rows_to_frame(rows,columns,parse_dynamic=False) -> 'pd.DataFrame':
+    '''
+    Build a DataFrame from raw Kusto rows, column by column instead of value by value.
+
+    Rows are split into one list per column, typed columns are converted in bulk with Arrow compute kernels
+    (datetime and timespan strings included), and string, guid and `dynamic` columns are kept
+    as returned by the service. The dtypes only depend on the Kusto column types, so every
+    chunk of a streamed result gets the same dtypes:
+
+        bool -> boolean, int -> Int32, long -> Int64, real/decimal -> float64,
+        datetime -> datetime64[ns, UTC], timespan -> timedelta64[ns], others -> object
+
+    Args:
+        rows (list): list of raw rows, each one a list of json values
+        columns (list): the `KustoResultColumn` list of the table
+        parse_dynamic (bool): decode `dynamic` values returned as json text, e.g. by control commands
+
+    Returns:
+        pd.DataFrame: the converted rows
+    '''
+    import pandas as pd
+    import pyarrow as pa
+    data = {}
+    for i,column in enumerate(columns):
+        values      = list(map(itemgetter(i),rows))
+        column_type = column.column_type.lower()
+        if column_type in _arrow_converters:
+            try:
+                arr = _arrow_converters[column_type](values)
+                data[column.column_name] = arr.to_pandas(types_mapper=_types_mapper)
+            except (pa.ArrowInvalid,pa.ArrowTypeError,pa.ArrowNotImplementedError,OverflowError):
+                data[column.column_name] = _convert_column_slow(values,column_type)
+        elif column_type == 'dynamic' and parse_dynamic:
+            data[column.column_name] = pd.Series(_parse_dynamic_values(values),dtype=object)
+        else:
+            # not inferred, pandas infers `str` for strings but `object` for a chunk of nulls
+            data[column.column_name] = pd.Series(values,dtype=object)
+    return pd.DataFrame(data,columns=[c.column_name for c in columns])
+
+def kusto_result_to_frame(table,parse_dynamic=False) -> 'pd.DataFrame':
+    '''
+    Column oriented replacement of `azure.kusto.data.helpers.dataframe_from_result_table`,
+    convert a `KustoResultTable` to a DataFrame. See `kusto_rows_to_frame` for the dtypes.
+
+    Args:
+        table (KustoResultTable): a result table, e.g. `response.primary_results[0]`
+        parse_dynamic (bool): decode `dynamic` values returned as json text
+
+    Returns:
+        pd.DataFrame: the converted table
+
+    Example:
+        ```
+        from azdsdr.readers import kusto_result_to_frame
+        response = kr.kusto_client.execute(db,kql)
+        df       = kusto_result_to_frame(response.primary_results[0])
+        ```
+    '''
+    return kusto_rows_to_frame(table.raw_rows,table.columns,parse_dynamic=parse_dynamic)
+# endregion
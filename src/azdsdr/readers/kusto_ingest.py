@@ -0,0 +1,364 @@
+# region Kusto ingestion helpers
+from typing import TYPE_CHECKING
+from datetime import datetime,timezone
+import threading
+import random
+import gzip
+import time
+import uuid
+import io
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def _frame_chunks(df:'pd.DataFrame',chunk_size_mb:int):
+    '''
+    Yield row slices of the DataFrame of about `chunk_size_mb` in memory each. The row size is
+    estimated from the first rows, so object columns are not measured value by value.
+    '''
+    if len(df) == 0:
+        return
+    sample          = df.iloc[:10000]
+    row_bytes       = max(sample.memory_usage(index=False,deep=True).sum() / len(sample),1)
+    chunk_rows      = max(int(chunk_size_mb * 1024 * 1024 / row_bytes),1)
+    for start in range(0,len(df),chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def _serialize_frame(df:'pd.DataFrame',data_format:str):
+    '''
+    Serialize a DataFrame in memory for ingestion.
+
+    Returns:
+        tuple: (payload bytes, uncompressed size, is_compressed, file extension)
+    '''
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df,preserve_index=False)
+    if data_format == 'parquet':
+        import pyarrow.parquet as pq
+        buffer = io.BytesIO()
+        # Kusto reads micro second timestamps, nano second ones are not supported by every cluster
+        pq.write_table(table,buffer,compression='snappy',coerce_timestamps='us',allow_truncated_timestamps=True)
+        return buffer.getvalue(),table.nbytes,False,'parquet'
+    if data_format == 'csv':
+        import pyarrow.csv as pa_csv
+        buffer = io.BytesIO()
+        pa_csv.write_csv(table,buffer,write_options=pa_csv.WriteOptions(include_header=False))
+        raw = buffer.getvalue()
+        return gzip.compress(raw,compresslevel=1),len(raw),True,'csv.gz'
+    raise Exception(f"Unsupported data_format {data_format}, use 'parquet' or 'csv'.")
+
+class IngestHandle:
+    '''
+    Track the chunks of one `upload_df_to_kusto` call, or the source of one `upload_csv_to_kusto`
+    or `upload_csv_from_blob` call. Every chunk is a dict with its `index`, `rows` (None for
+    files and blobs), `raw_bytes` and either the `result` (`IngestionResult`) and ingestion
+    `path` ('streaming' or 'queued'), or the `error` of sending it.
+    '''
+    def __init__(self,database,table,data_format,report_status=False,extent_tags=None) -> None:
+        self.database       = database
+        self.table          = table
+        self.data_format    = data_format
+        self.report_status  = report_status
+        self.extent_tags    = extent_tags
+        self.created_at     = datetime.now(timezone.utc)
+        self.chunks         = []
+        self._lock          = threading.Lock()
+
+    def _add_chunk(self,chunk:dict) -> None:
+        with self._lock:
+            self.chunks.append(chunk)
+            self.chunks.sort(key=lambda c: c['index'])
+
+    @property
+    def results(self) -> list:
+        return [c['result'] for c in self.chunks if 'result' in c]
+
+    @property
+    def errors(self) -> list:
+        return [c['error'] for c in self.chunks if 'error' in c]
+
+    @property
+    def source_ids(self) -> list:
+        return [r.source_id for r in self.results]
+
+    @property
+    def paths(self) -> dict:
+        '''
+        Number of chunks ingested through each path, e.g. {'streaming': 3, 'queued': 1}
+        '''
+        counts = {}
+        for c in self.chunks:
+            if 'path' in c:
+                counts[c['path']] = counts.get(c['path'],0) + 1
+        return counts
+
+    @property
+    def row_count(self) -> int:
+        '''
+        Number of rows sent, None when the row count of a sent file or blob is unknown
+        '''
+        rows = [c['rows'] for c in self.chunks if 'result' in c]
+        return None if None in rows else sum(rows)
+
+    @property
+    def raw_bytes(self) -> int:
+        return sum(c['raw_bytes'] for c in self.chunks if 'result' in c)
+
+    def __repr__(self) -> str:
+        return (
+            f"IngestHandle(table={self.table}, format={self.data_format}, chunks={len(self.chunks)}, "
+            f"rows={self.row_count}, raw_mb={self.raw_bytes / 1024 / 1024:.1f}, paths={self.paths}, errors={len(self.errors)})"
+        )
+
+def ingestion_path(result) -> str:
+    '''
+    'streaming' if the `IngestionResult` comes from a finished streaming ingestion, else 'queued'
+    '''
+    from azure.kusto.ingest import IngestionStatus
+    return 'streaming' if result.status == IngestionStatus.SUCCESS else 'queued'
+
+def ingest_frame_chunk(get_ingest_client,ingestion_props,handle:IngestHandle,index:int,df:'pd.DataFrame',call=None) -> None:
+    '''
+    Serialize one chunk in memory and send it with the client `get_ingest_client(payload size)`
+    returns, the outcome is recorded in `handle`. `call(fn)` runs the send, e.g. through the
+    reader's scheduler, a retried send reads the payload again from the start.
+    '''
+    from azure.kusto.ingest import StreamDescriptor
+    chunk = {'index':index,'rows':len(df),'raw_bytes':0}
+    try:
+        payload,raw_size,is_compressed,ext = _serialize_frame(df,handle.data_format)
+        chunk['raw_bytes']  = raw_size
+        source_id           = uuid.uuid4()
+        ingest_client       = get_ingest_client(len(payload))
+        def send():
+            descriptor = StreamDescriptor(
+                io.BytesIO(payload)
+                ,source_id      = source_id
+                ,is_compressed  = is_compressed
+                ,stream_name    = f'df_{source_id}.{ext}'
+                ,size           = raw_size
+            )
+            return ingest_client.ingest_from_stream(descriptor,ingestion_properties=ingestion_props)
+        chunk['result'] = call(send) if call is not None else send()
+        chunk['path']   = ingestion_path(chunk['result'])
+    except Exception as err:
+        print(f'ingest chunk {index} failed: {err}')
+        chunk['error'] = err
+    handle._add_chunk(chunk)
+
+class IngestTracker:
+    '''
+    Wait for queued ingestions to reach a final status, instead of polling the table row count
+    at a fixed interval.
+
+    When the data was queued with status reporting (`report_status=True`), the success and
+    failure status queues of the ingest client are read, and only the messages of the tracked
+    sources are removed from them. Without status reporting, failures are read from
+    `.show ingestion failures` and success is decided by the row count or extent tag check, so
+    `expected_row_count` is required then. Polling starts at `min_poll_sec` and backs off to
+    `max_poll_sec` while nothing changes.
+
+    Args:
+        kusto_reader (KustoReader): a reader built with `ingest_cluster_str`
+        handle (IngestHandle): the handle returned by `upload_df_to_kusto`, `upload_csv_to_kusto`
+            or `upload_csv_from_blob`, or a list of `IngestionResult`
+        expected_row_count (int): wait until the table, or its extents with `extent_tags`, holds
+            this many rows. Default is the handle's row count, when known, if `extent_tags` are checked.
+        extent_tags (list): check the rows of the extents having all these tags, default is the
+            tags of the handle
+        report_status (bool): whether the sources were queued with status reporting
+            (`ReportLevel.FailuresAndSuccesses`), default is the handle's `report_status`. An
+            `IngestionResult` does not tell, so set it for a list of results.
+        min_poll_sec (float): first poll interval
+        max_poll_sec (float): max poll interval
+
+    Example:
+        ```
+        handle  = kr.upload_df_to_kusto('target_table',df,report_status=True)
+        status  = IngestTracker(kr,handle).wait(timeout_sec=1800)
+        print(status['done'],status['failed'])
+        ```
+    '''
+    # seconds other consumers' messages stay hidden after this tracker reads them
+    _visibility_timeout_sec = 2
+
+    def __init__(
+        self
+        ,kusto_reader
+        ,handle
+        ,expected_row_count = None
+        ,extent_tags        = None
+        ,report_status      = None
+        ,min_poll_sec       = 1
+        ,max_poll_sec       = 30
+    ) -> None:
+        if isinstance(handle,IngestHandle):
+            results             = handle.results
+            self.table          = handle.table
+            self.report_status  = handle.report_status if report_status is None else report_status
+            self.since          = handle.created_at
+            extent_tags         = extent_tags if extent_tags is not None else handle.extent_tags
+            if extent_tags and expected_row_count is None:
+                expected_row_count = handle.row_count
+        else:
+            results             = list(handle)
+            self.table          = results[0].table if results else None
+            self.report_status  = bool(report_status)
+            self.since          = None
+        self.kusto_reader       = kusto_reader
+        self.expected_row_count = expected_row_count
+        self.extent_tags        = extent_tags
+        self.min_poll_sec       = min_poll_sec
+        self.max_poll_sec       = max_poll_sec
+        self.blob_paths         = {str(r.source_id):(r.blob_uri or '').split('?')[0] for r in results}
+        # streamed payloads are already ingested when the call returns
+        self.statuses           = {
+            str(r.source_id):{'status':'Succeeded','details':'streaming'} if ingestion_path(r) == 'streaming' else {'status':'Pending'}
+            for r in results
+        }
+        self.row_count          = None
+        self._queue_clients     = None
+        if self._pending() and not self.report_status and expected_row_count is None:
+            # `.show ingestion failures` only tells failures, the wait would end at the timeout
+            raise ValueError(
+                'Can not tell when the ingestion succeeds: the sources were not queued with status reporting. '
+                'Pass expected_row_count (or extent_tags with an IngestHandle of known row count), or '
+                'report_status=True if the sources were queued with ReportLevel.FailuresAndSuccesses.'
+            )
+
+    def _pending(self) -> list:
+        return [source_id for source_id,s in self.statuses.items() if s['status'] == 'Pending']
+
+    def _get_queue_clients(self) -> list:
+        if self._queue_clients is None:
+            from azure.kusto.ingest.status import KustoIngestStatusQueues,SuccessMessage,FailureMessage
+            from azure.storage.queue import QueueServiceClient,TextBase64DecodePolicy
+            status_queues       = KustoIngestStatusQueues(self.kusto_reader._queued_ingest_client())
+            self._queue_clients = [
+                (
+                    QueueServiceClient(q.account_uri).get_queue_client(queue=q.object_name,message_decode_policy=TextBase64DecodePolicy())
+                    ,message_cls
+                    ,status
+                )
+                for status_queue,message_cls,status in (
+                    (status_queues.success,SuccessMessage,'Succeeded')
+                    ,(status_queues.failure,FailureMessage,'Failed')
+                )
+                for q in status_queue.get_queues_func()
+            ]
+        return self._queue_clients
+
+    def _poll_status_queues(self) -> int:
+        '''
+        Read the status queues, remove and record the messages of tracked sources. Return the
+        number of sources that got a final status.
+        '''
+        updated = 0
+        for queue_client,message_cls,status in self._get_queue_clients():
+            messages = queue_client.receive_messages(
+                messages_per_page   = 32
+                ,max_messages       = 256
+                ,visibility_timeout = self._visibility_timeout_sec
+            )
+            for m in messages:
+                message     = message_cls(m.content)
+                source_id   = str(message.IngestionSourceId)
+                if self.statuses.get(source_id,{}).get('status') != 'Pending':
+                    continue
+                queue_client.delete_message(m.id,m.pop_receipt)
+                self.statuses[source_id] = {
+                    'status'        : status
+                    ,'details'      : getattr(message,'Details',None)
+                    ,'error_code'   : getattr(message,'ErrorCode',None)
+                }
+                updated += 1
+        return updated
+
+    def _poll_ingestion_failures(self) -> int:
+        '''
+        Record the failures of tracked sources listed by `.show ingestion failures`
+        '''
+        kql = f".show ingestion failures | where Table == '{self.table}'"
+        if self.since:
+            kql += f" | where FailedOn >= datetime({self.since.strftime('%Y-%m-%d %H:%M:%S')})"
+        r = self.kusto_reader._run_kql(kql)
+        if r is None or len(r) == 0:
+            return 0
+        path_to_source  = {path:source_id for source_id,path in self.blob_paths.items() if path}
+        updated         = 0
+        for _,row in r.iterrows():
+            source_id = str(row['IngestionSourceId']) if 'IngestionSourceId' in r.columns else None
+            if source_id not in self.statuses:
+                source_id = path_to_source.get(str(row.get('IngestionSourcePath','')).split('?')[0])
+            if source_id is None or self.statuses[source_id]['status'] != 'Pending':
+                continue
+            self.statuses[source_id] = {'status':'Failed','details':row.get('Details'),'error_code':row.get('ErrorCode')}
+            updated += 1
+        return updated
+
+    def _verify_rows(self) -> bool:
+        if self.extent_tags:
+            tag_filter  = ' and '.join(f"tags has '{tag}'" for tag in self.extent_tags)
+            kql         = f".show table ['{self.table}'] extents where {tag_filter} | summarize RowCount = sum(RowCount)"
+        else:
+            kql         = f"['{self.table}'] | count | project RowCount = Count"
+        r = self.kusto_reader._run_kql(kql)
+        if r is None or len(r) == 0 or r['RowCount'].isna().all():
+            self.row_count = 0
+        else:
+            self.row_count = int(r['RowCount'].iloc[0])
+        return self.row_count >= self.expected_row_count
+
+    def summary(self,elapsed_sec=None) -> dict:
+        '''
+        Return the current status of the tracked sources
+        '''
+        pending     = self._pending()
+        verified    = self.expected_row_count is None or (self.row_count is not None and self.row_count >= self.expected_row_count)
+        return {
+            'done'          : not pending and verified
+            ,'succeeded'    : [source_id for source_id,s in self.statuses.items() if s['status'] == 'Succeeded']
+            ,'failed'       : [dict(source_id=source_id,**s) for source_id,s in self.statuses.items() if s['status'] == 'Failed']
+            ,'pending'      : pending
+            ,'row_count'    : self.row_count
+            ,'elapsed_sec'  : elapsed_sec
+        }
+
+    def wait(self,timeout_sec=3600) -> dict:
+        '''
+        Block until every tracked source has a final status and the row check passes, or until the timeout.
+
+        Returns:
+            dict: `done`, the `succeeded`, `failed` and still `pending` source ids, the checked
+                  `row_count` and `elapsed_sec`
+        '''
+        start       = time.monotonic()
+        poll_sec    = self.min_poll_sec
+        while True:
+            if not self._pending():
+                # e.g. streamed sources, only the row check is left
+                updated = 0
+            elif self.report_status:
+                updated = self._poll_status_queues()
+            else:
+                updated = self._poll_ingestion_failures()
+                if self.expected_row_count is not None and self._pending() and self._verify_rows():
+                    for source_id in self._pending():
+                        self.statuses[source_id] = {'status':'Succeeded','details':'verified by row count'}
+                    updated += 1
+
+            elapsed = time.monotonic() - start
+            if not self._pending():
+                failed = any(st['status'] == 'Failed' for st in self.statuses.values())
+                if self.expected_row_count is None or failed or self._verify_rows() or elapsed >= timeout_sec:
+                    break
+                # all sources reported, wait for the rows to become visible
+                updated = 0
+            elif elapsed >= timeout_sec:
+                print(f'ingestion tracking timed out, {len(self._pending())} sources pending')
+                break
+            # poll fast while statuses arrive, back off with jitter while nothing changes
+            poll_sec = self.min_poll_sec if updated else min(poll_sec * 1.5,self.max_poll_sec)
+            time.sleep(min(poll_sec * random.uniform(0.8,1.2),max(timeout_sec - elapsed,0)))
+        return self.summary(elapsed_sec=time.monotonic() - start)
+# endregion
@@ -0,0 +1,270 @@
+# region Kusto local mirror
+from typing import TYPE_CHECKING
+from pathlib import Path
+import threading
+import json
+import time
+import os
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+_partition_formats = {
+    'day'   : ('D','%Y-%m-%d')
+    ,'hour' : ('h','%Y-%m-%dT%H')
+}
+
+def _utc_timestamp(value) -> 'pd.Timestamp':
+    import pandas as pd
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+def _partition_delta(partition) -> 'pd.Timedelta':
+    import pandas as pd
+    return pd.Timedelta(days=1) if partition == 'day' else pd.Timedelta(hours=1)
+
+def _kql_datetime(ts) -> str:
+    return f"datetime({ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}Z)"
+
+class KustoMirror:
+    '''
+    Local Parquet copy of a Kusto table or query, partitioned by a datetime watermark column.
+
+    `refresh` pulls the data partition by partition (one file per day or hour) and remembers the
+    largest watermark value pulled. The next `refresh` only pulls the partitions from
+    `watermark - overlap` on, so rows ingested late are picked up too. Every pulled partition
+    replaces its local file atomically, so re-pulling the overlap never duplicates rows.
+    `read` answers from the local files with column projection and time filters, only the
+    partitions within the time range are opened.
+
+    Args:
+        kusto_reader (KustoReader): the reader used to pull the data
+        source (str): a table name or a tabular query, e.g. "StormEvents | where State == 'TEXAS'"
+        watermark_column (str): the datetime column the data is partitioned and refreshed by
+        local_dir (str): the folder of the Parquet dataset
+        partition (str): `day` or `hour`
+        overlap_sec (int): late-arrival window re-pulled before the last watermark at every refresh
+        max_workers (int): max number of partitions pulled at the same time
+        chunk_rows (int): number of rows per Parquet row group
+
+    Example:
+        ```
+        mirror = kr.mirror('StormEvents','StartTime','./storm_events',partition='day',overlap_sec=6*3600)
+        mirror.refresh(start='2007-01-01')              # first full pull
+        mirror.refresh()                                # later: only the new partitions
+        df = mirror.read(columns=['StartTime','State'],start='2007-06-01',end='2007-07-01')
+        ```
+    '''
+    state_file_name = '_mirror.json'
+
+    def __init__(
+        self
+        ,kusto_reader
+        ,source:str
+        ,watermark_column:str
+        ,local_dir:str
+        ,partition      = 'day'
+        ,overlap_sec    = 3600
+        ,max_workers    = 4
+        ,chunk_rows     = 100000
+    ) -> None:
+        if partition not in _partition_formats:
+            raise ValueError(f"partition should be 'day' or 'hour', got {partition}")
+        self.kusto_reader       = kusto_reader
+        self.source             = source.strip().rstrip(';')
+        self.watermark_column   = watermark_column
+        self.local_dir          = Path(local_dir).expanduser()
+        self.partition          = partition
+        self.overlap_sec        = overlap_sec
+        self.max_workers        = max_workers
+        self.chunk_rows         = chunk_rows
+        self._lock              = threading.Lock()
+        self.local_dir.mkdir(parents=True,exist_ok=True)
+        self.state              = self._load_state()
+
+    @property
+    def _state_path(self) -> Path:
+        return self.local_dir / self.state_file_name
+
+    def _load_state(self) -> dict:
+        state = {}
+        if self._state_path.exists():
+            state = json.loads(self._state_path.read_text(encoding='utf-8'))
+            for key,value in (('source',self.source),('watermark_column',self.watermark_column),('partition',self.partition)):
+                if state.get(key) != value:
+                    raise Exception(f'{self.local_dir} mirrors {key} {state.get(key)}, not {value}. Use another local_dir.')
+        return {
+            'source'            : self.source
+            ,'watermark_column' : self.watermark_column
+            ,'partition'        : self.partition
+            ,'watermark'        : state.get('watermark')
+            ,'partitions'       : state.get('partitions',{})
+            ,'refreshed_at'     : state.get('refreshed_at')
+        }
+
+    def _save_state(self) -> None:
+        tmp_path = self._state_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.state,indent=1),encoding='utf-8')
+        os.replace(tmp_path,self._state_path)
+
+    @property
+    def watermark(self) -> 'pd.Timestamp':
+        '''
+        The largest watermark value pulled so far, None before the first refresh
+        '''
+        return None if self.state['watermark'] is None else _utc_timestamp(self.state['watermark'])
+
+    def _floor(self,ts) -> 'pd.Timestamp':
+        return ts.floor(_partition_formats[self.partition][0])
+
+    def _partition_key(self,partition_start) -> str:
+        return partition_start.strftime(_partition_formats[self.partition][1])
+
+    def _partition_range(self,start,end) -> list:
+        '''
+        Start times of the partitions overlapping [start, end)
+        '''
+        import pandas as pd
+        return list(pd.date_range(self._floor(start),end,freq=_partition_formats[self.partition][0],inclusive='left'))
+
+    def _partition_file(self,key:str) -> Path:
+        return self.local_dir / f'part={key}' / 'data.parquet'
+
+    def _slice_kql(self,partition_start,partition_end) -> str:
+        return (
+            f"{self.source}\n| where {self.watermark_column} >= {_kql_datetime(partition_start)}"
+            f" and {self.watermark_column} < {_kql_datetime(partition_end)}"
+        )
+
+    def _pull_partition(self,partition_start) -> tuple:
+        '''
+        Pull one partition into a temp file and swap it in place of the local one
+        '''
+        import pyarrow.parquet as pq
+        import pyarrow.compute as pc
+        key         = self._partition_key(partition_start)
+        next_start  = partition_start + _partition_delta(self.partition)
+        file_path   = self._partition_file(key)
+        file_path.parent.mkdir(parents=True,exist_ok=True)
+        tmp_path    = file_path.with_name(f'data.{threading.get_ident()}.tmp')
+        try:
+            row_cnt = self.kusto_reader.run_kql_to_parquet(self._slice_kql(partition_start,next_start),str(tmp_path),chunk_rows=self.chunk_rows)
+            max_value = None
+            if row_cnt > 0:
+                column      = pq.read_table(tmp_path,columns=[self.watermark_column]).column(0)
+                max_value   = pc.max(column).as_py()
+            os.replace(tmp_path,file_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return key,row_cnt,max_value
+
+    def _first_watermark(self) -> 'pd.Timestamp':
+        r = self.kusto_reader.run_kql(f"{self.source}\n| summarize azdsdr_min = min({self.watermark_column})")
+        if r is None or len(r) == 0 or r['azdsdr_min'].isna().all():
+            return None
+        return _utc_timestamp(r['azdsdr_min'].iloc[0])
+
+    def refresh(self,start=None,end=None) -> dict:
+        '''
+        Pull the partitions from the last watermark minus `overlap_sec` up to `end`. The first
+        refresh starts at `start`, or at the smallest watermark value of the source.
+
+        Args:
+            start (str|datetime): pull from here instead of the last watermark, e.g. to backfill
+            end (str|datetime): pull up to here, default is now (UTC)
+
+        Returns:
+            dict: pulled `partitions`, `rows`, new `watermark` and `elapsed_sec`
+        '''
+        import pandas as pd
+        from concurrent.futures import ThreadPoolExecutor
+        started_at  = time.monotonic()
+        end         = _utc_timestamp(end) if end is not None else pd.Timestamp.now(tz='UTC')
+        if start is not None:
+            start = _utc_timestamp(start)
+        elif self.watermark is not None:
+            start = self.watermark - pd.Timedelta(seconds=self.overlap_sec)
+        else:
+            start = self._first_watermark()
+            if start is None:
+                print(f'no data in {self.source}')
+                return {'partitions':[],'rows':0,'watermark':None,'elapsed_sec':0}
+
+        partitions  = self._partition_range(start,end)
+        pulled      = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for key,row_cnt,max_value in executor.map(self._pull_partition,partitions):
+                print(f'partition {key}: {row_cnt} rows')
+                pulled.append((key,row_cnt,max_value))
+
+        with self._lock:
+            watermarks = [_utc_timestamp(v) for _,_,v in pulled if v is not None]
+            if self.watermark is not None:
+                watermarks.append(self.watermark)
+            if watermarks:
+                self.state['watermark'] = max(watermarks).isoformat()
+            for key,row_cnt,_ in pulled:
+                self.state['partitions'][key] = row_cnt
+            self.state['refreshed_at'] = pd.Timestamp.now(tz='UTC').isoformat()
+            self._save_state()
+        return {
+            'partitions'    : [key for key,_,_ in pulled]
+            ,'rows'         : sum(row_cnt for _,row_cnt,_ in pulled)
+            ,'watermark'    : self.watermark
+            ,'elapsed_sec'  : round(time.monotonic() - started_at,3)
+        }
+
+    def _local_files(self,start=None,end=None) -> list:
+        '''
+        Files of the local partitions overlapping [start, end)
+        '''
+        files = []
+        delta = _partition_delta(self.partition)
+        for key in sorted(self.state['partitions']):
+            partition_start = _utc_timestamp(key)
+            if start is not None and partition_start + delta <= start:
+                continue
+            if end is not None and partition_start >= end:
+                continue
+            if self._partition_file(key).exists():
+                files.append(str(self._partition_file(key)))
+        return files
+
+    def read_arrow(self,columns=None,start=None,end=None,filter=None) -> 'pa.Table':
+        '''
+        Same as `read`, return a pyarrow Table
+        '''
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        start   = _utc_timestamp(start) if start is not None else None
+        end     = _utc_timestamp(end) if end is not None else None
+        files   = self._local_files(start,end)
+        if not files:
+            raise Exception(f'No local data in {self.local_dir}, call refresh first.')
+        dataset = ds.dataset(files,format='parquet')
+        field   = ds.field(self.watermark_column)
+        time_type = dataset.schema.field(self.watermark_column).type
+        if start is not None:
+            filter = (field >= pa.scalar(start,type=time_type)) if filter is None else filter & (field >= pa.scalar(start,type=time_type))
+        if end is not None:
+            filter = (field < pa.scalar(end,type=time_type)) if filter is None else filter & (field < pa.scalar(end,type=time_type))
+        return dataset.to_table(columns=columns,filter=filter)
+
+    def read(self,columns=None,start=None,end=None,filter=None) -> 'pd.DataFrame':
+        '''
+        Read the local copy, only the partitions overlapping [start, end) are opened and only
+        the requested columns are read.
+
+        Args:
+            columns (list): columns to read, default is all
+            start (str|datetime): rows with a watermark value >= start, naive times are UTC
+            end (str|datetime): rows with a watermark value < end
+            filter (pyarrow.dataset.Expression): more row filters, e.g. `ds.field('State') == 'TEXAS'`
+
+        Returns:
+            pd.DataFrame: the rows
+        '''
+        return self.read_arrow(columns=columns,start=start,end=end,filter=filter).to_pandas()
+# endregion
@@ -0,0 +1,187 @@
+# region Kusto schema catalog
+from typing import TYPE_CHECKING
+import threading
+import json
+import time
+import re
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# control commands that change the table list or table schemas of a database
+_schema_command_re = re.compile(
+    r'^\s*\.((create|create-merge|create-or-alter|alter|alter-merge|drop|rename)(\s+async)?\s+(table|tables|column|columns)\b'
+    r'|(set|set-or-append|set-or-replace)\s)'
+    ,re.IGNORECASE
+)
+
+def is_schema_command(kql:str) -> bool:
+    '''
+    Return True if the Kusto control command may change tables or their columns
+    '''
+    return _schema_command_re.match(kql) is not None
+
+class KustoSchemaCatalog:
+    '''
+    In-memory catalog of the tables, columns, types and folders of one Kusto database.
+
+    The whole database schema is loaded with a single `.show database schema as json` command
+    and the metadata helpers of `KustoReader` (`is_table_exist`, `list_tables`,
+    `get_table_schema`, `get_table_folder`) are answered from it. After `ttl_sec` the schema
+    is checked again with `if_later_than`, so an unchanged database costs a tiny response.
+    `KustoReader` updates the catalog after its own `.create`/`.drop` calls.
+
+    Args:
+        kusto_reader (KustoReader): the reader used to load the schema
+        ttl_sec (int): seconds before the schema is checked for changes again
+
+    Example:
+        ```
+        kr = KustoReader(cluster=cluster,db=db,schema_cache_ttl_sec=600)
+        kr.schema_catalog.is_table_exist('StormEvents')
+        kr.schema_catalog.refresh()     # force a reload
+        ```
+    '''
+    def __init__(self,kusto_reader,ttl_sec=300) -> None:
+        self.kusto_reader   = kusto_reader
+        self.ttl_sec        = ttl_sec
+        self._lock          = threading.RLock()
+        self._tables        = {}    # lower case table name -> table dict
+        self._version       = None
+        self._loaded_at     = None
+
+    def _show_schema_kql(self,if_later_than=None) -> str:
+        version_filter = f' if_later_than "{if_later_than}"' if if_later_than else ''
+        return f".show database ['{self.kusto_reader.db}'] schema{version_filter} as json"
+
+    def refresh(self,force=True) -> None:
+        '''
+        Reload the database schema. With `force=False` only a schema newer than the loaded
+        version is downloaded.
+        '''
+        with self._lock:
+            if_later_than = None if force else self._version
+            r = self.kusto_reader._run_kql(self._show_schema_kql(if_later_than))
+            if r is None:
+                raise Exception(f'Load the schema of database {self.kusto_reader.db} failed.')
+            if len(r) > 0:
+                self._load_schema_json(r.iloc[0,0])
+            self._loaded_at = time.monotonic()
+
+    def _load_schema_json(self,schema_json) -> None:
+        schema      = json.loads(schema_json) if isinstance(schema_json,str) else schema_json
+        databases   = schema.get('Databases',{})
+        database    = next(
+            (d for name,d in databases.items() if name.lower() == str(self.kusto_reader.db).lower())
+            ,next(iter(databases.values()),{})
+        )
+        tables = {}
+        for table_name,table in (database.get('Tables') or {}).items():
+            tables[table_name.lower()] = self._table_entry(
+                table.get('Name') or table_name
+                ,[(c['Name'],c.get('CslType') or c.get('Type')) for c in table.get('OrderedColumns') or []]
+                ,table.get('Folder') or ''
+                ,table.get('DocString') or ''
+            )
+        self._tables = tables
+        if 'MajorVersion' in database and 'MinorVersion' in database:
+            self._version = f"v{database['MajorVersion']}.{database['MinorVersion']}"
+        else:
+            self._version = None
+
+    def _table_entry(self,table_name,columns,folder='',docstring='') -> dict:
+        return {
+            'name'          : table_name
+            ,'columns'      : list(columns)
+            ,'folder'       : folder
+            ,'docstring'    : docstring
+        }
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            if self._loaded_at is None:
+                self.refresh()
+            elif time.monotonic() - self._loaded_at > self.ttl_sec:
+                self.refresh(force=False)
+
+    def invalidate(self) -> None:
+        '''
+        Drop the loaded schema, the next lookup reloads it
+        '''
+        with self._lock:
+            self._tables    = {}
+            self._version   = None
+            self._loaded_at = None
+
+    def add_table(self,table_name,columns,folder='',docstring='') -> None:
+        '''
+        Record a table created by this process.
+
+        Args:
+            table_name (str): the table name
+            columns (list): list of (column name, Kusto type) pairs
+            folder (str): the table folder
+        '''
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._tables[table_name.lower()] = self._table_entry(table_name,columns,folder,docstring)
+            # the database version moved, next refresh downloads the whole schema
+            self._version = None
+
+    def drop_table(self,table_name) -> None:
+        '''
+        Forget a table dropped by this process
+        '''
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._tables.pop(table_name.lower(),None)
+            self._version = None
+
+    def _get_table(self,table_name) -> dict:
+        self._ensure_fresh()
+        table = self._tables.get(table_name.lower())
+        if table is None:
+            raise Exception(f'Table {table_name} does not exist in database {self.kusto_reader.db}.')
+        return table
+
+    def is_table_exist(self,table_name) -> bool:
+        '''
+        Check if the target table is existed, table names are compared case-insensitively.
+        '''
+        self._ensure_fresh()
+        return table_name.lower() in self._tables
+
+    def list_tables(self,folder_name=None) -> 'pd.DataFrame':
+        '''
+        Return DatabaseName, TableName, Folder and DocString of the tables, ordered by table name,
+        optionally only the tables whose folder contains `folder_name`.
+        '''
+        import pandas as pd
+        self._ensure_fresh()
+        with self._lock:
+            tables = list(self._tables.values())
+        if folder_name:
+            tables = [t for t in tables if folder_name.lower() in t['folder'].lower()]
+        rows = [(self.kusto_reader.db,t['name'],t['folder'],t['docstring']) for t in sorted(tables,key=lambda t: t['name'])]
+        return pd.DataFrame(rows,columns=['DatabaseName','TableName','Folder','DocString'])
+
+    def get_table_columns(self,table_name) -> list:
+        '''
+        Return the (column name, Kusto type) pairs of the table
+        '''
+        return list(self._get_table(table_name)['columns'])
+
+    def get_table_schema(self,table_name) -> str:
+        '''
+        Return the table schema in format as "ColumnName1:type2,ColumnName2:type2"
+        '''
+        return ",".join(f"{name}:{column_type}" for name,column_type in self.get_table_columns(table_name))
+
+    def get_table_folder(self,table_name) -> str:
+        '''
+        Get target table's folder path string
+        '''
+        return self._get_table(table_name)['folder']
+# endregion
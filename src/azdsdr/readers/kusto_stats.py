@@ -0,0 +1,221 @@
+# region Kusto query statistics
+from typing import TYPE_CHECKING
+from collections import deque
+from datetime import datetime,timezone
+import threading
+import json
+
+from .cache import normalize_query
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_stat_columns = [
+    'timestamp'
+    ,'client_request_id'
+    ,'database'
+    ,'query'
+    ,'wall_sec'
+    ,'server_exec_sec'
+    ,'cpu_sec'
+    ,'memory_peak_bytes'
+    ,'extents_total'
+    ,'extents_scanned'
+    ,'rows_total'
+    ,'rows_scanned'
+    ,'cache_memory_hits'
+    ,'cache_memory_misses'
+    ,'cache_disk_hits'
+    ,'cache_disk_misses'
+    ,'result_rows'
+    ,'error'
+]
+
+def _timespan_sec(value):
+    from .kusto_convert import _parse_timespan_value
+    if value is None:
+        return None
+    try:
+        return _parse_timespan_value(value).total_seconds()
+    except (ValueError,TypeError):
+        return None
+
+def _dig(d:dict,*keys):
+    for key in keys:
+        if not isinstance(d,dict):
+            return None
+        d = d.get(key)
+    return d
+
+def parse_resource_consumption(payload) -> dict:
+    '''
+    Flatten the `QueryResourceConsumption` payload of a query completion table
+    '''
+    if isinstance(payload,str):
+        payload = json.loads(payload)
+    usage   = payload.get('resource_usage') or {}
+    inputs  = payload.get('input_dataset_statistics') or {}
+    return {
+        'server_exec_sec'       : payload.get('ExecutionTime')
+        ,'cpu_sec'              : _timespan_sec(_dig(usage,'cpu','total cpu'))
+        ,'memory_peak_bytes'    : _dig(usage,'memory','peak_per_node')
+        ,'extents_total'        : _dig(inputs,'extents','total')
+        ,'extents_scanned'      : _dig(inputs,'extents','scanned')
+        ,'rows_total'           : _dig(inputs,'rows','total')
+        ,'rows_scanned'         : _dig(inputs,'rows','scanned')
+        ,'cache_memory_hits'    : _dig(usage,'cache','memory','hits')
+        ,'cache_memory_misses'  : _dig(usage,'cache','memory','misses')
+        ,'cache_disk_hits'      : _dig(usage,'cache','disk','hits')
+        ,'cache_disk_misses'    : _dig(usage,'cache','disk','misses')
+    }
+
+def _completion_table(response):
+    from azure.kusto.data._models import WellKnownDataSet
+    return next((t for t in response.tables if t.table_kind == WellKnownDataSet.QueryCompletionInformation),None)
+
+def response_stats(response) -> dict:
+    '''
+    Server statistics of a `KustoResponseDataSet`: result row count and the resource consumption
+    reported in the query completion table of v2 responses. Control commands have none.
+    '''
+    stats = {'result_rows':sum(len(t.raw_rows) for t in response.primary_results)}
+    table = _completion_table(response)
+    if table is None:
+        return stats
+    names = [c.column_name for c in table.columns]
+    if 'EventTypeName' not in names or 'Payload' not in names:
+        return stats
+    event_index,payload_index = names.index('EventTypeName'),names.index('Payload')
+    for row in table.raw_rows:
+        if row[event_index] == 'QueryResourceConsumption':
+            try:
+                stats.update(parse_resource_consumption(row[payload_index]))
+            except (ValueError,AttributeError):
+                pass
+            break
+    return stats
+
+class QueryStatsRecorder:
+    '''
+    Bounded in-memory log of the queries a `KustoReader` sent: client request id, wall time,
+    server execution time, CPU, memory peak, extents and rows scanned, cache hits and misses.
+    The oldest records are dropped after `max_records`. Every record can also be appended to a
+    JSONL file and passed to a callback, e.g. to forward it to a telemetry system.
+
+    Args:
+        max_records (int): size of the ring buffer
+        export_path (str): append every record as one json line to this file
+        callback (callable): called with every record dict
+
+    Example:
+        ```
+        from azdsdr.readers import KustoReader,QueryStatsRecorder
+        stats = QueryStatsRecorder(max_records=5000,export_path='kusto_stats.jsonl')
+        kr    = KustoReader(cluster=cluster,db=db,query_stats=stats)
+        ...
+        print(stats.summary(top=10,by='cpu_sec'))
+        ```
+    '''
+    def __init__(self,max_records=1000,export_path=None,callback=None) -> None:
+        self.max_records    = max_records
+        self.export_path    = export_path
+        self.callback       = callback
+        self._records       = deque(maxlen=max_records)
+        self._lock          = threading.Lock()
+
+    def record(
+        self
+        ,query:str
+        ,client_request_id:str
+        ,wall_sec:float
+        ,database   = None
+        ,response   = None
+        ,error      = None
+    ) -> dict:
+        '''
+        Record one call, the server statistics are read from the response when there is one
+        '''
+        stats = dict.fromkeys(_stat_columns)
+        stats.update({
+            'timestamp'             : datetime.now(timezone.utc).isoformat()
+            ,'client_request_id'    : client_request_id
+            ,'database'             : database
+            ,'query'                : query
+            ,'wall_sec'             : round(wall_sec,6)
+            ,'error'                : None if error is None else f'{type(error).__name__}: {error}'
+        })
+        if response is not None:
+            try:
+                stats.update(response_stats(response))
+            except Exception as err:
+                print(f'read query statistics failed: {err}')
+        with self._lock:
+            self._records.append(stats)
+            if self.export_path:
+                with open(self.export_path,'a',encoding='utf-8') as f:
+                    f.write(json.dumps(stats,default=str) + '\n')
+        if self.callback is not None:
+            try:
+                self.callback(stats)
+            except Exception as err:
+                print(f'query statistics callback failed: {err}')
+        return stats
+
+    def records(self) -> list:
+        '''
+        The recorded query statistics, oldest first
+        '''
+        with self._lock:
+            return list(self._records)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def to_frame(self) -> 'pd.DataFrame':
+        import pandas as pd
+        return pd.DataFrame(self.records(),columns=_stat_columns)
+
+    def summary(self,top=10,by='cpu_sec') -> 'pd.DataFrame':
+        '''
+        Rank the most expensive queries. Calls of the same query text (whitespace normalized)
+        are grouped, and the groups are sorted by the total of `by`.
+
+        Args:
+            top (int): number of queries returned
+            by (str): `cpu_sec`, `wall_sec`, `server_exec_sec`, `memory_peak_bytes`,
+                `rows_scanned` or `extents_scanned`
+
+        Returns:
+            pd.DataFrame: query, calls, errors, total and mean wall/server/cpu seconds, max memory
+                peak, scanned extents and rows, and the cache hit ratio
+        '''
+        import pandas as pd
+        df = self.to_frame()
+        if df.empty:
+            return df
+        df['query_key'] = df['query'].map(normalize_query)
+        numeric         = ['wall_sec','server_exec_sec','cpu_sec','memory_peak_bytes','extents_scanned','rows_scanned'
+                           ,'cache_memory_hits','cache_memory_misses','cache_disk_hits','cache_disk_misses']
+        df[numeric]     = df[numeric].apply(pd.to_numeric,errors='coerce')
+        groups          = df.groupby('query_key',sort=False)
+        summary         = pd.DataFrame({
+            'query'                 : groups['query'].first()
+            ,'calls'                : groups.size()
+            ,'errors'               : groups['error'].count()
+            ,'wall_sec'             : groups['wall_sec'].sum()
+            ,'mean_wall_sec'        : groups['wall_sec'].mean()
+            ,'server_exec_sec'      : groups['server_exec_sec'].sum(min_count=1)
+            ,'cpu_sec'              : groups['cpu_sec'].sum(min_count=1)
+            ,'mean_cpu_sec'         : groups['cpu_sec'].mean()
+            ,'memory_peak_bytes'    : groups['memory_peak_bytes'].max()
+            ,'extents_scanned'      : groups['extents_scanned'].sum(min_count=1)
+            ,'rows_scanned'         : groups['rows_scanned'].sum(min_count=1)
+        })
+        hits                = groups['cache_memory_hits'].sum() + groups['cache_disk_hits'].sum()
+        misses              = groups['cache_memory_misses'].sum() + groups['cache_disk_misses'].sum()
+        summary['cache_hit_ratio'] = (hits / (hits + misses)).where(hits + misses > 0)
+        if by not in summary.columns or by == 'query':
+            raise ValueError(f'Can not rank the queries by {by}')
+        return summary.sort_values(by,ascending=False,na_position='last').head(top).reset_index(drop=True)
+# endregion
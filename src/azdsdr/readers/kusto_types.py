@@ -0,0 +1,245 @@
+# region Kusto schema inference
+from typing import TYPE_CHECKING
+import json
+import re
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# candidate Kusto types of a text column, the first one every value parses as wins
+_text_types = ['bool','long','real','datetime','guid','dynamic','string']
+
+_long_re    = re.compile(r'^[+-]?\d{1,18}$')
+# ids and zip codes like 007 would lose their leading zeros as numbers
+_leading_zero_re = re.compile(r'^[+-]?0\d')
+_guid_re    = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+
+def _is_json_container(value:str) -> bool:
+    try:
+        return isinstance(json.loads(value),(dict,list))
+    except ValueError:
+        return False
+
+def _text_type_checks(values:'pd.Series') -> dict:
+    '''
+    Return {kusto type: check}, every check tells if all the non empty text values parse as that type
+    '''
+    import pandas as pd
+    return {
+        'bool'      : lambda: values.str.lower().isin(['true','false']).all()
+        ,'long'     : lambda: values.str.match(_long_re).all() and not values.str.match(_leading_zero_re).any()
+        ,'real'     : lambda: pd.to_numeric(values,errors='coerce').notna().all() and not values.str.match(_leading_zero_re).any()
+        ,'datetime' : lambda: pd.to_datetime(values,format='ISO8601',errors='coerce',utc=True).notna().all()
+        ,'guid'     : lambda: values.str.match(_guid_re).all()
+        ,'dynamic'  : lambda: values.str.match(r'^\s*[\[{]').all() and all(_is_json_container(v) for v in values)
+        ,'string'   : lambda: True
+    }
+
+def _narrow_text_types(candidates:list,values:'pd.Series') -> list:
+    '''
+    Remove the candidate types some of the text values do not parse as
+    '''
+    values = values.dropna().astype(str).str.strip()
+    values = values[values != '']
+    if len(values) == 0:
+        return candidates
+    checks = _text_type_checks(values)
+    return [t for t in candidates if checks[t]()]
+
+def _resolve(candidates:list,seen_values:bool) -> str:
+    # a column without any value in the sample stays a string
+    return candidates[0] if seen_values else 'string'
+
+def _object_column_type(values:'pd.Series') -> str:
+    '''
+    Kusto type of an object column from the python types of its values
+    '''
+    import datetime
+    import decimal
+    import uuid
+    values = values.dropna()
+    if len(values) == 0:
+        return 'string'
+    python_types = set(map(type,values))
+    if all(issubclass(t,(dict,list)) for t in python_types):
+        return 'dynamic'
+    if all(issubclass(t,bool) for t in python_types):
+        return 'bool'
+    if all(issubclass(t,int) and not issubclass(t,bool) for t in python_types):
+        return 'long'
+    if all(issubclass(t,(int,float,decimal.Decimal)) and not issubclass(t,bool) for t in python_types):
+        return 'real'
+    if all(issubclass(t,(datetime.datetime,datetime.date)) for t in python_types):
+        return 'datetime'
+    if all(issubclass(t,uuid.UUID) for t in python_types):
+        return 'guid'
+    if all(issubclass(t,str) for t in python_types):
+        return _resolve(_narrow_text_types(list(_text_types),values),True)
+    return 'string'
+
+def infer_kusto_schema(df:'pd.DataFrame',sample_rows=100000,column_types=None) -> list:
+    '''
+    Infer the Kusto column types of a DataFrame. Typed columns are mapped from their dtype,
+    text and object columns from the values of the first `sample_rows` rows.
+
+    Args:
+        df (pd.DataFrame): the data
+        sample_rows (int): number of rows used to infer text and object columns
+        column_types (dict): explicit {column name: Kusto type} overrides
+
+    Returns:
+        list: (column name, Kusto type) pairs in column order
+
+    Example:
+        ```
+        from azdsdr.readers import infer_kusto_schema
+        schema = infer_kusto_schema(df,column_types={'zip_code':'string'})
+        ```
+    '''
+    import pandas as pd
+    from pandas.api import types as pd_types
+    column_types    = column_types or {}
+    schema          = []
+    sample          = df.iloc[:sample_rows]
+    for name in df.columns:
+        dtype = df[name].dtype
+        if name in column_types:
+            kusto_type = column_types[name]
+        elif pd_types.is_bool_dtype(dtype):
+            kusto_type = 'bool'
+        elif pd_types.is_integer_dtype(dtype):
+            kusto_type = 'long'
+        elif pd_types.is_float_dtype(dtype):
+            kusto_type = 'real'
+        elif pd_types.is_datetime64_any_dtype(dtype):
+            kusto_type = 'datetime'
+        elif pd_types.is_timedelta64_dtype(dtype):
+            kusto_type = 'timespan'
+        elif isinstance(dtype,pd.CategoricalDtype):
+            kusto_type = _object_column_type(pd.Series(dtype.categories))
+        else:
+            kusto_type = _object_column_type(sample[name])
+        schema.append((str(name),kusto_type))
+    return schema
+
+def infer_csv_schema(csv_file_path,sample_rows=100000,chunk_rows=20000,column_types=None,**read_csv_kwargs) -> list:
+    '''
+    Infer the Kusto column types of a csv file with a header line. Up to `sample_rows` rows are
+    read as text in chunks of `chunk_rows`, so memory stays bounded for large files. A column
+    gets the first of bool, long, real, datetime, guid, dynamic and string that all its non
+    empty values parse as.
+
+    Args:
+        csv_file_path (str): the csv file path
+        sample_rows (int): number of rows used to infer the types, None to read the whole file
+        chunk_rows (int): number of rows read at a time
+        column_types (dict): explicit {column name: Kusto type} overrides
+        read_csv_kwargs: more arguments of `pd.read_csv`, e.g. `sep` or `encoding`
+
+    Returns:
+        list: (column name, Kusto type) pairs in column order
+    '''
+    import pandas as pd
+    column_types    = column_types or {}
+    candidates      = None
+    seen_values     = None
+    reader          = pd.read_csv(
+        csv_file_path
+        ,dtype              = str
+        ,keep_default_na    = False
+        ,chunksize          = chunk_rows
+        ,nrows              = sample_rows
+        ,**read_csv_kwargs
+    )
+    with reader:
+        for chunk in reader:
+            if candidates is None:
+                columns     = [str(c) for c in chunk.columns]
+                candidates  = {c:list(_text_types) for c in columns}
+                seen_values = {c:False for c in columns}
+            for c in columns:
+                if c in column_types or candidates[c] == ['string']:
+                    continue
+                values          = chunk[c]
+                seen_values[c]  = seen_values[c] or bool((values.str.strip() != '').any())
+                candidates[c]   = _narrow_text_types(candidates[c],values)
+    if candidates is None:
+        # header only file
+        columns = [str(c) for c in pd.read_csv(csv_file_path,nrows=0,**read_csv_kwargs).columns]
+        return [(c,column_types.get(c,'string')) for c in columns]
+    return [(c,column_types.get(c) or _resolve(candidates[c],seen_values[c])) for c in columns]
+
+def create_table_kql(table_name,schema:list,folder='') -> str:
+    '''
+    Build the `.create table` command of a (column name, Kusto type) schema
+    '''
+    columns_str = '\n            ,'.join(f"['{name}']:{kusto_type}" for name,kusto_type in schema)
+    return f'''
+        .create table ['{table_name}'] (
+            {columns_str}
+        ) with (
+            folder = '{folder}'
+        )
+        '''
+
+def csv_mapping(schema:list) -> list:
+    '''
+    Build the CSV ingestion mapping of a schema, the n-th csv field goes to the n-th column
+    '''
+    return [
+        {'Column':name,'DataType':kusto_type,'Properties':{'Ordinal':str(i)}}
+        for i,(name,kusto_type) in enumerate(schema)
+    ]
+
+def csv_mapping_name(table_name) -> str:
+    '''
+    Name of the csv ingestion mapping created with a table
+    '''
+    return f'{table_name}_csv_mapping'
+
+def create_csv_mapping_kql(table_name,mapping_name,schema:list) -> str:
+    '''
+    Build the `.create-or-alter ingestion csv mapping` command of a schema
+    '''
+    mapping_json = json.dumps(csv_mapping(schema)).replace("'","\\'")
+    return f".create-or-alter table ['{table_name}'] ingestion csv mapping '{mapping_name}' '{mapping_json}'"
+
+def _is_missing(value) -> bool:
+    '''
+    True for None, NaN, NaT and pd.NA, lists and dicts of `dynamic` values are never missing
+    '''
+    import pandas as pd
+    return value is None or (pd.api.types.is_scalar(value) and pd.isna(value))
+
+def coerce_frame_to_schema(df:'pd.DataFrame',schema:list) -> 'pd.DataFrame':
+    '''
+    Convert text and object columns to the types inferred for them, so the serialized values
+    match the table: numbers, datetimes and bools are parsed, `dynamic` values become json text.
+    Missing values stay missing in every type, and empty text is a missing bool.
+    '''
+    import pandas as pd
+    from pandas.api import types as pd_types
+    converted = {}
+    for name,kusto_type in schema:
+        s = df[name]
+        if not (pd_types.is_object_dtype(s.dtype) or pd_types.is_string_dtype(s.dtype)):
+            continue
+        if kusto_type == 'dynamic':
+            converted[name] = pd.Series([None if _is_missing(v) else v if isinstance(v,str) else json.dumps(v,default=str) for v in s],index=s.index,dtype=object)
+        elif kusto_type == 'long':
+            converted[name] = pd.to_numeric(s,errors='coerce').astype('Int64')
+        elif kusto_type == 'real':
+            converted[name] = pd.to_numeric(s,errors='coerce').astype('float64')
+        elif kusto_type == 'datetime':
+            converted[name] = pd.to_datetime(s,format='ISO8601',errors='coerce',utc=True)
+        elif kusto_type == 'bool':
+            converted[name] = pd.array(
+                [None if _is_missing(v) or str(v).strip() == '' else v if isinstance(v,bool) else str(v).strip().lower() == 'true' for v in s]
+                ,dtype = 'boolean'
+            )
+        elif kusto_type in ('string','guid'):
+            converted[name] = pd.Series([None if _is_missing(v) else v if isinstance(v,str) else str(v) for v in s],index=s.index,dtype=object)
+    if not converted:
+        return df
+    return df.assign(**converted)
+# endregion
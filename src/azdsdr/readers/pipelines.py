@@ -0,0 +1,297 @@
+# region pipelines
+import uuid
+import time
+import os
+
+from .config import load_config
+from .dremio import DremioReader
+from .kusto import KustoReader
+from .kusto_types import csv_mapping_name
+from .cosmos import CosmosReader
+from .blob import AzureBlobReader
+
+class Pipelines:
+    def __init__(self,**kwargs) -> None:
+        '''
+        kwargs:
+            kusto_cluster
+            ,kusto_cluster_ingest
+            ,kusto_db
+            ,dremio_user_name
+            ,dremio_host
+            ,azure_blob_container
+        '''
+        if kwargs:
+            self.kusto_cluster         = kwargs.get('kusto_cluster','')
+            self.kusto_cluster_ingest  = kwargs.get('kusto_cluster_ingest','')
+            self.kusto_db              = kwargs.get('kusto_db','')
+            self.dremio_user_name      = kwargs.get('dremio_user_name','')
+            self.dremio_host           = kwargs.get('dremio_host','')
+            self.azure_blob_container  = kwargs.get('azure_blob_container','')
+
+    def load_azure_blob_context(self):
+        '''
+        The function will load the secret blob connection str to the object context
+        If the constr is provided, the constr will override existing constr.
+
+        The connection string is stored in `.azureblob_constr` file locate in the home folder.
+
+        If no `.azureblob_constr` exists. raise an error message.
+        '''
+        con_str = load_config()['azure_blob_connstr']
+
+        # AzureBlobReader automatically load the connection, if no conn string is passed in.
+        self.abr = AzureBlobReader(
+            container_name = self.azure_blob_container
+        )
+        print('Azure blob Reader is ready')
+
+    def load_dremio_context(self):
+        '''
+        The function will load Dremio token from configure file .dremio_token.
+        '''
+        # The DremioReader object will look for token automatically.
+        self.dr  = DremioReader(
+            username    = self.dremio_user_name
+            ,host       = self.dremio_host
+        )
+        print('Dremio Reader object is ready')
+
+    def load_kusto_context(self):
+        '''
+        The function will prepare the Kusto Reader object.
+        '''
+        self.kr = KustoReader(
+            cluster             = self.kusto_cluster
+            ,db                 = self.kusto_db
+            ,ingest_cluster_str = self.kusto_cluster_ingest
+        )
+        print('Kusto Reader is ready')
+
+    def cosmos_to_kusto(
+        self
+        ,scope_exe_path:str
+        ,vc_path:str
+        ,vc_temp_file_path:str
+        ,account:str
+        ,scope_script:str
+        ,local_csv_file_path:str
+        ,blob_connect_str:str
+        ,blob_container:str
+        ,blob_file_path:str
+        ,kusto_cluster:str
+        ,kusto_db:str
+        ,kusto_ingest_cluster:str
+        ,kusto_target_table_name:str
+        ,kusto_target_folder_name:str
+    ):
+        '''
+        Run cosmos scope script and save data to Kusto
+        '''
+        try:
+            # extract data from cosmos to local csv
+            cr  = CosmosReader(
+                scope_exe_path  = scope_exe_path
+                ,client_account = account
+                ,vc_path        = vc_path
+            )
+            r   = cr.scope_query(
+                scope_script        = scope_script
+                ,temp_data_path     = vc_temp_file_path
+                ,temp_query_data    = local_csv_file_path
+            )
+            print('data returned from cosmos:',r)
+
+            # upload to Azure blob container
+            abr = AzureBlobReader(
+                blob_conn_str   = blob_connect_str
+                ,container_name = blob_container
+            )
+            abr.upload_file_chunks(
+                blob_file_path  = blob_file_path
+                ,local_file_path= local_csv_file_path
+            )
+            sas_url = abr.get_blob_sas_url(
+                blob_file_path  = blob_file_path
+            )
+            print(f'local data {local_csv_file_path} uploaded to Azure Blob {blob_file_path}')
+
+            # ingest to kusto
+            kr = KustoReader(
+                cluster             = kusto_cluster
+                ,db                 = kusto_db
+                ,ingest_cluster_str = kusto_ingest_cluster
+            )
+            kr.create_table_from_csv(
+                kusto_table_name    = kusto_target_table_name
+                ,csv_file_path      = local_csv_file_path
+                ,kusto_folder       = kusto_target_folder_name
+            )
+            print(f'kusto table {kusto_target_table_name} is createed based on the csv file {local_csv_file_path}')
+            kr.upload_csv_from_blob(
+                target_table_name   = kusto_target_table_name
+                ,blob_sas_url       = sas_url
+                ,mapping_name       = csv_mapping_name(kusto_target_table_name)
+            )
+            kr.check_table_data(kusto_target_table_name)
+
+        finally:
+            # clean up files
+            # # clean up local csv
+            import os
+            #os.remove('temp.script')
+            os.remove(local_csv_file_path)
+            # # clean up cosmos csv
+            #cr.delete_file_from_cosmos(vc_temp_file_path)
+            # # delete file from blob
+            abr.delete_blob_file(blob_file_path)
+
+            print('all temp data cleared')
+
+        print('all done')
+
+    def dremio_to_kusto(
+        self
+        ,dremio_sql
+        ,kusto_table_name
+        ,folder_name
+    ):
+        '''
+        The function will execute the input dremio sql, and upload data to kusto.
+        1. Execute the SQL to store data in pandas dataframe object
+        2. Save df data to csv file, without index included
+        3. Upload the csv file to Azure blob
+        4. Create empty kusto table with the column types inferred from the dataframe
+        5. Get the Azure blob sas url
+        6. Ingest data to Kusto from Azure blob
+        7. Check data existing
+        8. Finally, remove local csv file, remove azure blob file.
+        '''
+        try:
+            self.load_azure_blob_context()
+            self.load_dremio_context()
+            self.load_kusto_context()
+            # 1. Execute the SQL to store data in pandas dataframe object
+            r_df = self.dr.run_sql(dremio_sql)
+            # 2. Save df data to csv file, without index included
+            csv_file_name = f"{uuid.uuid1()}.csv"
+            r_df.to_csv(csv_file_name,index=False)
+            # 3. Upload the csv file to Azure blob
+            self.abr.upload_file_chunks(blob_file_path=csv_file_name,local_file_path=csv_file_name)
+            # 4. Create empty kusto table with the column types inferred from the dataframe
+            self.kr.create_table_from_df (
+                kusto_table_name    = kusto_table_name
+                ,df_data            = r_df
+                ,kusto_folder       = folder_name
+            )
+            # 5. Get the Azure blob sas url
+            blob_sas_url = self.abr.get_blob_sas_url (
+                blob_file_path=csv_file_name
+            )
+            # 6. Ingest data to Kusto from Azure blob
+            self.kr.upload_csv_from_blob (
+                target_table_name   = kusto_table_name
+                ,blob_sas_url       = blob_sas_url
+                ,mapping_name       = csv_mapping_name(kusto_table_name)
+            )
+            # 7. Check data existing
+            self.kr.check_table_data(
+                target_table_name   = kusto_table_name
+                ,check_times        = 30
+                ,check_gap_min      = 2
+            )
+        except Exception as e:
+            print('load context error')
+            print(e)
+        finally:
+            # 8. Finally, remove local csv file, remove azure blob file.
+            os.remove(csv_file_name)
+            self.abr.delete_blob_file(csv_file_name)
+
+        print('all done')
+
+    def kusto_to_csv(
+        self
+        ,input_kql
+        ,output_csv_file_name
+    ):
+        '''
+        The function will:
+        1. execute plain KQL(without .export async to csv).
+        2. output data to Azure blob storage as csv file.
+        3. download data from azure blob storage to local file path.
+
+        Args:
+            input_kql (str): the kusto script that generate the dataset.
+            output_csv_path (str): the local csv file path (absolute or relative path).
+
+        Returns:
+            str: the execution status of the function.
+
+        Example:
+            [TODO]
+        '''
+        self.load_kusto_context()
+        self.load_azure_blob_context()
+        # load Azure blob key str from configure file
+        try:
+            config_obj = load_config()
+            azure_blob_key = config_obj['azure_blob_key']
+            azure_blob_account = config_obj['azure_blob_connstr'].split(';')[1].replace('AccountName=','')
+            print(f"azure_blob_account {azure_blob_account} will be used as the exporting middle layer")
+        except:
+            print('get azure blob key and connection string error')
+
+        # temp name for azure blob
+        temp_name = str(uuid.uuid4())
+
+        kusto_head = f'''.export async to csv(
+            h@"https://{azure_blob_account}.blob.core.windows.net:443/{self.azure_blob_container}/azdsdr;{azure_blob_key}"
+        ) with (
+            sizeLimit        = 100000000
+            ,namePrefix      = "{temp_name}"
+            ,includeHeaders  = "all"
+            ,encoding        = "UTF8NoBOM"
+            ,distributed     = false
+        )
+        <|
+        '''
+
+        try:
+            kql = f"""{kusto_head}{input_kql}"""
+            print(kql)
+            # how to detect kusto run status?
+            r = self.kr.run_kql(kql)
+            op_id = r['OperationId'][0]
+            print(op_id)
+
+            # use a loop to check the status of the kusto execution
+            check_kql = f".show operations {op_id}"
+            while(True):
+                r = self.kr.run_kql(check_kql)
+                time.sleep(1)
+                state = r['State'][0]
+                if state == "Completed":
+                    print('Kusto export done')
+                    break
+
+            print('Kusto export to Azure Blob done.')
+        except:
+            raise Exception('Kusto export error')
+
+        try:
+            # query the export files start with temp uuid.
+            file_list = self.abr.container_client.list_blobs(name_starts_with = f"azdsdr/{temp_name}")
+            file_name_list = [f['name'] for f in file_list]
+            self.abr.download_file_list(
+                blob_file_path_list = file_name_list
+                ,local_file_path    = output_csv_file_name
+            )
+        except:
+            raise Exception('blob csv files download error')
+        finally:
+            # delete blob temp file
+            self.abr.delete_blob_files(blob_file_path_list=file_name_list)
+
+        print('Kusto to CSV done!')
+# endregion
\ No newline at end of file
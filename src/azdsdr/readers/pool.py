@@ -0,0 +1,125 @@
+# region connection pool
+from contextlib import contextmanager
+import threading
+import time
+
+class ConnectionPool:
+    '''
+    A bounded, thread-safe pool of DB-API connections (e.g. pyodbc).
+
+    At most `max_size` connections are handed out at the same time, other callers wait
+    until one is returned. Idle connections are reused, and a connection that has been
+    idle longer than `health_check_idle_sec` is checked with `health_check_sql` before it
+    is handed out. Broken connections are closed and replaced by a new one.
+
+    Args:
+        connect (callable): function without arguments that opens a new connection.
+        max_size (int): max number of open connections.
+        health_check_sql (str): query used to check an idle connection is still alive.
+        health_check_idle_sec (int): only check connections idle longer than this.
+        reconnect_times (int): attempts to open a new connection before giving up.
+
+    Example:
+        ```
+        pool = ConnectionPool(lambda: pyodbc.connect(conn_str,autocommit=True),max_size=8)
+        with pool.connection() as conn:
+            df = pd.read_sql(sql,conn)
+        ```
+    '''
+    def __init__(
+        self
+        ,connect
+        ,max_size               = 4
+        ,health_check_sql       = 'SELECT 1'
+        ,health_check_idle_sec  = 60
+        ,reconnect_times        = 3
+    ) -> None:
+        self._connect               = connect
+        self.max_size               = max_size
+        self.health_check_sql       = health_check_sql
+        self.health_check_idle_sec  = health_check_idle_sec
+        self.reconnect_times        = reconnect_times
+        self._slots                 = threading.BoundedSemaphore(max_size)
+        self._lock                  = threading.Lock()
+        self._idle                  = []    # (connection, last used time), used as a stack
+        self._closed                = False
+
+    @contextmanager
+    def connection(self):
+        '''
+        Borrow a connection from the pool, the connection goes back to the pool when the
+        `with` block exits. If the block raises and the connection fails the health check, it is discarded.
+        '''
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception:
+            if conn is not None and not self._is_alive(conn):
+                self._close(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def _checkout(self):
+        if self._closed:
+            raise Exception('The connection pool is closed.')
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn,last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.health_check_idle_sec or self._is_alive(conn):
+                return conn
+            self._close(conn)
+        return self._new_connection()
+
+    def _checkin(self,conn) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.append((conn,time.monotonic()))
+                return
+        self._close(conn)
+
+    def _new_connection(self):
+        for attempt in range(self.reconnect_times):
+            try:
+                return self._connect()
+            except Exception:
+                if attempt == self.reconnect_times - 1:
+                    raise
+                time.sleep(2**attempt)
+
+    def _is_alive(self,conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.health_check_sql)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _close(self,conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        '''
+        Close all idle connections, connections in use are closed when they are returned.
+        '''
+        with self._lock:
+            self._closed    = True
+            idle            = self._idle
+            self._idle      = []
+        for conn,_ in idle:
+            self._close(conn)
+# endregion
@@ -0,0 +1,342 @@
+# region adaptive scheduler
+from concurrent.futures import Future,ThreadPoolExecutor
+from contextlib import contextmanager
+import email.utils
+import threading
+import random
+import heapq
+import time
+import re
+
+# known error messages of throttled or overloaded backends without a structured status,
+# e.g. Dremio/odbc busy connections and queues. Status codes are only read from structured
+# fields, a bare 503 or "throttl" in a message may be a row count, an id or a column name.
+_throttling_message_re = re.compile(
+    r'too many requests|(?:was|were|is|are|been|being) throttled|server is busy|busy with results'
+    r'|resources? exhausted|queue is full|(?:concurrency|rate) limit (?:exceeded|reached)'
+    ,re.IGNORECASE
+)
+# error codes of throttling: http reason codes, Azure storage `x-ms-error-code`, Kusto `error.code`
+_throttling_error_codes = {'toomanyrequests','serverbusy','servicebusy','throttled','requestthrottled'}
+
+def _response_headers(error) -> dict:
+    '''
+    Headers of the http response attached to an error, if any
+    '''
+    # the error itself for aiohttp's ClientResponseError
+    candidates = [error,getattr(error,'http_response',None),getattr(error,'response',None)]
+    candidates += [a for a in getattr(error,'args',()) if hasattr(a,'headers')]
+    for response in candidates:
+        headers = getattr(response,'headers',None)
+        if headers:
+            return headers
+    return {}
+
+def _status_code(error):
+    '''
+    Http status of an error, from `status_code`/`status` of the error or of its attached response
+    '''
+    for response in (error,getattr(error,'http_response',None),getattr(error,'response',None)):
+        for name in ('status_code','status'):
+            status = getattr(response,name,None)
+            if isinstance(status,int):
+                return status
+    return None
+
+def _is_throttling_error_code(error) -> bool:
+    '''
+    Check the structured error code of azure.core (`error_code`, `error.code`) and Kusto
+    (`error.code`, `error.type`) errors
+    '''
+    details = getattr(error,'error',None)
+    codes   = [getattr(error,'error_code',None),getattr(details,'code',None)]
+    for code in codes:
+        if isinstance(code,str) and code.replace('_','').lower() in _throttling_error_codes:
+            return True
+    # e.g. Kusto.DataNode.Exceptions.KustoRequestThrottledException
+    error_type = getattr(details,'type',None)
+    return isinstance(error_type,str) and 'ThrottledException' in error_type
+
+def _parse_retry_after(value):
+    '''
+    Seconds to wait from a Retry-After header, given either as seconds or as an http date
+    '''
+    if value is None:
+        return None
+    try:
+        return max(float(value),0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(retry_at.timestamp() - time.time(),0)
+    except (TypeError,ValueError):
+        return None
+
+def throttling_info(error):
+    '''
+    Tell if an error is a throttling signal.
+
+    Returns:
+        tuple: (is_throttling, retry_after_sec), `retry_after_sec` is None without a Retry-After header
+    '''
+    headers     = _response_headers(error)
+    retry_after = _parse_retry_after(headers.get('Retry-After') or headers.get('retry-after')) if headers else None
+    if type(error).__name__ == 'KustoThrottlingError' or _status_code(error) in (429,503) or _is_throttling_error_code(error):
+        return True,retry_after
+    return _throttling_message_re.search(str(error)) is not None,retry_after
+
+class AdaptiveLimiter:
+    '''
+    Concurrency limit of one backend, adjusted AIMD style: every successful call adds
+    `1/limit` (about +1 per round of calls), a throttled call halves the limit. Only calls
+    started after the last decrease can decrease it again, so a burst of throttled calls
+    counts as one signal. Waiting callers are served by priority, then in arrival order.
+
+    Args:
+        initial_limit (int): calls allowed at the same time at start
+        min_limit (int): the limit never goes below this
+        max_limit (int): the limit never goes above this
+        decrease_factor (float): the limit is multiplied by this on throttling
+    '''
+    def __init__(
+        self
+        ,initial_limit          = 4
+        ,min_limit              = 1
+        ,max_limit              = 64
+        ,decrease_factor        = 0.5
+    ) -> None:
+        self.limit                  = float(initial_limit)
+        self.min_limit              = min_limit
+        self.max_limit              = max_limit
+        self.decrease_factor        = decrease_factor
+        self.in_flight              = 0
+        self._cond                  = threading.Condition()
+        self._waiting               = []    # heap of (priority, sequence)
+        self._sequence              = 0
+        self._paused_until          = 0
+        self._last_decrease         = 0
+        self._stats                 = {'calls':0,'throttled':0,'retries':0,'failed':0}
+
+    def acquire(self,priority=0) -> float:
+        '''
+        Wait for a free slot, callers with a smaller `priority` go first. Return the start
+        time of the call, to pass to `release`.
+        '''
+        with self._cond:
+            self._sequence += 1
+            ticket = (priority,self._sequence)
+            heapq.heappush(self._waiting,ticket)
+            try:
+                while True:
+                    pause = self._paused_until - time.monotonic()
+                    if self._waiting[0] == ticket and pause <= 0 and self.in_flight < int(self.limit):
+                        break
+                    self._cond.wait(timeout=pause if pause > 0 else None)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+            self.in_flight += 1
+            self._stats['calls'] += 1
+            self._cond.notify_all()
+            return time.monotonic()
+
+    def release(self,started_at=None,throttled=False,retry_after=None) -> None:
+        '''
+        Give the slot back, and grow or shrink the limit from the outcome of the call
+        '''
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self._stats['throttled'] += 1
+                if started_at is None or started_at >= self._last_decrease:
+                    self.limit          = max(self.min_limit,self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                if retry_after:
+                    # the server asked every caller to wait
+                    self._paused_until = max(self._paused_until,now + retry_after)
+            else:
+                self.limit = min(self.max_limit,self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def count(self,name:str) -> None:
+        with self._cond:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'limit'         : int(self.limit)
+                ,'in_flight'    : self.in_flight
+                ,'queued'       : len(self._waiting)
+                ,**self._stats
+            }
+
+class AdaptiveScheduler:
+    '''
+    Shared scheduler of the calls readers send to their backends (Kusto clusters, Dremio
+    hosts, blob accounts). Every backend gets an `AdaptiveLimiter`: calls wait in a priority
+    queue for a slot, the limit grows while calls succeed and is halved when the backend
+    throttles (http 429/503, "too many requests", odbc busy errors). Throttled calls are
+    retried after the Retry-After delay of the server, capped at `max_backoff_sec`, or else
+    after a full jitter exponential backoff. Calls marked not idempotent (ingestion, Kusto
+    management commands) are never retried, as the backend may have run them before
+    throttling the response. Other errors are raised at once.
+
+    Args:
+        initial_limit (int): initial concurrency limit of a backend
+        min_limit (int): lowest concurrency limit of a backend
+        max_limit (int): highest concurrency limit of a backend
+        max_retries (int): retries of a throttled call before its error is raised
+        base_backoff_sec (float): backoff of the first retry, doubled at every retry
+        max_backoff_sec (float): cap of the backoff and of the Retry-After delay
+        max_workers (int): threads running the functions of `submit`
+        limits (dict): {backend: initial limit} of specific backends
+
+    Example:
+        ```
+        from azdsdr.readers import AdaptiveScheduler,KustoReader,DremioReader
+        scheduler = AdaptiveScheduler(max_limit=16)
+        kr = KustoReader(cluster=cluster,db=db,scheduler=scheduler)
+        dr = DremioReader(username=username,scheduler=scheduler)
+        futures = [scheduler.submit(kr.run_kql,kql,priority=1) for kql in kql_list]
+        with scheduler.priority(-1):
+            df = kr.run_kql(urgent_kql)     # goes ahead of the queued calls
+        print(scheduler.stats())
+        ```
+    '''
+    def __init__(
+        self
+        ,initial_limit      = 4
+        ,min_limit          = 1
+        ,max_limit          = 32
+        ,max_retries        = 6
+        ,base_backoff_sec   = 1
+        ,max_backoff_sec    = 60
+        ,max_workers        = 32
+        ,limits             = None
+    ) -> None:
+        self.initial_limit      = initial_limit
+        self.min_limit          = min_limit
+        self.max_limit          = max_limit
+        self.max_retries        = max_retries
+        self.base_backoff_sec   = base_backoff_sec
+        self.max_backoff_sec    = max_backoff_sec
+        self.max_workers        = max_workers
+        self.limits             = dict(limits or {})
+        self._lock              = threading.Lock()
+        self._limiters          = {}
+        self._local             = threading.local()
+        self._executor          = None
+
+    def limiter(self,backend:str) -> AdaptiveLimiter:
+        '''
+        The limiter of a backend, created at the first use
+        '''
+        with self._lock:
+            if backend not in self._limiters:
+                self._limiters[backend] = AdaptiveLimiter(
+                    initial_limit   = self.limits.get(backend,self.initial_limit)
+                    ,min_limit      = self.min_limit
+                    ,max_limit      = self.max_limit
+                )
+            return self._limiters[backend]
+
+    @contextmanager
+    def priority(self,priority:int):
+        '''
+        Run the reader calls of the `with` block with this priority, smaller goes first, default is 0
+        '''
+        previous = getattr(self._local,'priority',0)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def _backoff_sec(self,attempt:int) -> float:
+        # full jitter, so the throttled callers do not come back all at once
+        return random.uniform(0,min(self.max_backoff_sec,self.base_backoff_sec * 2**attempt))
+
+    def run(self,backend:str,fn,*args,priority=None,idempotent=True,**kwargs):
+        '''
+        Call `fn(*args,**kwargs)` within the concurrency limit of `backend`, retrying it while
+        the backend throttles. With `idempotent=False` a throttled call still shrinks the
+        limit, but its error is raised instead of running the call again.
+        '''
+        limiter  = self.limiter(backend)
+        priority = getattr(self._local,'priority',0) if priority is None else priority
+        attempt  = 0
+        while True:
+            started_at = limiter.acquire(priority)
+            try:
+                result = fn(*args,**kwargs)
+            except Exception as error:
+                throttled,retry_after = throttling_info(error)
+                if retry_after is not None:
+                    retry_after = min(retry_after,self.max_backoff_sec)
+                limiter.release(started_at,throttled=throttled,retry_after=retry_after)
+                if not throttled or not idempotent or attempt >= self.max_retries:
+                    limiter.count('failed')
+                    raise
+                delay = retry_after if retry_after is not None else self._backoff_sec(attempt)
+                print(f'{backend} is throttling, retry {attempt + 1} in {delay:.1f} seconds')
+                limiter.count('retries')
+                attempt += 1
+                time.sleep(delay)
+                continue
+            limiter.release(started_at)
+            return result
+
+    def submit(self,fn,*args,priority=None,**kwargs) -> Future:
+        '''
+        Run `fn(*args,**kwargs)`, typically a reader method, in a background thread and return
+        its Future. The backend calls made by `fn` wait in the queues of their backends with
+        the given priority.
+        '''
+        priority = getattr(self._local,'priority',0) if priority is None else priority
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor.submit(self._run_with_priority,priority,fn,args,kwargs)
+
+    def _run_with_priority(self,priority,fn,args,kwargs):
+        with self.priority(priority):
+            return fn(*args,**kwargs)
+
+    def stats(self) -> dict:
+        '''
+        {backend: limit, in_flight, queued, calls, throttled, retries, failed}
+        '''
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {backend:limiter.stats() for backend,limiter in limiters.items()}
+
+    def shutdown(self,wait=True) -> None:
+        with self._lock:
+            executor,self._executor = self._executor,None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+_default_scheduler      = None
+_default_scheduler_lock = threading.Lock()
+
+def get_default_scheduler() -> AdaptiveScheduler:
+    '''
+    The process wide scheduler used by readers created with `scheduler=True`
+    '''
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = AdaptiveScheduler()
+        return _default_scheduler
+
+def resolve_scheduler(scheduler):
+    '''
+    Reader argument to scheduler: None/False for none, True for the default one, or a scheduler
+    '''
+    if scheduler is True:
+        return get_default_scheduler()
+    return scheduler or None
+# endregion
@@ -0,0 +1,271 @@
+# region Scope jobs
+import asyncio
+import random
+import time
+import re
+
+_guid = r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+_job_id_re      = re.compile(rf'\b(?:job\s*id|operation\s*id|jobid|id)\s*[:=]\s*({_guid})',re.IGNORECASE)
+_any_guid_re    = re.compile(_guid)
+_state_re       = re.compile(r'\b(?:job\s*state|state|status)\s*[:=]\s*([A-Za-z]+)',re.IGNORECASE)
+
+# job states reported by `scope.exe jobstatus`
+success_states  = {'CompletedSuccess'}
+failure_states  = {'CompletedFailure','Failed','Cancelled','Canceled','Aborted'}
+terminal_states = success_states | failure_states
+_known_states_re = re.compile(
+    r'\b(' + '|'.join(sorted(terminal_states | {'Queued','Compiling','Waiting','Running','Submitted'},key=len,reverse=True)) + r')\b'
+)
+
+class ScopeJobError(Exception):
+    '''
+    A Scope job failed to submit or did not complete successfully
+    '''
+    def __init__(self,message,job=None) -> None:
+        super().__init__(message)
+        self.job = job
+
+def parse_job_id(stdout:str,returncode=None) -> str:
+    '''
+    Return the job id printed by `scope.exe submit`, None when there is none. A GUID without
+    a job id label is only taken from a successful submit (return code 0), since a failed
+    one may print other GUIDs, e.g. a correlation id.
+
+    Args:
+        stdout (str): the decoded stdout of the submit
+        returncode (int): the return code of the submit, None when unknown
+    '''
+    match = _job_id_re.search(stdout)
+    if match:
+        return match.group(1)
+    if returncode != 0:
+        return None
+    match = _any_guid_re.search(stdout)
+    return match.group(0) if match else None
+
+def parse_job_state(stdout:str) -> str:
+    '''
+    Return the job state printed by `scope.exe jobstatus` in its decoded stdout, e.g. Queued,
+    Running, CompletedSuccess, None when there is none
+    '''
+    for match in _state_re.finditer(stdout):
+        if _known_states_re.fullmatch(match.group(1)):
+            return match.group(1)
+    match = _known_states_re.search(stdout)
+    return match.group(1) if match else None
+
+class ScopeJob:
+    '''
+    One Scope job of a `ScopeJobManager`, `await job` or `job.future` gives the finished job,
+    or raises `ScopeJobError` when it failed.
+    '''
+    def __init__(self,script_path:str,future:'asyncio.Future') -> None:
+        self.script_path    = script_path
+        self.job_id         = None
+        self.state          = 'Submitting'
+        self.output         = ''
+        self.submitted_at   = time.time()
+        self.finished_at    = None
+        self.future         = future
+        # consecutive `jobstatus` calls whose output had no known state
+        self.unknown_polls  = 0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.state in success_states
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def add_done_callback(self,callback) -> None:
+        '''
+        Call `callback(job)` when the job is finished, successfully or not
+        '''
+        self.future.add_done_callback(lambda _: callback(self))
+
+    def __await__(self):
+        return self.future.__await__()
+
+    def __repr__(self) -> str:
+        return f'ScopeJob(script={self.script_path}, job_id={self.job_id}, state={self.state})'
+
+class ScopeJobManager:
+    '''
+    Submit many Scope scripts at once and follow all their jobs with a single polling loop.
+
+    Scripts are submitted through asyncio subprocesses, at most `max_processes` `scope.exe`
+    processes run at the same time. Every round, the loop asks `jobstatus` for all live jobs,
+    then waits `min_poll_sec`. The wait grows up to `max_poll_sec` while no job changes state,
+    and goes back to `min_poll_sec` when one does. Finished jobs resolve their future, then
+    their callbacks run.
+
+    Args:
+        cosmos_reader (CosmosReader): gives the scope.exe path, vc and account
+        max_processes (int): max number of scope.exe processes running at the same time
+        min_poll_sec (float): shortest wait between two polling rounds
+        max_poll_sec (float): longest wait between two polling rounds
+        timeout_sec (float): jobs still running after this are failed with a ScopeJobError
+        max_unknown_polls (int): jobs whose `jobstatus` fails or prints no known state this many
+            times in a row are failed with a ScopeJobError
+
+    Example:
+        ```
+        async def main():
+            manager = ScopeJobManager(cr)
+            jobs    = [await manager.submit(path,callback=print) for path in script_paths]
+            done    = await manager.wait(jobs)
+
+        asyncio.run(main())
+        # or, outside of an event loop
+        jobs = cr.run_scope_many(script_paths)
+        ```
+    '''
+    def __init__(
+        self
+        ,cosmos_reader
+        ,max_processes      = 8
+        ,min_poll_sec       = 10
+        ,max_poll_sec       = 120
+        ,timeout_sec        = 24 * 3600
+        ,max_unknown_polls  = 5
+    ) -> None:
+        self.cosmos_reader      = cosmos_reader
+        self.max_processes      = max_processes
+        self.min_poll_sec       = min_poll_sec
+        self.max_poll_sec       = max_poll_sec
+        self.timeout_sec        = timeout_sec
+        self.max_unknown_polls  = max_unknown_polls
+        self.jobs               = []
+        self._live              = []
+        self._semaphore         = None
+        self._poll_task         = None
+        self._wake              = None
+
+    async def _run_scope_exe(self,args:list) -> tuple:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_processes)
+        async with self._semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *args
+                ,stdout = asyncio.subprocess.PIPE
+                ,stderr = asyncio.subprocess.STDOUT
+            )
+            stdout,_ = await process.communicate()
+        return process.returncode,stdout.decode('utf-8',errors='replace')
+
+    async def submit(self,script_path:str,callback=None) -> ScopeJob:
+        '''
+        Submit a Scope script and return its job once the job id is known, the job is then
+        followed by the polling loop.
+
+        Args:
+            script_path (str): the local scope script file
+            callback (callable): called with the job when it is finished
+        '''
+        job = ScopeJob(script_path,asyncio.get_running_loop().create_future())
+        if callback is not None:
+            job.add_done_callback(callback)
+        self.jobs.append(job)
+        try:
+            returncode,job.output = await self._run_scope_exe(self.cosmos_reader._submit_args(script_path))
+        except OSError as err:
+            self._finish(job,'SubmitFailed',ScopeJobError(f'Run scope.exe failed: {err}',job))
+            return job
+        job.job_id = parse_job_id(job.output,returncode)
+        if returncode != 0 or job.job_id is None:
+            self._finish(job,'SubmitFailed',ScopeJobError(f'Submit {script_path} failed:\n{job.output}',job))
+            return job
+        job.state = 'Submitted'
+        print(f'scope job {job.job_id} submitted from {script_path}')
+        self._live.append(job)
+        self._ensure_polling()
+        return job
+
+    def _finish(self,job:ScopeJob,state:str,error=None) -> None:
+        job.state       = state
+        job.finished_at = time.time()
+        if job.future.done():
+            return
+        if error is None:
+            job.future.set_result(job)
+        else:
+            job.future.set_exception(error)
+            # an error nobody awaits is not reported as "never retrieved", callbacks still see it
+            job.future.add_done_callback(lambda f: f.exception())
+
+    def _ensure_polling(self) -> None:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        self._wake.set()
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def _poll_job(self,job:ScopeJob) -> bool:
+        '''
+        Update the state of one job, return True if it changed
+        '''
+        try:
+            _,output = await self._run_scope_exe(self.cosmos_reader._jobstatus_args(job.job_id))
+            state    = parse_job_state(output)
+        except OSError as err:
+            output,state = f'Run scope.exe failed: {err}',None
+        if state is None:
+            job.unknown_polls += 1
+            print(f'no state in the jobstatus output of {job.job_id} ({job.unknown_polls}/{self.max_unknown_polls})')
+            if job.unknown_polls < self.max_unknown_polls:
+                return False
+            self._finish(job,job.state,ScopeJobError(f'Scope job {job.job_id} has no known state after {job.unknown_polls} checks:\n{output}',job))
+            return True
+        job.unknown_polls = 0
+        if state == job.state:
+            return False
+        job.state,job.output = state,output
+        print(f'scope job {job.job_id}: {state}')
+        if state in success_states:
+            self._finish(job,state)
+        elif state in failure_states:
+            self._finish(job,state,ScopeJobError(f'Scope job {job.job_id} ended as {state}:\n{output}',job))
+        return True
+
+    async def _poll_loop(self) -> None:
+        poll_sec    = self.min_poll_sec
+        last_round  = time.monotonic()
+        while self._live:
+            self._wake.clear()
+            # new submissions restart the wait, but never push a round past `max_poll_sec`
+            wait_sec = min(poll_sec * random.uniform(0.8,1.2),max(last_round + self.max_poll_sec - time.monotonic(),0))
+            try:
+                await asyncio.wait_for(self._wake.wait(),timeout=wait_sec)
+                # a new job was submitted, poll it soon but not at once
+                poll_sec = self.min_poll_sec
+                if time.monotonic() - last_round < self.max_poll_sec:
+                    continue
+            except asyncio.TimeoutError:
+                pass
+            last_round = time.monotonic()
+
+            live    = list(self._live)
+            changed = await asyncio.gather(*(self._poll_job(job) for job in live))
+            now     = time.time()
+            for job in live:
+                if not job.done() and now - job.submitted_at > self.timeout_sec:
+                    self._finish(job,job.state,ScopeJobError(f'Scope job {job.job_id} timed out as {job.state}',job))
+            self._live = [job for job in self._live if not job.done()]
+            poll_sec   = self.min_poll_sec if any(changed) else min(poll_sec * 2,self.max_poll_sec)
+
+    async def wait(self,jobs=None,return_exceptions=True) -> list:
+        '''
+        Wait until the jobs, default all submitted jobs, are finished and return them. Failed
+        jobs are returned as their `ScopeJobError` unless `return_exceptions` is False.
+        '''
+        jobs = list(self.jobs if jobs is None else jobs)
+        return await asyncio.gather(*(job.future for job in jobs),return_exceptions=return_exceptions)
+
+    async def run_scripts(self,script_paths:list,callback=None) -> list:
+        '''
+        Submit all the scripts concurrently and wait for their jobs, return the `ScopeJob` list
+        '''
+        jobs = await asyncio.gather(*(self.submit(path,callback=callback) for path in script_paths))
+        await self.wait(jobs)
+        return list(jobs)
+# endregion
@@ -1,12 +1,14 @@
 # region pandas tool
-from IPython.display import display
-from IPython.core.display import HTML
+# IPython and matplotlib are imported inside the functions that use them, so
+# `import azdsdr.tools` stays cheap for scripts that never display or plot.
 
 class pd_tools:
     def __init__(self) -> None:
         pass
 
     def display_all(self,df_data,top=-1):
+        from IPython.display import display
+        from IPython.core.display import HTML
         style = '''
         <style>.dataframe td { 
             text-align: left; 
@@ -20,6 +22,7 @@ class pd_tools:
             print('The top parameter should be larger than 0.')
     
     def to_HTML(self,df_data,top=-1):
+        from IPython.core.display import HTML
         style = '''
         <style>.dataframe td { 
             text-align: left; 
@@ -34,10 +37,6 @@ class pd_tools:
 # endregion
 
 # region vis tools
-import matplotlib.pyplot as plt
-from matplotlib import rcParams
-import matplotlib
-
 class vis_tools:
     def __init__(
         self
@@ -46,6 +45,7 @@ class vis_tools:
         ,font_family = 'sans-serif'
         ,font_name = None
     ) -> None:
+        from matplotlib import rcParams
         #rcParams['font.sans-serif']     = "Comic Sans MS"
         if font_name:
             rcParams['font.family']         = font_family
@@ -84,6 +84,8 @@ class vis_tools:
         '''
         Show one set of bar chart from x and y input
         '''
+        import matplotlib.pyplot as plt
+        import matplotlib
         fig,ax      = plt.subplots() 
         fig.set_size_inches(self.size_w, self.size_h)
         fig.autofmt_xdate(rotation=rotate_x)
@@ -132,6 +134,7 @@ class vis_tools:
         '''
         Show single set of horizontal bar chart
         '''
+        import matplotlib.pyplot as plt
         fig,ax          = plt.subplots() 
         fig.set_size_inches(self.size_w, self.size_h) 
 
@@ -171,6 +174,8 @@ class vis_tools:
         ,xlabel_name = None
         ,ylabel_name = None
     ):
+        import matplotlib.pyplot as plt
+        import matplotlib
         fig,ax          = plt.subplots() 
         fig.set_size_inches(self.size_w, self.size_h)
         fig.autofmt_xdate(rotation=45)
@@ -226,6 +231,8 @@ class vis_tools:
         ,xlabel_name = None
         ,ylabel_name = None
     ):
+        import matplotlib.pyplot as plt
+        import matplotlib
         fig,ax          = plt.subplots() 
         fig.set_size_inches(self.size_w, self.size_h)
         fig.autofmt_xdate(rotation=45)
@@ -275,6 +282,7 @@ class vis_tools:
         ,xlabel_name = None
         ,ylabel_name = None
     ):
+        import matplotlib.pyplot as plt
         fig,ax          = plt.subplots() 
         fig.set_size_inches(self.size_w, self.size_h)
         
@@ -0,0 +1,221 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path,monkeypatch):
+    '''
+    Keep the configuration and token cache files of the tests out of the real home folder
+    '''
+    from azdsdr.readers import config,auth
+    monkeypatch.setattr(config,'config_file_path',tmp_path / '.azdsdr_conf.json')
+    monkeypatch.setattr(config,'_config_obj',None)
+    monkeypatch.setattr(auth,'token_cache_file_path',tmp_path / '.azdsdr_token_cache.json')
+    monkeypatch.setattr(auth,'_token_providers',{})
+    return tmp_path
+
+class FakeCursor:
+    '''
+    pyodbc like cursor returning fixed rows, `description` items are
+    (name, python type, display_size, internal_size, precision, scale, null_ok)
+    '''
+    def __init__(self,connection) -> None:
+        self.connection     = connection
+        self.description    = None
+        self.closed         = False
+        self._rows          = []
+        connection.cursors.append(self)
+
+    def execute(self,sql_query):
+        self.connection.queries.append(sql_query)
+        self.description,rows = self.connection.results(sql_query)
+        self._rows = list(rows)
+        return self
+
+    def fetchmany(self,size):
+        self.connection.fetch_sizes.append(size)
+        rows,self._rows = self._rows[:size],self._rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+class FakeConnection:
+    def __init__(self,results) -> None:
+        self.results        = results
+        self.queries        = []
+        self.fetch_sizes    = []
+        self.cursors        = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+@pytest.fixture
+def fake_pyodbc(monkeypatch):
+    '''
+    Replace pyodbc by a module whose connections answer every query with `fake_pyodbc.results(sql)`,
+    a (description, rows) tuple set by the test
+    '''
+    import types
+    import sys
+    module = types.ModuleType('pyodbc')
+    module.connections  = []
+    module.results      = lambda sql_query: ([],[])
+    def connect(conn_str,autocommit=False):
+        connection = FakeConnection(lambda sql_query: module.results(sql_query))
+        connection.conn_str = conn_str
+        module.connections.append(connection)
+        return connection
+    module.connect = connect
+    monkeypatch.setitem(sys.modules,'pyodbc',module)
+    return module
+
+@pytest.fixture
+def sqlite_pyodbc(monkeypatch,tmp_path):
+    '''
+    Replace pyodbc by a module whose connections all open the sqlite file `sqlite_pyodbc.db_path`,
+    so the generated sql runs for real. Every executed statement is recorded in `sqlite_pyodbc.queries`.
+    '''
+    import sqlite3
+    import types
+    import sys
+    module = types.ModuleType('pyodbc')
+    module.db_path  = str(tmp_path / 'dremio.db')
+    module.queries  = []
+    def connect(conn_str,autocommit=False):
+        connection = sqlite3.connect(module.db_path,check_same_thread=False,isolation_level=None)
+        connection.set_trace_callback(module.queries.append)
+        return connection
+    module.connect = connect
+    monkeypatch.setitem(sys.modules,'pyodbc',module)
+    return module
+
+def kusto_table(columns:list,rows:list) -> tuple:
+    '''
+    A result table of the fake Kusto server, `columns` are (name, Kusto type) pairs
+    '''
+    return columns,rows
+
+class FakeKustoError(Exception):
+    '''
+    Raised by a fake Kusto handler to answer with a Kusto error response
+    '''
+    def __init__(self,message,status=400,code='General_BadRequest') -> None:
+        super().__init__(message)
+        self.status = status
+        self.code   = code
+
+class FakeKustoServer:
+    '''
+    Local Kusto REST endpoint. `/v2/rest/query` and `/v1/rest/mgmt` requests are answered with
+    the result tables returned by `handler(csl)`, by default one `x:long` table with 1 row.
+    Every request is recorded in `requests`, `max_inflight` is the peak of concurrent requests.
+    '''
+    def __init__(self) -> None:
+        self.handler        = lambda csl: [kusto_table([('x','long')],[[1]])]
+        self.delay_sec      = 0
+        self.requests       = []
+        self.inflight       = 0
+        self.max_inflight   = 0
+        self.url            = None
+        self._loop          = None
+        self._runner        = None
+
+    @staticmethod
+    def _v2_frames(tables) -> list:
+        frames = [
+            {'FrameType':'DataSetHeader','IsProgressive':False,'Version':'v2.0'}
+            ,{'FrameType':'DataTable','TableId':0,'TableKind':'QueryProperties','TableName':'@ExtendedProperties'
+             ,'Columns':[{'ColumnName':'TableId','ColumnType':'int'},{'ColumnName':'Key','ColumnType':'string'},{'ColumnName':'Value','ColumnType':'dynamic'}]
+             ,'Rows':[]}
+        ]
+        for i,(columns,rows) in enumerate(tables):
+            frames.append({
+                'FrameType' :'DataTable'
+                ,'TableId'  :i + 1
+                ,'TableKind':'PrimaryResult'
+                ,'TableName':'PrimaryResult'
+                ,'Columns'  :[{'ColumnName':name,'ColumnType':kusto_type} for name,kusto_type in columns]
+                ,'Rows'     :rows
+            })
+        frames.append({'FrameType':'DataSetCompletion','HasErrors':False,'Cancelled':False})
+        return frames
+
+    @staticmethod
+    def _v1_tables(tables) -> dict:
+        return {'Tables':[
+            {
+                'TableName' :f'Table_{i}'
+                ,'Columns'  :[{'ColumnName':name,'DataType':'Object','ColumnType':kusto_type} for name,kusto_type in columns]
+                ,'Rows'     :rows
+            }
+            for i,(columns,rows) in enumerate(tables)
+        ]}
+
+    async def _answer(self,request):
+        from aiohttp import web
+        import asyncio
+        body = await request.json()
+        self.requests.append({'path':request.path,'csl':body['csl'],'db':body.get('db'),'headers':dict(request.headers)})
+        self.inflight       += 1
+        self.max_inflight   = max(self.max_inflight,self.inflight)
+        try:
+            if self.delay_sec:
+                await asyncio.sleep(self.delay_sec)
+            try:
+                tables = self.handler(body['csl'])
+            except FakeKustoError as err:
+                return web.json_response(
+                    {'error':{'code':err.code,'message':str(err),'@type':'Kusto.Data.Exceptions.SemanticException','@permanent':True}}
+                    ,status = err.status
+                )
+        finally:
+            self.inflight -= 1
+        if request.path.startswith('/v1/'):
+            return web.json_response(self._v1_tables(tables))
+        return web.json_response(self._v2_frames(tables))
+
+    def start(self) -> None:
+        from aiohttp import web
+        import threading
+        import asyncio
+        app = web.Application()
+        app.router.add_post('/v2/rest/query',self._answer)
+        app.router.add_post('/v1/rest/mgmt',self._answer)
+        self._loop      = asyncio.new_event_loop()
+        self._runner    = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner,'127.0.0.1',0)
+        self._loop.run_until_complete(site.start())
+        port     = self._runner.addresses[0][1]
+        self.url = f'http://127.0.0.1:{port}'
+        threading.Thread(target=self._loop.run_forever,daemon=True).start()
+
+    def stop(self) -> None:
+        import asyncio
+        if self._runner is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(),self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._runner = None
+
+class FakeTokenProvider:
+    def __call__(self) -> str:
+        return 'token'
+
+    def get_token(self) -> str:
+        return 'token'
+
+    async def get_token_async(self) -> str:
+        return 'token'
+
+@pytest.fixture
+def fake_kusto():
+    '''
+    A started `FakeKustoServer`, readers built for `fake_kusto.url` get a fixed token instead of calling `az`
+    '''
+    pytest.importorskip('aiohttp')
+    from azdsdr.readers import auth
+    server = FakeKustoServer()
+    server.start()
+    auth._token_providers[server.url] = FakeTokenProvider()
+    yield server
+    server.stop()
@@ -0,0 +1,96 @@
+import subprocess
+import textwrap
+import time
+import json
+import sys
+import os
+
+import pytest
+
+from azdsdr.readers.auth import AzCliTokenProvider,get_az_cli_token_provider
+
+pytestmark = pytest.mark.skipif(os.name == 'nt',reason='the fake az executable is a posix script')
+
+def make_fake_az(tmp_path,expires_in_sec=3600,fail=False):
+    '''
+    A fake `az` printing a token, every call is appended to calls.log
+    '''
+    log_path = tmp_path / 'calls.log'
+    az_path  = tmp_path / 'az'
+    az_path.write_text(textwrap.dedent(f'''\
+        #!{sys.executable}
+        import json,sys,time,uuid
+        with open({str(log_path)!r},'a') as f:
+            f.write(' '.join(sys.argv[1:]) + '\\n')
+        if {fail!r}:
+            sys.stderr.write('Please run az login')
+            sys.exit(1)
+        time.sleep(0.2)
+        print(json.dumps({{'accessToken':uuid.uuid4().hex,'expires_on':time.time() + {expires_in_sec}}}))
+    '''))
+    az_path.chmod(0o755)
+    return str(az_path),log_path
+
+def call_count(log_path) -> int:
+    return len(log_path.read_text().splitlines()) if log_path.exists() else 0
+
+def test_token_is_cached_in_memory_and_on_disk(tmp_path):
+    az_path,log_path = make_fake_az(tmp_path)
+    cache_path       = tmp_path / 'tokens.json'
+    provider         = AzCliTokenProvider('https://a.kusto.windows.net',cache_file_path=cache_path,az_path=az_path)
+    token            = provider()
+    assert provider() == token
+    assert call_count(log_path) == 1
+    assert '--resource https://a.kusto.windows.net' in log_path.read_text()
+
+    # another provider, e.g. in another process, reads the file instead of calling az
+    other = AzCliTokenProvider('https://a.kusto.windows.net',cache_file_path=cache_path,az_path=az_path)
+    assert other() == token
+    assert call_count(log_path) == 1
+    assert json.loads(cache_path.read_text())['https://a.kusto.windows.net']['access_token'] == token
+
+def test_tokens_are_cached_per_resource(tmp_path):
+    az_path,log_path = make_fake_az(tmp_path)
+    cache_path       = tmp_path / 'tokens.json'
+    a = AzCliTokenProvider('https://a.kusto.windows.net',cache_file_path=cache_path,az_path=az_path)()
+    b = AzCliTokenProvider('https://b.kusto.windows.net',cache_file_path=cache_path,az_path=az_path)()
+    assert a != b
+    assert call_count(log_path) == 2
+    assert set(json.loads(cache_path.read_text())) == {'https://a.kusto.windows.net','https://b.kusto.windows.net'}
+
+def test_concurrent_processes_share_one_az_call(tmp_path):
+    az_path,log_path = make_fake_az(tmp_path)
+    cache_path       = tmp_path / 'tokens.json'
+    src_path         = os.path.join(os.path.dirname(__file__),os.pardir,'src')
+    script = (
+        f'import sys; sys.path.insert(0,{src_path!r});'
+        'from azdsdr.readers.auth import AzCliTokenProvider;'
+        f'print(AzCliTokenProvider("https://a.kusto.windows.net",cache_file_path={str(cache_path)!r},az_path={az_path!r})())'
+    )
+    processes = [subprocess.Popen([sys.executable,'-c',script],stdout=subprocess.PIPE,text=True) for _ in range(4)]
+    tokens    = {p.communicate()[0].strip() for p in processes}
+    assert len(tokens) == 1
+    assert call_count(log_path) == 1
+
+def test_token_close_to_expiry_is_refreshed_in_background(tmp_path):
+    # expires in 200 sec: still valid, but within the 5 min refresh margin
+    az_path,log_path = make_fake_az(tmp_path,expires_in_sec=200)
+    provider         = AzCliTokenProvider('https://a.kusto.windows.net',cache_file_path=tmp_path / 'tokens.json',az_path=az_path)
+    token            = provider()
+    assert call_count(log_path) == 1
+
+    started_at = time.monotonic()
+    assert provider() == token          # served at once, the refresh runs in a thread
+    assert time.monotonic() - started_at < 0.15
+    provider._refresh_thread.join(timeout=10)
+    assert call_count(log_path) == 2
+    assert provider.token != token
+
+def test_az_cli_error_is_raised(tmp_path):
+    az_path,_ = make_fake_az(tmp_path,fail=True)
+    provider  = AzCliTokenProvider('https://a.kusto.windows.net',cache_file_path=tmp_path / 'tokens.json',az_path=az_path)
+    with pytest.raises(Exception,match='az login'):
+        provider()
+
+def test_providers_are_shared_per_resource():
+    assert get_az_cli_token_provider('https://a.kusto.windows.net/') is get_az_cli_token_provider('https://a.kusto.windows.net')
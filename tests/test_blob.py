@@ -0,0 +1,183 @@
+import base64
+import hashlib
+import os
+
+import pytest
+from azure.core.exceptions import ResourceModifiedError
+
+from azdsdr.readers import AzureBlobReader
+
+# the well known Azurite development account key
+_account_key = 'Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=='
+
+class FakeBlobServer:
+    '''
+    Local blob endpoint answering the property (HEAD) and range (GET) requests of a download.
+    `corrupt` flips a byte of every range after the first one, behind its transactional MD5,
+    `bad_md5` serves a wrong Content-MD5 for the whole blob, and `change_after_gets` replaces
+    the blob (and its ETag) once that many ranges were served.
+    '''
+    def __init__(self) -> None:
+        self.blobs              = {}
+        self.corrupt            = False
+        self.bad_md5            = False
+        self.change_after_gets  = None
+        self.gets               = 0
+        self.conn_str           = None
+        self._loop              = None
+        self._runner            = None
+
+    def put(self,name:str,data:bytes) -> None:
+        self.blobs[name] = data
+
+    @staticmethod
+    def _etag(data:bytes) -> str:
+        return '"0x' + hashlib.md5(data).hexdigest()[:16].upper() + '"'
+
+    async def _answer(self,request):
+        from aiohttp import web
+        name = request.match_info['blob']
+        if name not in self.blobs:
+            return web.Response(status=404,headers={'x-ms-error-code':'BlobNotFound'})
+        data    = self.blobs[name]
+        md5     = hashlib.md5(b'corrupted' if self.bad_md5 else data).digest()
+        headers = {
+            'ETag'              :self._etag(data)
+            ,'Last-Modified'    :'Mon, 01 Jan 2024 00:00:00 GMT'
+            ,'x-ms-blob-type'   :'BlockBlob'
+            ,'x-ms-version'     :'2021-08-06'
+        }
+        if request.method == 'HEAD':
+            headers['Content-MD5']      = base64.b64encode(md5).decode()
+            headers['Content-Length']   = str(len(data))
+            return web.Response(status=200,headers=headers)
+
+        if request.headers.get('If-Match') not in (None,headers['ETag']):
+            return web.Response(
+                status  = 412
+                ,headers = {'x-ms-error-code':'ConditionNotMet'}
+                ,text   = '<Error><Code>ConditionNotMet</Code><Message>The condition specified using HTTP conditional header(s) is not met.</Message></Error>'
+            )
+        self.gets += 1
+        if self.change_after_gets is not None and self.gets >= self.change_after_gets:
+            self.blobs[name] = data + b'changed'
+
+        start,end   = map(int,request.headers['x-ms-range'].split('=')[1].split('-'))
+        end         = min(end,len(data) - 1)
+        part        = data[start:end + 1]
+        headers['x-ms-blob-content-md5']    = base64.b64encode(md5).decode()
+        headers['Content-Range']            = f'bytes {start}-{end}/{len(data)}'
+        if request.headers.get('x-ms-range-get-content-md5') == 'true':
+            headers['Content-MD5'] = base64.b64encode(hashlib.md5(part).digest()).decode()
+        if self.corrupt and start > 0:
+            part = bytes([part[0] ^ 1]) + part[1:]
+        return web.Response(status=206,body=part,headers=headers)
+
+    def start(self) -> None:
+        from aiohttp import web
+        import threading
+        import asyncio
+        app = web.Application()
+        app.router.add_route('*','/devstoreaccount1/{container}/{blob:.*}',self._answer)
+        self._loop      = asyncio.new_event_loop()
+        self._runner    = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner,'127.0.0.1',0)
+        self._loop.run_until_complete(site.start())
+        port = self._runner.addresses[0][1]
+        self.conn_str = (
+            f'DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey={_account_key};'
+            f'BlobEndpoint=http://127.0.0.1:{port}/devstoreaccount1;'
+        )
+        threading.Thread(target=self._loop.run_forever,daemon=True).start()
+
+    def stop(self) -> None:
+        import asyncio
+        if self._runner is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(),self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._runner = None
+
+@pytest.fixture
+def fake_blob():
+    server = FakeBlobServer()
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def reader(fake_blob,monkeypatch):
+    from azure.storage.blob import BlobServiceClient
+    from_connection_string = BlobServiceClient.from_connection_string.__func__
+    # the storage retry policy backs off 15s and more before retrying a corrupted range
+    monkeypatch.setattr(
+        BlobServiceClient
+        ,'from_connection_string'
+        ,classmethod(lambda cls,conn_str,**kwargs: from_connection_string(cls,conn_str,retry_total=0,**kwargs))
+    )
+    return AzureBlobReader('data',blob_conn_str=fake_blob.conn_str)
+
+blob_data = os.urandom(10 * 1024 + 123)
+
+def test_download_file(fake_blob,reader,tmp_path):
+    fake_blob.put('big.bin',blob_data)
+    local_path = tmp_path / 'big.bin'
+    reader.download_file('big.bin',str(local_path),max_concurrency=4,chunk_size=1024)
+    assert local_path.read_bytes() == blob_data
+    assert fake_blob.gets == 11
+
+def test_download_to_buffer(fake_blob,reader):
+    fake_blob.put('big.bin',blob_data)
+    view = reader.download_to_buffer('big.bin',max_concurrency=4,chunk_size=1024)
+    assert bytes(view) == blob_data
+
+def test_empty_blob(fake_blob,reader,tmp_path):
+    fake_blob.put('empty.bin',b'')
+    local_path = tmp_path / 'empty.bin'
+    reader.download_file('empty.bin',str(local_path))
+    assert local_path.read_bytes() == b''
+    assert bytes(reader.download_to_buffer('empty.bin')) == b''
+    assert fake_blob.gets == 0
+
+def test_corrupted_range_fails_and_removes_the_file(fake_blob,reader,tmp_path):
+    fake_blob.put('big.bin',blob_data)
+    fake_blob.corrupt = True
+    local_path = tmp_path / 'big.bin'
+    # raised by the transactional MD5 of the range, before the whole blob is checked
+    with pytest.raises(Exception,match='MD5 mismatch. Expected value'):
+        reader.download_file('big.bin',str(local_path),chunk_size=1024)
+    assert not local_path.exists()
+    with pytest.raises(Exception,match='MD5 mismatch. Expected value'):
+        reader.download_to_buffer('big.bin',chunk_size=1024)
+
+def test_corrupted_range_is_kept_without_verify(fake_blob,reader,tmp_path):
+    fake_blob.put('big.bin',blob_data)
+    fake_blob.corrupt = True
+    local_path = tmp_path / 'big.bin'
+    reader.download_file('big.bin',str(local_path),chunk_size=1024,verify=False)
+    assert local_path.read_bytes() != blob_data
+
+def test_blob_md5_mismatch_fails_and_removes_the_file(fake_blob,reader,tmp_path):
+    fake_blob.put('big.bin',blob_data)
+    fake_blob.bad_md5 = True
+    local_path = tmp_path / 'big.bin'
+    with pytest.raises(Exception,match='MD5 mismatch of blob file big.bin'):
+        reader.download_file('big.bin',str(local_path),chunk_size=1024)
+    assert not local_path.exists()
+    with pytest.raises(Exception,match='MD5 mismatch of blob file big.bin'):
+        reader.download_to_buffer('big.bin',chunk_size=1024)
+
+def test_blob_changed_during_download_raises(fake_blob,reader,tmp_path):
+    fake_blob.put('big.bin',blob_data)
+    fake_blob.change_after_gets = 3
+    local_path = tmp_path / 'big.bin'
+    with pytest.raises(ResourceModifiedError):
+        reader.download_file('big.bin',str(local_path),max_concurrency=1,chunk_size=1024)
+    assert not local_path.exists()
+
+def test_blob_changed_during_buffer_download_raises(fake_blob,reader):
+    fake_blob.put('big.bin',blob_data)
+    fake_blob.change_after_gets = 3
+    with pytest.raises(ResourceModifiedError):
+        reader.download_to_buffer('big.bin',max_concurrency=1,chunk_size=1024)
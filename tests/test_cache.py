@@ -0,0 +1,125 @@
+import threading
+import time
+import os
+
+import pandas as pd
+import pytest
+
+from azdsdr.readers.cache import ResultCache,normalize_query
+
+def frame(n=100,seed=0):
+    return pd.DataFrame({'id':range(seed,seed + n),'name':[f'row {i}' for i in range(seed,seed + n)]})
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(cache_dir=tmp_path / 'cache',ttl_sec=3600)
+
+def test_normalize_query_collapses_whitespace_outside_of_literals():
+    assert normalize_query('  T  |   take 10  ') == 'T | take 10'
+    assert normalize_query("T | where s == 'a   b'") == "T | where s == 'a   b'"
+    assert normalize_query('T\r\n\n   | take 10') == 'T\n| take 10'
+
+def test_line_comments_keep_queries_apart():
+    # the comment ends at the line break, the second query has no where clause
+    with_newline    = 'T | take 10 // c\n| where x > 1'
+    without_newline = 'T | take 10 // c | where x > 1'
+    assert normalize_query(with_newline) != normalize_query(without_newline)
+    assert normalize_query('select 1 -- c\nfrom t') != normalize_query('select 1 -- c from t')
+    cache = ResultCache.__new__(ResultCache)
+    assert cache.make_key('kusto|c|db',with_newline) != cache.make_key('kusto|c|db',without_newline)
+    assert cache.make_key('kusto|c|db','T  | take 10') == cache.make_key('kusto|c|db','T | take 10')
+    assert cache.make_key('kusto|c|db','T | take 10') != cache.make_key('kusto|c|db2','T | take 10')
+
+def test_get_or_run_caches_the_result(cache):
+    calls = []
+    def run():
+        calls.append(1)
+        return frame()
+    first  = cache.get_or_run('scope','T | take 100',run)
+    second = cache.get_or_run('scope','T  |  take 100',run)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first,second)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_entries_expire_after_their_ttl(cache):
+    cache.get_or_run('scope','q',frame,ttl_sec=0.2)
+    assert cache.get(cache.make_key('scope','q')) is not None
+    time.sleep(0.3)
+    assert cache.get(cache.make_key('scope','q')) is None
+    assert cache.stats()['expired'] == 1
+    assert not list(cache.cache_dir.glob('*.parquet'))
+
+def test_corrupt_entries_are_removed_and_run_again(cache):
+    calls = []
+    def run():
+        calls.append(1)
+        return frame()
+    cache.get_or_run('scope','q',run)
+    key = cache.make_key('scope','q')
+    cache._data_path(key).write_bytes(b'PAR1 not a parquet file')
+    assert cache.get(key) is None
+    assert not cache._data_path(key).exists() and not cache._meta_path(key).exists()
+    pd.testing.assert_frame_equal(cache.get_or_run('scope','q',run),frame())
+    assert len(calls) == 2
+    assert cache.get(key) is not None
+
+def test_lru_entries_are_evicted_over_the_size_cap(cache):
+    keys = [cache.make_key('scope',f'q{i}') for i in range(3)]
+    cache.put(keys[0],frame(seed=0))
+    entry_size = cache._data_path(keys[0]).stat().st_size
+    # room for two entries
+    cache.max_size_bytes = int(entry_size * 2.5)
+    cache.put(keys[1],frame(seed=1000))
+    now = time.time()
+    os.utime(cache._data_path(keys[0]),(now - 100,now - 100))
+    os.utime(cache._data_path(keys[1]),(now - 200,now - 200))
+    # reading key 0 makes it the most recently used one
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2],frame(seed=2000))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()['evictions'] == 1
+
+def test_concurrent_callers_share_one_execution(cache):
+    calls   = []
+    results = [None] * 8
+    def run():
+        calls.append(1)
+        time.sleep(0.3)
+        return frame()
+    def worker(i):
+        results[i] = cache.get_or_run('scope','T | take 100',run)
+    threads = [threading.Thread(target=worker,args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(len(r) == 100 for r in results)
+    stats = cache.stats()
+    assert stats['misses'] == 1 and stats['dedup_waits'] + stats['hits'] == 7
+
+def test_errors_reach_the_waiters_and_are_not_cached(cache):
+    started = threading.Event()
+    errors  = []
+    def run():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError('query failed')
+    def waiter():
+        started.wait()
+        try:
+            cache.get_or_run('scope','q',lambda: frame())
+        except RuntimeError as err:
+            errors.append(err)
+    t = threading.Thread(target=waiter)
+    t.start()
+    with pytest.raises(RuntimeError):
+        cache.get_or_run('scope','q',run)
+    t.join()
+    assert len(errors) == 1
+    assert cache.get(cache.make_key('scope','q')) is None
+
+def test_none_results_are_not_cached(cache):
+    assert cache.get_or_run('scope','q',lambda: None) is None
+    assert len(cache.get_or_run('scope','q',frame)) == 100
@@ -0,0 +1,72 @@
+import gc
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from azdsdr.readers.cosmos import _csv_to_parquet,_iter_csv_frames
+
+def write_csv(path,rows=25):
+    path.write_text('id,name\n' + ''.join(f'{i},n{i}\n' for i in range(rows)))
+    return str(path)
+
+def test_chunks_remove_the_file_when_exhausted(tmp_path):
+    csv_path = write_csv(tmp_path / 'out.csv')
+    sizes    = [len(df) for df in _iter_csv_frames(csv_path,chunk_rows=10,remove_file=True)]
+    assert sizes == [10,10,5]
+    assert not (tmp_path / 'out.csv').exists()
+
+def test_chunks_remove_the_file_when_closed_early(tmp_path):
+    csv_path = write_csv(tmp_path / 'out.csv')
+    frames   = _iter_csv_frames(csv_path,chunk_rows=10,remove_file=True)
+    assert list(next(frames)['id']) == list(range(10))
+    frames.close()
+    assert not (tmp_path / 'out.csv').exists()
+
+def test_chunks_never_started_remove_the_file_when_collected(tmp_path):
+    csv_path = write_csv(tmp_path / 'out.csv')
+    frames   = _iter_csv_frames(csv_path,chunk_rows=10,remove_file=True)
+    assert (tmp_path / 'out.csv').exists()
+    del frames
+    gc.collect()
+    assert not (tmp_path / 'out.csv').exists()
+
+def test_chunks_keep_the_file_by_default(tmp_path):
+    csv_path = write_csv(tmp_path / 'out.csv')
+    frames   = _iter_csv_frames(csv_path,chunk_rows=10)
+    next(frames)
+    del frames
+    gc.collect()
+    assert (tmp_path / 'out.csv').exists()
+
+def test_csv_to_parquet(tmp_path):
+    csv_path = write_csv(tmp_path / 'out.csv')
+    row_cnt  = _csv_to_parquet(csv_path,str(tmp_path / 'out.parquet'),chunk_rows=10,column_types={'id':pa.string()})
+    assert row_cnt == 25
+    parquet = pq.ParquetFile(tmp_path / 'out.parquet')
+    assert parquet.metadata.num_row_groups == 3
+    table   = parquet.read()
+    assert table.schema.field('id').type == pa.string()
+    assert table.column('name').to_pylist() == [f'n{i}' for i in range(25)]
+
+def test_csv_to_parquet_infers_types_like_the_chunks(tmp_path):
+    # `b` is empty in the first MB, a 1 MB block would infer it as null and the later
+    # tables as string
+    csv_path = tmp_path / 'sparse.csv'
+    with open(csv_path,'w') as f:
+        f.write('a,b\n')
+        f.write(''.join(f'{i},\n' for i in range(200000)))
+        f.write(''.join(f'{i},hello\n' for i in range(200000,210000)))
+    assert csv_path.stat().st_size > 1 << 20
+    row_cnt = _csv_to_parquet(str(csv_path),str(tmp_path / 'sparse.parquet'),chunk_rows=50000)
+    assert row_cnt == 210000
+    table   = pq.read_table(tmp_path / 'sparse.parquet')
+    assert table.schema.field('b').type == pa.string()
+    assert table.column('b')[209999].as_py() == 'hello'
+
+def test_csv_to_parquet_without_rows(tmp_path):
+    csv_path = tmp_path / 'empty.csv'
+    csv_path.write_text('id,name\n')
+    assert _csv_to_parquet(str(csv_path),str(tmp_path / 'empty.parquet')) == 0
+    table = pq.read_table(tmp_path / 'empty.parquet')
+    assert table.num_rows == 0
+    assert table.column_names == ['id','name']
@@ -0,0 +1,76 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from azdsdr.readers.dremio import DremioReader,_partition_queries,_split_points
+
+@pytest.fixture
+def make_reader(sqlite_pyodbc):
+    '''
+    Fill table t of the sqlite file with the x values and return an odbc reader on it
+    '''
+    def make(values):
+        with sqlite3.connect(sqlite_pyodbc.db_path) as conn:
+            conn.execute('CREATE TABLE t (id INTEGER,x)')
+            conn.executemany('INSERT INTO t VALUES (?,?)',list(enumerate(values)))
+        return DremioReader(username='me@x.com',token='token')
+    return make
+
+def partitions_of(dr,partitions):
+    return dict(dr.iter_sql_partitioned('select * from t','x',partitions=partitions))
+
+def test_every_row_is_in_exactly_one_partition(make_reader):
+    # the split points 24, 49 and 74 are values of the column
+    values  = list(range(100)) + [None] * 3
+    dr      = make_reader(values)
+    parts   = partitions_of(dr,4)
+    assert len(parts) == 4
+    ids     = sorted(i for df in parts.values() for i in df['id'])
+    assert ids == list(range(len(values)))
+    # the nulls are only in the first partition
+    assert [int(df['x'].isna().sum()) for _,df in sorted(parts.items())] == [3,0,0,0]
+    df = dr.run_sql_partitioned('select * from t','x',partitions=4)
+    assert sorted(df['id']) == list(range(len(values)))
+
+def test_float_split_points_have_no_gaps_or_overlaps(make_reader):
+    values  = [i / 2 for i in range(21)]
+    dr      = make_reader(values)
+    assert _split_points(0.0,10.0,4) == [2.5,5.0,7.5]
+    parts   = partitions_of(dr,4)
+    assert [sorted(df['x']) for _,df in sorted(parts.items())] == [
+        values[0:5],values[5:10],values[10:15],values[15:21]
+    ]
+
+def test_single_distinct_value(make_reader):
+    dr      = make_reader([7] * 5)
+    assert _split_points(7,7,8) == []
+    parts   = partitions_of(dr,8)
+    assert list(parts) == [0]
+    assert len(parts[0]) == 5
+
+def test_small_integer_range_is_not_split_further():
+    assert _split_points(0,2,8) == [1]
+    assert _split_points(0,100,4) == [25,50,75]
+
+def test_empty_source(make_reader):
+    dr  = make_reader([])
+    df  = dr.run_sql_partitioned('select * from t','x',partitions=4)
+    assert len(df) == 0
+
+def test_only_null_partition_values(make_reader):
+    dr  = make_reader([None,None])
+    df  = dr.run_sql_partitioned('select * from t','x',partitions=4)
+    assert len(df) == 2
+
+def test_partition_queries():
+    queries = _partition_queries('select * from t;','"day"',[datetime.date(2024,1,1),datetime.date(2024,2,1)])
+    assert queries == [
+        'SELECT * FROM (select * from t) AS azdsdr_src WHERE (azdsdr_src."day" < DATE \'2024-01-01\') OR azdsdr_src."day" IS NULL'
+        ,'SELECT * FROM (select * from t) AS azdsdr_src WHERE azdsdr_src."day" >= DATE \'2024-01-01\' AND azdsdr_src."day" < DATE \'2024-02-01\''
+        ,'SELECT * FROM (select * from t) AS azdsdr_src WHERE azdsdr_src."day" >= DATE \'2024-02-01\''
+    ]
+    # no split point, one query for every row
+    assert _partition_queries('select * from t','x',[]) == [
+        'SELECT * FROM (select * from t) AS azdsdr_src WHERE (1 = 1) OR azdsdr_src.x IS NULL'
+    ]
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pyarrow as pa
+import pytest
+
+from azdsdr.readers.cache import ResultCache
+from azdsdr.readers.dremio import DremioReader
+
+@pytest.fixture
+def make_reader(monkeypatch,sqlite_pyodbc,tmp_path):
+    '''
+    Build an odbc reader on the sqlite file, or a flight reader whose flight fetch counts its queries
+    '''
+    with sqlite3.connect(sqlite_pyodbc.db_path) as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.executemany('INSERT INTO t VALUES (?)',[(i,) for i in range(10)])
+    monkeypatch.setattr(DremioReader,'_connect_flight',lambda self,*args: setattr(self,'flight_client',object()))
+
+    def make(transport):
+        dr = DremioReader(
+            username        = 'me@x.com'
+            ,token          = 'token'
+            ,transport      = transport
+            ,result_cache   = ResultCache(cache_dir=tmp_path / f'cache_{transport}')
+        )
+        if transport == 'flight':
+            def run_sql_arrow(sql_query):
+                sqlite_pyodbc.queries.append(sql_query)
+                return pa.table({'x':pa.array(range(10),pa.int64())})
+            dr.run_sql_arrow = run_sql_arrow
+        return dr
+    return make
+
+@pytest.mark.parametrize('transport',['odbc','flight'])
+def test_pooled_calls_use_the_cache_the_same_way(make_reader,sqlite_pyodbc,transport):
+    dr = make_reader(transport)
+    sqlite_pyodbc.queries.clear()
+    dr.run_sql_many(['select * from t'])
+    dr.run_sql_many(['select * from t'])
+    assert len(sqlite_pyodbc.queries) == 1
+    assert dr.result_cache.stats()['hits'] == 1
+
+    # partitions are not cached, with either transport
+    sqlite_pyodbc.queries.clear()
+    dr.run_sql_partitioned('select * from t','x',boundaries=[5])
+    dr.run_sql_partitioned('select * from t','x',boundaries=[5])
+    assert len(sqlite_pyodbc.queries) == 4
+    assert dr.result_cache.stats() == {'hits':1,'misses':1,'evictions':0,'expired':0,'dedup_waits':0}
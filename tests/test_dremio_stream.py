@@ -0,0 +1,80 @@
+import datetime
+import decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.csv as pcsv
+import pytest
+
+from azdsdr.readers.dremio import DremioReader
+
+description = [
+    ('id',int,None,19,19,0,True)
+    ,('name',str,None,64,64,0,True)
+    ,('amount',decimal.Decimal,None,10,10,2,True)
+    ,('flag',bool,None,1,1,0,True)
+    ,('ts',datetime.datetime,None,23,23,3,True)
+]
+
+def make_rows(n):
+    rows = []
+    for i in range(n):
+        # the first chunk has no null, later chunks do: the dtypes must not change
+        rows.append((
+            None if i >= 20 and i % 2 else i
+            ,f'name {i}'
+            ,decimal.Decimal(i) / 4
+            ,None if i >= 20 and i % 3 == 0 else i % 2 == 0
+            ,datetime.datetime(2024,1,1) + datetime.timedelta(hours=i)
+        ))
+    return rows
+
+@pytest.fixture
+def dr(fake_pyodbc):
+    fake_pyodbc.results = lambda sql_query: (description,[] if 'empty' in sql_query else make_rows(25))
+    return DremioReader(username='me@x.com',token='token')
+
+def test_iter_sql_yields_chunks_with_stable_dtypes(dr,fake_pyodbc):
+    chunks = list(dr.iter_sql('select * from t',chunk_rows=10))
+    assert [len(df) for df in chunks] == [10,10,5]
+    dtypes = [df.dtypes.astype(str).tolist() for df in chunks]
+    assert dtypes[0] == dtypes[1] == dtypes[2]
+    assert dtypes[0][0] == 'Int64' and dtypes[0][3] == 'boolean' and dtypes[0][2] == 'float64'
+    assert chunks[2]['id'].isna().sum() == 2
+    connection = fake_pyodbc.connections[0]
+    assert set(connection.fetch_sizes) == {10}
+    assert connection.cursors[-1].closed
+
+def test_iter_sql_closes_the_cursor_when_stopped_early(dr,fake_pyodbc):
+    chunks = dr.iter_sql('select * from t',chunk_rows=10)
+    next(chunks)
+    chunks.close()
+    connection = fake_pyodbc.connections[0]
+    assert connection.cursors[-1].closed
+    assert connection.fetch_sizes == [10]
+
+def test_iter_sql_arrow_batches_share_the_schema(dr):
+    batches = list(dr.iter_sql('select * from t',chunk_rows=10,output='arrow'))
+    assert [b.num_rows for b in batches] == [10,10,5]
+    assert all(b.schema == batches[0].schema for b in batches)
+    assert batches[0].schema.field('amount').type == pa.decimal128(10,2)
+    assert pa.Table.from_batches(batches).column('id').null_count == 2
+
+def test_write_sql_to_parquet_writes_one_row_group_per_chunk(dr,tmp_path):
+    file_path = tmp_path / 'out.parquet'
+    assert dr.write_sql_to_file('select * from t',str(file_path),chunk_rows=10) == 25
+    parquet_file = pq.ParquetFile(file_path)
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column('name').to_pylist()[-1] == 'name 24'
+    assert table.schema.field('ts').type == pa.timestamp('us')
+
+def test_write_sql_to_csv(dr,tmp_path):
+    file_path = tmp_path / 'out.csv'
+    assert dr.write_sql_to_file('select * from t',str(file_path),file_format='csv',chunk_rows=7) == 25
+    assert pcsv.read_csv(file_path).num_rows == 25
+
+def test_write_empty_result_keeps_the_schema(dr,tmp_path):
+    file_path = tmp_path / 'empty.parquet'
+    assert dr.write_sql_to_file('select * from empty',str(file_path)) == 0
+    assert pq.read_table(file_path).schema.names == ['id','name','amount','flag','ts']
@@ -0,0 +1,42 @@
+import types
+import sys
+
+import pyarrow as pa
+import pytest
+
+from azdsdr.readers.dremio import DremioReader
+
+@pytest.fixture
+def fake_arrow_odbc(monkeypatch):
+    module = types.ModuleType('arrow_odbc')
+    module.calls = []
+    def read_arrow_batches_from_odbc(query,connection_string,batch_size):
+        module.calls.append((query,connection_string,batch_size))
+        table = pa.table({'id':pa.array([1,2,3,4],pa.int64()),'market':['en-us','en-us','de-de','en-us']})
+        return pa.RecordBatchReader.from_batches(table.schema,table.to_batches())
+    module.read_arrow_batches_from_odbc = read_arrow_batches_from_odbc
+    monkeypatch.setitem(sys.modules,'arrow_odbc',module)
+    return module
+
+def test_arrow_odbc_engine_works_with_the_flight_transport(monkeypatch,fake_arrow_odbc):
+    monkeypatch.setattr(DremioReader,'_connect_flight',lambda self,*args: setattr(self,'flight_client',object()))
+    dr = DremioReader(username='me@x.com',token='token',host='dremio.local',port=31010,transport='flight')
+    assert dr.transport == 'flight'
+    df = dr.run_sql_typed('select * from t',engine='arrow-odbc',chunk_rows=500)
+    assert df['id'].tolist() == [1,2,3,4]
+    assert str(df['id'].dtype) == 'Int8'
+    assert str(df['market'].dtype) == 'category'
+    query,connection_string,batch_size = fake_arrow_odbc.calls[0]
+    assert 'HOST=dremio.local;PORT=31010' in connection_string and 'UID=me@x.com' in connection_string
+    assert batch_size == 500
+
+def test_cursor_engine_is_rejected_with_the_flight_transport(monkeypatch):
+    monkeypatch.setattr(DremioReader,'_connect_flight',lambda self,*args: setattr(self,'flight_client',object()))
+    dr = DremioReader(username='me@x.com',token='token',transport='flight')
+    with pytest.raises(ValueError,match="engine 'cursor' needs the odbc transport"):
+        dr.run_sql_typed('select * from t',engine='cursor')
+
+def test_arrow_odbc_engine_with_the_odbc_transport(fake_pyodbc,fake_arrow_odbc):
+    dr = DremioReader(username='me@x.com',token='token')
+    assert len(dr.run_sql_typed('select * from t')) == 4
+    assert fake_arrow_odbc.calls[0][1] == fake_pyodbc.connections[0].conn_str
@@ -0,0 +1,97 @@
+import asyncio
+
+from conftest import kusto_table,FakeKustoError
+
+def range_table(csl):
+    # `range x from 0 to N` answers N+1 rows
+    n = int(csl.split()[-1])
+    return [kusto_table([('x','long'),('s','string')],[[i,f'r{i}'] for i in range(n + 1)])]
+
+def test_run_kql_returns_the_first_result_set(fake_kusto):
+    from azdsdr.readers import AsyncKustoReader
+    fake_kusto.handler = lambda csl: range_table(csl) + [kusto_table([('y','string')],[['other']])]
+
+    async def main():
+        async with AsyncKustoReader(cluster=fake_kusto.url,db='db') as kr:
+            return await kr.run_kql('range x from 0 to 2'),await kr.run_kql_all('range x from 0 to 1')
+
+    r,r_all = asyncio.run(main())
+    assert r['x'].tolist() == [0,1,2]
+    assert r['s'].tolist() == ['r0','r1','r2']
+    assert [len(df) for df in r_all] == [2,1]
+    assert r_all[1]['y'].tolist() == ['other']
+    assert fake_kusto.requests[0]['db'] == 'db'
+    assert fake_kusto.requests[0]['headers']['Authorization'] == 'Bearer token'
+
+def test_run_kql_many_keeps_order_and_limits_concurrency(fake_kusto):
+    from azdsdr.readers import AsyncKustoReader
+    fake_kusto.handler      = range_table
+    fake_kusto.delay_sec    = 0.05
+
+    async def main():
+        async with AsyncKustoReader(cluster=fake_kusto.url,db='db',max_concurrency=3) as kr:
+            rs      = await kr.run_kql_many([f'range x from 0 to {i}' for i in range(12)])
+            client  = kr._kusto_client
+            await kr.run_kql('range x from 0 to 0')
+            # every call of the reader shares one client and its HTTP session
+            assert kr._kusto_client is client
+            return rs
+
+    rs = asyncio.run(main())
+    assert [len(r) for r in rs] == [i + 1 for i in range(12)]
+    assert fake_kusto.max_inflight == 3
+
+def test_run_kql_many_max_concurrency_argument(fake_kusto):
+    from azdsdr.readers import AsyncKustoReader
+    fake_kusto.handler      = range_table
+    fake_kusto.delay_sec    = 0.05
+
+    async def main():
+        async with AsyncKustoReader(cluster=fake_kusto.url,db='db',max_concurrency=8) as kr:
+            return await kr.run_kql_many([f'range x from 0 to {i}' for i in range(6)],max_concurrency=2)
+
+    asyncio.run(main())
+    assert fake_kusto.max_inflight == 2
+
+def test_failed_query_does_not_stop_the_others(fake_kusto):
+    from azdsdr.readers import AsyncKustoReader
+    def handler(csl):
+        if 'bad' in csl:
+            raise FakeKustoError('Semantic error')
+        return range_table(csl)
+    fake_kusto.handler = handler
+
+    async def main():
+        async with AsyncKustoReader(cluster=fake_kusto.url,db='db') as kr:
+            return await kr.run_kql_many(['range x from 0 to 1','bad','range x from 0 to 2'])
+
+    rs = asyncio.run(main())
+    # a service error is printed and its result is None, like KustoReader.run_kql
+    assert len(rs[0]) == 2
+    assert rs[1] is None
+    assert len(rs[2]) == 3
+
+def test_metadata_helpers(fake_kusto):
+    from azdsdr.readers import AsyncKustoReader
+    def handler(csl):
+        if 'getschema' in csl:
+            return [kusto_table([('ColumnName','string'),('ColumnType','string')],[['a','long'],['b','string']])]
+        if '.show table' in csl:
+            return [kusto_table([('TableName','string'),('Folder','string')],[['t1','raw/events']])]
+        if "=~ 't1'" in csl:
+            return [kusto_table([('TableName','string')],[['t1']])]
+        return [kusto_table([('TableName','string')],[])]
+    fake_kusto.handler = handler
+
+    async def main():
+        async with AsyncKustoReader(cluster=fake_kusto.url,db='db') as kr:
+            return (
+                await kr.is_table_exist('t1')
+                ,await kr.is_table_exist('t2')
+                ,await kr.get_table_schema('t1')
+                ,await kr.get_table_folder('t1')
+            )
+
+    assert asyncio.run(main()) == (True,False,'a:long,b:string','raw/events')
+    # control commands go to the management endpoint
+    assert [r['path'] for r in fake_kusto.requests] == ['/v1/rest/mgmt','/v1/rest/mgmt','/v2/rest/query','/v1/rest/mgmt']
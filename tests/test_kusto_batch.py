@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import kusto_table,FakeKustoError
+
+def echo_statements(csl):
+    '''
+    Answer one table per `;` separated statement holding the statement text, `fork` statements
+    answer two tables and a batch holding a `bad` statement fails as a whole
+    '''
+    statements = [s.strip() for s in csl.split('\n;\n')]
+    if any('bad' in s for s in statements):
+        raise FakeKustoError('Semantic error')
+    tables = []
+    for s in statements:
+        tables.append(kusto_table([('q','string')],[[s]]))
+        if 'fork' in s:
+            tables.append(kusto_table([('q','string')],[[s + '#2']]))
+    return tables
+
+@pytest.fixture
+def kusto_reader(fake_kusto):
+    from azdsdr.readers import KustoReader
+    fake_kusto.handler = echo_statements
+    return KustoReader(cluster=fake_kusto.url,db='db',schema_cache_ttl_sec=None)
+
+def query_texts(fake_kusto) -> list:
+    return [r['csl'].split('\n;\n') for r in fake_kusto.requests]
+
+def test_queries_are_packed_and_mapped_back(kusto_reader,fake_kusto):
+    kql_list = [f'T{i} | take 1' for i in range(7)]
+    rs = kusto_reader.run_kql_batch(kql_list,max_batch_queries=3)
+    assert [r['q'][0] for r in rs] == kql_list
+    assert [len(q) for q in query_texts(fake_kusto)] == [3,3,1]
+
+def test_batch_size_limit(kusto_reader,fake_kusto):
+    kql_list = ['T | take 1' for _ in range(6)]
+    kusto_reader.run_kql_batch(kql_list,max_batch_chars=30)
+    # 10 chars + 3 for the separator per query
+    assert [len(q) for q in query_texts(fake_kusto)] == [2,2,2]
+
+def test_failed_batch_is_bisected(kusto_reader,fake_kusto):
+    from azure.kusto.data.exceptions import KustoServiceError
+    kql_list        = [f'T{i}' for i in range(8)]
+    kql_list[5]     = 'bad'
+    rs = kusto_reader.run_kql_batch(kql_list)
+    assert isinstance(rs[5],KustoServiceError)
+    assert [r['q'][0] for i,r in enumerate(rs) if i != 5] == [q for i,q in enumerate(kql_list) if i != 5]
+    # depth first: 8 -> 4 (ok), 4 -> 2 -> 1 (ok), 1 (bad), then 2 (ok)
+    assert [len(q) for q in query_texts(fake_kusto)] == [8,4,4,2,1,1,2]
+
+def test_statements_and_commands_are_sent_alone(kusto_reader,fake_kusto):
+    kql_list = [
+        'A'
+        ,'let n = 1;\nT | take n'
+        ,".show tables"
+        ,"B | where s == 'x;y'"
+        ,'C // ends; here'
+    ]
+    rs = kusto_reader.run_kql_batch(kql_list)
+    assert len(rs) == 5
+    assert all(not isinstance(r,Exception) for r in rs)
+    assert [r['csl'] for r in fake_kusto.requests] == [
+        'let n = 1;\nT | take n'
+        ,'.show tables'
+        ,"A\n;\nB | where s == 'x;y'\n;\nC // ends; here"
+    ]
+
+def test_extra_result_sets_are_split_off(kusto_reader,fake_kusto):
+    rs = kusto_reader.run_kql_batch(['A','T | fork (take 1) (take 2)','C'])
+    assert [r['q'][0] for r in rs] == ['A','T | fork (take 1) (take 2)','C']
+    # 4 result sets for 3 queries -> A, then 3 result sets for 2 queries -> fork, C
+    assert [len(q) for q in query_texts(fake_kusto)] == [3,1,2,1,1]
+
+def test_network_error_is_not_bisected(fake_kusto):
+    from azure.kusto.data.exceptions import KustoNetworkError
+    from azdsdr.readers import KustoReader
+    url = fake_kusto.url
+    fake_kusto.stop()
+    kusto_reader = KustoReader(cluster=url,db='db',schema_cache_ttl_sec=None)
+    rs = kusto_reader.run_kql_batch(['A','B','C'])
+    assert all(isinstance(r,KustoNetworkError) for r in rs)
+    assert kusto_reader.query_stats.records()[-1]['error'].startswith('KustoNetworkError')
+    assert len(kusto_reader.query_stats.records()) == 1
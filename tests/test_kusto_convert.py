@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from azdsdr.readers.kusto_convert import kusto_rows_to_frame,_timespan_array,_parse_timespan_value
+
+class Column:
+    def __init__(self,column_name,column_type) -> None:
+        self.column_name = column_name
+        self.column_type = column_type
+
+def convert_timespans(values) -> list:
+    return kusto_rows_to_frame([[v] for v in values],[Column('t','timespan')])['t'].tolist()
+
+def test_timespan_formats():
+    r = convert_timespans(['00:00:01','1.02:03:04.5000000','-1.02:03:04.5','-00:00:00.0000001',None])
+    assert r[:4] == [
+        pd.Timedelta(seconds=1)
+        ,pd.Timedelta(days=1,hours=2,minutes=3,seconds=4.5)
+        ,-pd.Timedelta(days=1,hours=2,minutes=3,seconds=4.5)
+        ,pd.Timedelta(nanoseconds=-100)
+    ]
+    assert pd.isna(r[4])
+
+@pytest.mark.parametrize('value',['10675199.02:48:05.4775807','-10675199.02:48:05.4775808','200000.00:00:00','-200000.00:00:00'])
+def test_timespans_out_of_range_become_nat(value):
+    import pyarrow as pa
+    # the checked kernels refuse to wrap around instead of returning a wrong duration
+    with pytest.raises(pa.ArrowInvalid):
+        _timespan_array([value])
+    r = convert_timespans(['01:00:00',value])
+    assert r[0] == pd.Timedelta(hours=1)
+    assert pd.isna(r[1])
+
+def test_timespan_ticks():
+    assert convert_timespans([10,-10]) == [pd.Timedelta(microseconds=1),pd.Timedelta(microseconds=-1)]
+    r = convert_timespans([2**62,5])
+    assert pd.isna(r[0])
+    assert r[1] == pd.Timedelta(nanoseconds=500)
+    assert pd.isna(_parse_timespan_value(2**62))
+
+def test_largest_timespan_in_range():
+    # 106751.23:47:16.854775807 is the largest timedelta64[ns]
+    assert convert_timespans(['106751.23:47:16.8547758','-106751.23:47:16.8547758']) == [
+        pd.Timedelta('106751 days 23:47:16.8547758')
+        ,-pd.Timedelta('106751 days 23:47:16.8547758')
+    ]
+
+def test_benchmark_table_matches_the_sdk_conversion():
+    pytest.importorskip('azure.kusto.data')
+    from azure.kusto.data.helpers import dataframe_from_result_table
+    from azdsdr.readers import kusto_result_to_frame
+    sys.path.insert(0,str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+    try:
+        from kusto_convert import make_result_table,columns
+    finally:
+        sys.path.pop(0)
+    table   = make_result_table(1000,[name for name,_ in columns])
+    sdk_df  = dataframe_from_result_table(table)
+    df      = kusto_result_to_frame(table)
+    for name in ['id','amount','quantity','duration','event_time']:
+        pd.testing.assert_series_equal(df[name],sdk_df[name].astype(df[name].dtype),check_names=False)
@@ -0,0 +1,222 @@
+import uuid
+
+import pandas as pd
+import pytest
+
+class FakeIngestClient:
+    '''
+    Queued ingest client recording the descriptors and properties it is sent
+    '''
+    def __init__(self) -> None:
+        self.calls = []
+
+    def _queued(self,kind,descriptor,ingestion_properties):
+        from azure.kusto.ingest import IngestionResult,IngestionStatus
+        self.calls.append((kind,descriptor,ingestion_properties))
+        return IngestionResult(
+            IngestionStatus.QUEUED
+            ,ingestion_properties.database
+            ,ingestion_properties.table
+            ,descriptor.source_id
+            ,f'https://account.blob.core.windows.net/c/{descriptor.source_id}?sig=x'
+        )
+
+    def ingest_from_stream(self,descriptor,ingestion_properties):
+        return self._queued('stream',descriptor,ingestion_properties)
+
+    def ingest_from_file(self,descriptor,ingestion_properties):
+        return self._queued('file',descriptor,ingestion_properties)
+
+    def ingest_from_blob(self,descriptor,ingestion_properties):
+        return self._queued('blob',descriptor,ingestion_properties)
+
+@pytest.fixture
+def kusto_reader():
+    pytest.importorskip('azure.kusto.ingest')
+    from azdsdr.readers import KustoReader
+    kr = KustoReader(cluster='https://fake.kusto.windows.net',db='db',schema_cache_ttl_sec=None)
+    kr.ingest_client = FakeIngestClient()
+    return kr
+
+def test_upload_df_defaults_to_csv(kusto_reader):
+    from azure.kusto.data import DataFormat
+    from azure.kusto.ingest import ReportLevel
+    from azdsdr.readers.kusto_ingest import IngestHandle
+    df      = pd.DataFrame({'a':range(1000),'b':['x'] * 1000})
+    handle  = kusto_reader.upload_df_to_kusto('t',df,chunk_size_mb=0.01,extent_tags=['tag1'])
+    assert isinstance(handle,IngestHandle)
+    assert len(handle.chunks) > 1
+    assert handle.row_count == 1000
+    assert handle.paths == {'queued':len(handle.chunks)}
+    kind,descriptor,props = kusto_reader.ingest_client.calls[0]
+    assert kind == 'stream'
+    assert props.format == DataFormat.CSV
+    # no success messages are left in the status queues unless they are asked for
+    assert props.report_level == ReportLevel.FailuresOnly
+    assert handle.report_status is False
+    assert props.additional_tags == ['tag1']
+    # chunks are written without a header line
+    assert not props.additional_properties
+
+def test_upload_with_status_reporting(kusto_reader,tmp_path):
+    from azure.kusto.ingest import ReportLevel
+    csv_path = tmp_path / 'data.csv'
+    csv_path.write_text('a,b\n1,x\n')
+    handles = [
+        kusto_reader.upload_df_to_kusto('t',pd.DataFrame({'a':[1]}),report_status=True)
+        ,kusto_reader.upload_csv_to_kusto('t',csv_path,report_status=True)
+        ,kusto_reader.upload_csv_from_blob('t','https://account.blob.core.windows.net/c/data.csv?sig=x',blob_size=1,report_status=True)
+    ]
+    assert [h.report_status for h in handles] == [True,True,True]
+    assert [props.report_level for _,_,props in kusto_reader.ingest_client.calls] == [ReportLevel.FailuresAndSuccesses] * 3
+
+def test_upload_csv_file(kusto_reader,tmp_path):
+    from azure.kusto.data import DataFormat
+    csv_path = tmp_path / 'data.csv'
+    csv_path.write_text('a,b\n1,x\n2,y\n')
+    handle = kusto_reader.upload_csv_to_kusto('t',csv_path,mapping_name='t_csv_mapping',report_status=False)
+    kind,descriptor,props = kusto_reader.ingest_client.calls[0]
+    assert kind == 'file'
+    assert descriptor.size == csv_path.stat().st_size
+    assert props.format == DataFormat.CSV
+    assert props.ingestion_mapping_reference == 't_csv_mapping'
+    assert props.additional_properties == {'ignoreFirstRecord':'true'}
+    assert handle.report_status is False
+    assert handle.source_ids == [descriptor.source_id]
+    assert handle.raw_bytes == csv_path.stat().st_size
+    # the rows of a file are not counted
+    assert handle.row_count is None
+
+def test_upload_csv_from_blob(kusto_reader):
+    handle = kusto_reader.upload_csv_from_blob('t','https://account.blob.core.windows.net/c/data.csv?sig=x',blob_size=1234,extent_tags=['tag1'])
+    kind,descriptor,props = kusto_reader.ingest_client.calls[0]
+    assert kind == 'blob'
+    assert descriptor.size == 1234
+    assert props.additional_tags == ['tag1']
+    assert handle.extent_tags == ['tag1']
+    assert handle.report_status is False
+    assert len(handle.results) == 1
+    assert handle.errors == []
+
+def test_failed_source_is_recorded(kusto_reader):
+    def fail(descriptor,ingestion_properties):
+        raise Exception('queue unavailable')
+    kusto_reader.ingest_client.ingest_from_blob = fail
+    handle = kusto_reader.upload_csv_from_blob('t','https://account.blob.core.windows.net/c/data.csv?sig=x',blob_size=1)
+    assert handle.results == []
+    assert str(handle.errors[0]) == 'queue unavailable'
+
+class FakeQueueMessage:
+    def __init__(self,id,content) -> None:
+        self.id         = id
+        self.pop_receipt= f'receipt-{id}'
+        self.content    = content
+
+class FakeStatusQueue:
+    def __init__(self,messages=()) -> None:
+        self.messages = [FakeQueueMessage(i,m) for i,m in enumerate(messages)]
+
+    def receive_messages(self,messages_per_page,max_messages,visibility_timeout):
+        return list(self.messages[:max_messages])
+
+    def delete_message(self,id,pop_receipt):
+        self.messages = [m for m in self.messages if m.id != id]
+
+def status_message(source_id,**fields) -> str:
+    import json
+    return json.dumps({'IngestionSourceId':str(source_id),'Table':'t',**fields})
+
+def queued_results(n) -> list:
+    from azure.kusto.ingest import IngestionResult,IngestionStatus
+    return [
+        IngestionResult(IngestionStatus.QUEUED,'db','t',uuid4,f'https://account.blob.core.windows.net/c/{uuid4}.csv.gz?sig=x')
+        for uuid4 in (uuid.uuid4() for _ in range(n))
+    ]
+
+def test_status_queues_of_a_result_list(kusto_reader):
+    from azure.kusto.ingest.status import SuccessMessage,FailureMessage
+    from azdsdr.readers import IngestTracker
+    results     = queued_results(2)
+    other_id    = uuid.uuid4()
+    success     = FakeStatusQueue([status_message(other_id),status_message(results[0].source_id)])
+    failure     = FakeStatusQueue([status_message(results[1].source_id,Details='bad format',ErrorCode='BadRequest_InvalidBlob')])
+    tracker     = IngestTracker(kusto_reader,results,report_status=True,min_poll_sec=0.01)
+    tracker._queue_clients = [(success,SuccessMessage,'Succeeded'),(failure,FailureMessage,'Failed')]
+    status = tracker.wait(timeout_sec=5)
+    assert status['done']
+    assert status['succeeded'] == [str(results[0].source_id)]
+    assert status['failed'][0]['source_id'] == str(results[1].source_id)
+    assert status['failed'][0]['error_code'] == 'BadRequest_InvalidBlob'
+    # messages of other sources stay in the queue for their own tracker
+    assert [m.content for m in success.messages] == [status_message(other_id)]
+    assert failure.messages == []
+
+def test_result_list_without_status_reporting_needs_a_row_count(kusto_reader):
+    from azdsdr.readers import IngestTracker
+    with pytest.raises(ValueError,match='expected_row_count'):
+        IngestTracker(kusto_reader,queued_results(2))
+
+def test_result_list_verified_by_row_count(kusto_reader,monkeypatch):
+    from azdsdr.readers import IngestTracker
+    results = queued_results(2)
+    queries = []
+    def run_kql(kql):
+        queries.append(kql)
+        if kql.startswith('.show ingestion failures'):
+            return pd.DataFrame({'IngestionSourcePath':[],'Details':[],'ErrorCode':[]})
+        # the rows show up at the second check
+        return pd.DataFrame({'RowCount':[0 if len(queries) < 3 else 10]})
+    monkeypatch.setattr(kusto_reader,'_run_kql',run_kql)
+    status = IngestTracker(kusto_reader,results,expected_row_count=10,min_poll_sec=0.01).wait(timeout_sec=5)
+    assert status['done']
+    assert sorted(status['succeeded']) == sorted(str(r.source_id) for r in results)
+    assert status['row_count'] == 10
+
+def test_result_list_failure_from_ingestion_failures(kusto_reader,monkeypatch):
+    from azdsdr.readers import IngestTracker
+    results = queued_results(2)
+    def run_kql(kql):
+        if kql.startswith('.show ingestion failures'):
+            return pd.DataFrame({
+                'IngestionSourcePath'   :[results[1].blob_uri.split('?')[0]]
+                ,'Details'              :['bad format']
+                ,'ErrorCode'            :['BadRequest_InvalidBlob']
+            })
+        return pd.DataFrame({'RowCount':[0]})
+    monkeypatch.setattr(kusto_reader,'_run_kql',run_kql)
+    status = IngestTracker(kusto_reader,results,expected_row_count=10,min_poll_sec=0.01).wait(timeout_sec=0.2)
+    assert not status['done']
+    assert status['failed'][0]['source_id'] == str(results[1].source_id)
+    assert status['pending'] == [str(results[0].source_id)]
+
+def test_handle_of_unknown_row_count_without_status_reporting(kusto_reader):
+    from azdsdr.readers import IngestTracker
+    handle = kusto_reader.upload_csv_from_blob('t','https://account.blob.core.windows.net/c/data.csv?sig=x',blob_size=1,report_status=False,extent_tags=['tag1'])
+    with pytest.raises(ValueError):
+        IngestTracker(kusto_reader,handle)
+    assert IngestTracker(kusto_reader,handle,expected_row_count=5).expected_row_count == 5
+
+def test_streamed_results_are_done(kusto_reader):
+    from azure.kusto.ingest import IngestionResult,IngestionStatus
+    from azdsdr.readers import IngestTracker
+    results = [IngestionResult(IngestionStatus.SUCCESS,'db','t',uuid.uuid4())]
+    status  = IngestTracker(kusto_reader,results).wait(timeout_sec=1)
+    assert status['done']
+    assert status['succeeded'] == [str(results[0].source_id)]
+
+def test_queued_ingestion_without_ingest_cluster():
+    from azdsdr.readers import KustoReader
+    kr = KustoReader(cluster='https://fake.westus.kusto.windows.net',db='db',schema_cache_ttl_sec=None)
+    with pytest.raises(Exception,match='ingest_cluster_str'):
+        kr.upload_df_to_kusto('t',pd.DataFrame({'a':[1]}))
+    with pytest.raises(Exception,match='ingest_cluster_str'):
+        kr.upload_csv_from_blob('t','https://account.blob.core.windows.net/c/data.csv?sig=x',blob_size=1)
+
+def test_streaming_mode_derives_the_ingest_cluster():
+    from azdsdr.readers import KustoReader
+    kr = KustoReader(cluster='https://fake.westus.kusto.windows.net',db='db',ingest_mode='streaming',schema_cache_ttl_sec=None)
+    assert kr._select_ingest_client(1024) is kr.managed_ingest_client
+    # payloads too large to stream are queued on the ingest cluster the SDK derives
+    queued_client = kr._select_ingest_client(kr.streaming_max_mb * 1024 * 1024 + 1)
+    assert queued_client is kr.managed_ingest_client.queued_client
+    assert queued_client._connection_datasource == 'https://ingest-fake.westus.kusto.windows.net'
@@ -0,0 +1,104 @@
+import re
+
+import pandas as pd
+import pytest
+
+from azdsdr.readers import KustoMirror
+
+_slice_re = re.compile(r'where ts >= datetime\((\S+)Z\) and ts < datetime\((\S+)Z\)')
+
+class FakeReader:
+    '''
+    Answer the min watermark query and the partition pulls of a mirror from the frame `source`
+    '''
+    def __init__(self,source:'pd.DataFrame') -> None:
+        self.source = source
+        self.kqls   = []
+
+    def run_kql(self,kql):
+        self.kqls.append(kql)
+        return pd.DataFrame({'azdsdr_min':[self.source['ts'].min()]})
+
+    def run_kql_to_parquet(self,kql,local_path,chunk_rows=100000):
+        self.kqls.append(kql)
+        start,end   = (pd.Timestamp(v,tz='UTC') for v in _slice_re.search(kql).groups())
+        df          = self.source[(self.source['ts'] >= start) & (self.source['ts'] < end)]
+        df.to_parquet(local_path,index=False)
+        return len(df)
+
+def events(*times,value=0):
+    return pd.DataFrame({
+        'ts'        : pd.to_datetime(list(times),utc=True)
+        ,'value'    : [value] * len(times)
+    })
+
+def pulls(reader) -> list:
+    return [_slice_re.search(kql).group(1) for kql in reader.kqls if 'where ts' in kql]
+
+def test_first_refresh_starts_at_the_min_watermark(tmp_path):
+    reader  = FakeReader(events('2026-01-01T05:00','2026-01-02T10:00','2026-01-03T23:00'))
+    mirror  = KustoMirror(reader,'Events','ts',str(tmp_path),partition='day')
+    result  = mirror.refresh(end='2026-01-04')
+    assert 'summarize azdsdr_min = min(ts)' in reader.kqls[0]
+    assert result['partitions'] == ['2026-01-01','2026-01-02','2026-01-03']
+    assert result['rows'] == 3
+    assert mirror.watermark == pd.Timestamp('2026-01-03T23:00',tz='UTC')
+    assert len(mirror.read()) == 3
+
+def test_empty_source(tmp_path):
+    reader  = FakeReader(events())
+    mirror  = KustoMirror(reader,'Events','ts',str(tmp_path))
+    assert mirror.refresh()['rows'] == 0
+    assert mirror.watermark is None
+    with pytest.raises(Exception,match='call refresh first'):
+        mirror.read()
+
+def test_overlap_repull_does_not_duplicate_rows(tmp_path):
+    reader  = FakeReader(events('2026-01-01T05:00','2026-01-01T22:00'))
+    mirror  = KustoMirror(reader,'Events','ts',str(tmp_path),partition='day',overlap_sec=6 * 3600)
+    mirror.refresh(end='2026-01-02')
+
+    # a late row lands before the watermark, within the overlap, and a new day starts
+    reader.source   = pd.concat([reader.source,events('2026-01-01T20:00','2026-01-02T01:00',value=1)],ignore_index=True)
+    reader.kqls     = []
+    result          = mirror.refresh(end='2026-01-03')
+    # 22:00 - 6h is still on 2026-01-01, the whole day is pulled again
+    assert pulls(reader) == ['2026-01-01T00:00:00.000000','2026-01-02T00:00:00.000000']
+    assert result['rows'] == 4
+
+    df = mirror.read().sort_values('ts')
+    assert len(df) == 4
+    assert df['ts'].is_unique
+    assert mirror.watermark == pd.Timestamp('2026-01-02T01:00',tz='UTC')
+
+    # the state is kept on disk for the next session
+    again = KustoMirror(reader,'Events','ts',str(tmp_path),partition='day',overlap_sec=6 * 3600)
+    assert again.watermark == mirror.watermark
+    assert again.state['partitions'] == {'2026-01-01':3,'2026-01-02':1}
+
+def test_state_mismatch_raises(tmp_path):
+    reader = FakeReader(events('2026-01-01T05:00'))
+    KustoMirror(reader,'Events','ts',str(tmp_path)).refresh(end='2026-01-02')
+    with pytest.raises(Exception,match='mirrors watermark_column ts, not other_ts'):
+        KustoMirror(reader,'Events','other_ts',str(tmp_path))
+    with pytest.raises(Exception,match='mirrors partition day, not hour'):
+        KustoMirror(reader,'Events','ts',str(tmp_path),partition='hour')
+    with pytest.raises(ValueError):
+        KustoMirror(reader,'Events','ts',str(tmp_path / 'new'),partition='week')
+
+def test_read_filters_hour_partitions(tmp_path):
+    reader  = FakeReader(events('2026-01-01T00:10','2026-01-01T01:10','2026-01-01T01:50','2026-01-01T02:30','2026-01-01T03:00'))
+    mirror  = KustoMirror(reader,'Events','ts',str(tmp_path),partition='hour')
+    result  = mirror.refresh(end='2026-01-01T04:00')
+    assert result['partitions'] == ['2026-01-01T00','2026-01-01T01','2026-01-01T02','2026-01-01T03']
+
+    df = mirror.read(columns=['ts'],start='2026-01-01T01:30',end='2026-01-01T02:30')
+    assert df.columns.tolist() == ['ts']
+    assert df['ts'].tolist() == [pd.Timestamp('2026-01-01T01:50',tz='UTC')]
+    # only the partitions within the time range are opened
+    files = mirror._local_files(pd.Timestamp('2026-01-01T01:30',tz='UTC'),pd.Timestamp('2026-01-01T02:30',tz='UTC'))
+    assert [f.split('part=')[1][:13] for f in files] == ['2026-01-01T01','2026-01-01T02']
+
+    import pyarrow.dataset as ds
+    table = mirror.read_arrow(start='2026-01-01T01:00',filter=ds.field('ts') < pd.Timestamp('2026-01-01T03:00',tz='UTC'))
+    assert table.num_rows == 3
@@ -0,0 +1,117 @@
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+columns = [SimpleNamespace(column_name='id',column_type='long'),SimpleNamespace(column_name='name',column_type='string')]
+
+class FakeStoredResults:
+    '''
+    Stand-in of `KustoReader._execute` answering the stored query result commands of
+    `run_kql_paged` from `rows`. Later pages are answered first when `reverse_delay` is set.
+    '''
+    def __init__(self,rows:list,reverse_delay=0) -> None:
+        self.rows           = rows
+        self.reverse_delay  = reverse_delay
+        self.stored         = set()
+        self.dropped        = []
+        self.pages          = []
+        self.inflight       = 0
+        self.max_inflight   = 0
+        self._lock          = threading.Lock()
+
+    @staticmethod
+    def _response(table_columns,rows):
+        return SimpleNamespace(primary_results=[SimpleNamespace(columns=table_columns,raw_rows=rows)])
+
+    def __call__(self,kql:str):
+        if kql.startswith('.set stored_query_result'):
+            self.stored.add(kql.split()[2])
+            return self._response([],[])
+        if kql.startswith('.drop stored_query_result'):
+            self.dropped.append(kql.split()[2])
+            return self._response([],[])
+        name = re.match(r'stored_query_result\("(\w+)"\)',kql).group(1)
+        assert name in self.stored
+        if kql.endswith('| count'):
+            return self._response([SimpleNamespace(column_name='Count',column_type='long')],[[len(self.rows)]])
+        first,last = map(int,re.search(r'between \((\d+) \.\. (\d+)\)',kql).groups())
+        with self._lock:
+            self.pages.append((first,last))
+            self.inflight       += 1
+            self.max_inflight   = max(self.max_inflight,self.inflight)
+        try:
+            time.sleep(self.reverse_delay / first)
+        finally:
+            with self._lock:
+                self.inflight -= 1
+        return self._response(columns,self.rows[first - 1:last])
+
+def make_rows(n):
+    return [[i,f'n{i}'] for i in range(n)]
+
+@pytest.fixture
+def kusto_reader(fake_kusto):
+    from azdsdr.readers import KustoReader
+    return KustoReader(cluster=fake_kusto.url,db='db',schema_cache_ttl_sec=None)
+
+@pytest.mark.parametrize('row_cnt,page_sizes',[
+    (25,[10,10,5])
+    ,(30,[10,10,10])
+    ,(10,[10])
+    ,(3,[3])
+])
+def test_page_boundaries(kusto_reader,row_cnt,page_sizes):
+    fake = FakeStoredResults(make_rows(row_cnt))
+    kusto_reader._execute = fake
+    pages = list(kusto_reader.run_kql_paged('T',page_rows=10,max_workers=1))
+    assert [len(df) for df in pages] == page_sizes
+    assert pd.concat(pages)['id'].tolist() == list(range(row_cnt))
+    assert fake.dropped == list(fake.stored)
+
+def test_empty_result_keeps_the_columns(kusto_reader):
+    fake = FakeStoredResults([])
+    kusto_reader._execute = fake
+    pages = list(kusto_reader.run_kql_paged('T',page_rows=10))
+    assert len(pages) == 1
+    assert pages[0].columns.tolist() == ['id','name']
+    assert pages[0]['id'].dtype == 'Int64'
+    assert fake.pages == [(1,0)]
+    assert len(fake.dropped) == 1
+
+def test_concurrent_pages_are_yielded_in_order(kusto_reader):
+    fake = FakeStoredResults(make_rows(95),reverse_delay=0.2)
+    kusto_reader._execute = fake
+    pages = list(kusto_reader.run_kql_paged('T',page_rows=10,max_workers=4))
+    assert pd.concat(pages)['id'].tolist() == list(range(95))
+    assert 1 < fake.max_inflight <= 4
+    assert len(fake.dropped) == 1
+
+def test_stored_result_is_dropped_when_the_consumer_stops(kusto_reader):
+    fake = FakeStoredResults(make_rows(100))
+    kusto_reader._execute = fake
+    pages = kusto_reader.run_kql_paged('T',page_rows=10,max_workers=2)
+    assert next(pages)['id'].tolist() == list(range(10))
+    assert fake.dropped == []
+    pages.close()
+    assert fake.dropped == list(fake.stored)
+    # the pages after the pending ones are never fetched
+    assert len(fake.pages) <= 4
+
+def test_stored_result_is_dropped_when_writing_parquet_fails(kusto_reader,tmp_path,monkeypatch):
+    import pyarrow.parquet as pq
+    fake = FakeStoredResults(make_rows(30))
+    kusto_reader._execute = fake
+    assert kusto_reader.run_kql_paged_to_parquet('T',str(tmp_path / 'all.parquet'),page_rows=10) == 30
+    assert pq.read_table(tmp_path / 'all.parquet').num_rows == 30
+    assert len(fake.dropped) == 1
+
+    def fail(self,table,*args,**kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(pq.ParquetWriter,'write_table',fail)
+    with pytest.raises(OSError):
+        kusto_reader.run_kql_paged_to_parquet('T',str(tmp_path / 'fail.parquet'),page_rows=10)
+    assert len(fake.dropped) == 2
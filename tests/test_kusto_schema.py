@@ -0,0 +1,125 @@
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import kusto_table
+from azdsdr.readers.kusto_schema import KustoSchemaCatalog,is_schema_command
+
+def schema_json(tables,version=(1,0),db='db'):
+    return json.dumps({'Databases':{db:{
+        'Name'          :db
+        ,'MajorVersion' :version[0]
+        ,'MinorVersion' :version[1]
+        ,'Tables'       :{
+            name:{
+                'Name'              :name
+                ,'Folder'           :folder
+                ,'DocString'        :''
+                ,'OrderedColumns'   :[{'Name':c,'CslType':t} for c,t in columns]
+            }
+            for name,(columns,folder) in tables.items()
+        }
+    }}})
+
+class FakeReader:
+    '''
+    Answers `.show database schema` commands with `schema`, an empty result when the command
+    has `if_later_than` and `changed` is False
+    '''
+    def __init__(self,tables) -> None:
+        self.db         = 'db'
+        self.tables     = tables
+        self.version    = (1,0)
+        self.changed    = False
+        self.commands   = []
+
+    def _run_kql(self,kql):
+        self.commands.append(kql)
+        if 'if_later_than' in kql and not self.changed:
+            return pd.DataFrame({'DatabaseSchema':[]})
+        return pd.DataFrame({'DatabaseSchema':[schema_json(self.tables,self.version)]})
+
+@pytest.fixture
+def reader():
+    return FakeReader({'Events':([('ts','datetime'),('name','string')],'raw')})
+
+def test_is_schema_command():
+    for kql in ['.create table T (a:long)','.create-merge tables T (a:long)',' .drop table T','.alter column T.a type=string'
+                ,'.rename table A to B','.set-or-append T <| S','.set T <| S','.drop async table T']:
+        assert is_schema_command(kql),kql
+    for kql in ['T | take 10','.show tables','.show database schema as json','.create function f() { T }','.drop extents from T']:
+        assert not is_schema_command(kql),kql
+
+def test_schema_is_loaded_once_within_the_ttl(reader):
+    catalog = KustoSchemaCatalog(reader,ttl_sec=600)
+    assert catalog.is_table_exist('events')
+    assert not catalog.is_table_exist('Other')
+    assert catalog.get_table_schema('Events') == 'ts:datetime,name:string'
+    assert catalog.get_table_folder('EVENTS') == 'raw'
+    assert catalog.list_tables('ra')['TableName'].tolist() == ['Events']
+    assert reader.commands == [".show database ['db'] schema as json"]
+    with pytest.raises(Exception,match='Table Other does not exist in database db'):
+        catalog.get_table_schema('Other')
+
+def test_expired_schema_is_checked_with_if_later_than(reader):
+    catalog = KustoSchemaCatalog(reader,ttl_sec=600)
+    catalog.is_table_exist('Events')
+    # unchanged database, the loaded tables are kept
+    catalog._loaded_at -= 601
+    assert catalog.is_table_exist('Events')
+    assert reader.commands[-1] == ".show database ['db'] schema if_later_than \"v1.0\" as json"
+
+    reader.tables['Other']  = ([('a','long')],'')
+    reader.version          = (1,1)
+    reader.changed          = True
+    catalog._loaded_at -= 601
+    assert catalog.is_table_exist('Other')
+    catalog._loaded_at -= 601
+    catalog.is_table_exist('Other')
+    assert reader.commands[-1] == ".show database ['db'] schema if_later_than \"v1.1\" as json"
+    assert len(reader.commands) == 4
+
+def test_add_and_drop_table(reader):
+    catalog = KustoSchemaCatalog(reader,ttl_sec=600)
+    # nothing loaded yet, nothing to update
+    catalog.add_table('Ignored',[('a','long')])
+    catalog.is_table_exist('Events')
+    assert not catalog.is_table_exist('Ignored')
+
+    catalog.add_table('New',[('a','long'),('b','string')],folder='tmp')
+    assert catalog.get_table_schema('new') == 'a:long,b:string'
+    assert catalog.get_table_folder('New') == 'tmp'
+    catalog.drop_table('EVENTS')
+    assert not catalog.is_table_exist('Events')
+    assert len(reader.commands) == 1
+    # the local changes moved the database version, the next check downloads the whole schema
+    catalog._loaded_at -= 601
+    catalog.is_table_exist('Events')
+    assert reader.commands[-1] == ".show database ['db'] schema as json"
+
+def test_failed_load_raises():
+    reader = FakeReader({})
+    reader._run_kql = lambda kql: None
+    with pytest.raises(Exception,match='Load the schema of database db failed'):
+        KustoSchemaCatalog(reader).is_table_exist('T')
+
+def test_schema_commands_invalidate_the_reader_catalog(fake_kusto):
+    from azdsdr.readers import KustoReader
+    tables = {'Events':([('ts','datetime')],'')}
+    def handler(csl):
+        if csl.startswith('.show database'):
+            return [kusto_table([('DatabaseSchema','string')],[[schema_json(tables)]])]
+        return [kusto_table([('x','long')],[[1]])]
+    fake_kusto.handler = handler
+    kr = KustoReader(cluster=fake_kusto.url,db='db',schema_cache_ttl_sec=600)
+    assert not kr.is_table_exist('Other')
+    kr.run_kql('T | take 1')
+    assert kr.is_table_exist('Events')
+    shows = lambda: [r for r in fake_kusto.requests if r['csl'].startswith('.show database')]
+    assert len(shows()) == 1
+
+    tables['Other'] = ([('a','long')],'')
+    kr.run_kql('.create table Other (a:long)')
+    assert kr.is_table_exist('Other')
+    assert len(shows()) == 2
@@ -0,0 +1,107 @@
+import json
+
+import pandas as pd
+import pytest
+
+from azdsdr.readers import QueryStatsRecorder
+from azdsdr.readers.kusto_stats import response_stats
+
+resource_consumption = {
+    'ExecutionTime'     : 0.25
+    ,'resource_usage'   : {
+        'cache'     : {'memory':{'hits':30,'misses':10},'disk':{'hits':5,'misses':5}}
+        ,'cpu'      : {'user':'00:00:01','kernel':'00:00:00','total cpu':'00:00:01.5000000'}
+        ,'memory'   : {'peak_per_node':1048576}
+    }
+    ,'input_dataset_statistics' : {'extents':{'total':100,'scanned':12},'rows':{'total':1000000,'scanned':5000}}
+}
+
+def v2_response(rows,payload=resource_consumption):
+    from azure.kusto.data.response import KustoResponseDataSetV2
+    return KustoResponseDataSetV2([
+        {'FrameType':'DataSetHeader','IsProgressive':False,'Version':'v2.0'}
+        ,{'FrameType':'DataTable','TableId':1,'TableKind':'PrimaryResult','TableName':'PrimaryResult'
+         ,'Columns':[{'ColumnName':'x','ColumnType':'long'}],'Rows':[[i] for i in range(rows)]}
+        ,{'FrameType':'DataTable','TableId':2,'TableKind':'QueryCompletionInformation','TableName':'QueryCompletionInformation'
+         ,'Columns':[{'ColumnName':'EventTypeName','ColumnType':'string'},{'ColumnName':'Payload','ColumnType':'string'}]
+         ,'Rows':[['QueryInfo','{}'],['QueryResourceConsumption',json.dumps(payload)]]}
+        ,{'FrameType':'DataSetCompletion','HasErrors':False,'Cancelled':False}
+    ])
+
+def test_response_stats():
+    stats = response_stats(v2_response(3))
+    assert stats['result_rows'] == 3
+    assert stats['server_exec_sec'] == 0.25
+    assert stats['cpu_sec'] == 1.5
+    assert stats['memory_peak_bytes'] == 1048576
+    assert (stats['extents_total'],stats['extents_scanned']) == (100,12)
+    assert (stats['rows_total'],stats['rows_scanned']) == (1000000,5000)
+    assert (stats['cache_memory_hits'],stats['cache_disk_misses']) == (30,5)
+
+def test_ring_buffer_keeps_the_newest_records():
+    recorder = QueryStatsRecorder(max_records=3)
+    for i in range(5):
+        recorder.record(f'T | take {i}',f'id-{i}',0.1)
+    assert [r['client_request_id'] for r in recorder.records()] == ['id-2','id-3','id-4']
+    recorder.clear()
+    assert recorder.records() == []
+
+def test_jsonl_export_and_callback(tmp_path):
+    export_path = tmp_path / 'stats.jsonl'
+    seen        = []
+    recorder    = QueryStatsRecorder(max_records=1,export_path=str(export_path),callback=seen.append)
+    recorder.record('T | take 1','id-1',0.5,database='db',response=v2_response(1))
+    recorder.record('T | bad','id-2',0.1,error=ValueError('bad query'))
+
+    lines = [json.loads(line) for line in export_path.read_text().splitlines()]
+    # the export keeps every record, the buffer only the newest one
+    assert [line['client_request_id'] for line in lines] == ['id-1','id-2']
+    assert lines[0]['cpu_sec'] == 1.5
+    assert lines[1]['error'] == 'ValueError: bad query'
+    assert [r['client_request_id'] for r in seen] == ['id-1','id-2']
+    assert len(recorder.records()) == 1
+
+def test_failing_callback_does_not_fail_the_query(capsys):
+    def callback(stats):
+        raise RuntimeError('telemetry is down')
+    recorder = QueryStatsRecorder(callback=callback)
+    stats    = recorder.record('T','id-1',0.1)
+    assert stats['query'] == 'T'
+    assert 'telemetry is down' in capsys.readouterr().out
+
+def test_summary_groups_queries_and_counts_errors():
+    recorder = QueryStatsRecorder()
+    recorder.record('T | take 1','id-1',1.0,response=v2_response(1))
+    recorder.record('T  |  take 1','id-2',2.0,response=v2_response(1))
+    recorder.record('T | take 1','id-3',0.5,error=Exception('timeout'))
+    recorder.record('S | count','id-4',9.0,response=v2_response(1,{**resource_consumption,'resource_usage':{'cpu':{'total cpu':'00:00:10'}}}))
+
+    summary = recorder.summary(by='cpu_sec')
+    assert summary['query'].tolist() == ['S | count','T | take 1']
+    assert summary['calls'].tolist() == [1,3]
+    assert summary['errors'].tolist() == [0,1]
+    assert summary['cpu_sec'].tolist() == [10.0,3.0]
+    assert summary['wall_sec'].tolist() == [9.0,3.5]
+    # the S query reported no cache usage
+    assert pd.isna(summary['cache_hit_ratio'][0])
+    assert summary['cache_hit_ratio'][1] == pytest.approx(35 / 50)
+
+    assert recorder.summary(top=1,by='wall_sec')['query'].tolist() == ['S | count']
+    with pytest.raises(ValueError):
+        recorder.summary(by='query')
+
+def test_empty_summary():
+    assert QueryStatsRecorder().summary().empty
+
+def test_reader_records_its_queries(fake_kusto):
+    from azdsdr.readers import KustoReader
+    recorder    = QueryStatsRecorder()
+    kr          = KustoReader(cluster=fake_kusto.url,db='db',query_stats=recorder,schema_cache_ttl_sec=None)
+    kr.run_kql('T | take 1')
+    record      = recorder.records()[-1]
+    assert record['query'] == 'T | take 1'
+    assert record['database'] == 'db'
+    assert record['result_rows'] == 1
+    assert record['error'] is None
+    # the id sent to the cluster, to find the query in `.show queries`
+    assert fake_kusto.requests[-1]['headers']['x-ms-client-request-id'] == record['client_request_id']
@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import kusto_table
+
+columns = [('id','long'),('name','string'),('amount','real'),('ok','bool'),('ts','datetime'),('props','dynamic')]
+
+def make_rows(n):
+    rows = []
+    for i in range(n):
+        if i < 20:
+            rows.append([i,f'n{i}',i * 1.5,i % 2 == 0,f'2026-01-01T00:00:{i:02d}Z',{'i':i}])
+        else:
+            # the last chunk is all nulls, it must keep the dtypes of the first ones
+            rows.append([i,None,None,None,None,None])
+    return rows
+
+@pytest.fixture
+def kusto_reader(fake_kusto):
+    from azdsdr.readers import KustoReader
+    fake_kusto.handler = lambda csl: [kusto_table(columns,make_rows(int(csl.split()[-1])))]
+    return KustoReader(cluster=fake_kusto.url,db='db',schema_cache_ttl_sec=None)
+
+def test_iter_kql_chunks_with_stable_dtypes(kusto_reader):
+    chunks = list(kusto_reader.iter_kql('rows 25',chunk_rows=10))
+    assert [len(df) for df in chunks] == [10,10,5]
+    dtypes = [df.dtypes.astype(str).tolist() for df in chunks]
+    assert dtypes[0] == ['Int64','object','float64','boolean','datetime64[ns, UTC]','object']
+    assert dtypes[1] == dtypes[0]
+    assert dtypes[2] == dtypes[0]
+    assert chunks[0]['id'].tolist() == list(range(10))
+    assert chunks[2]['ok'].isna().all()
+    assert chunks[0]['props'][3] == {'i':3}
+    assert kusto_reader.query_stats.records()[-1]['error'] is None
+
+def test_iter_kql_empty_result(kusto_reader):
+    chunks = list(kusto_reader.iter_kql('rows 0',chunk_rows=10))
+    assert len(chunks) == 1
+    assert chunks[0].columns.tolist() == [name for name,_ in columns]
+    assert chunks[0]['id'].dtype == 'Int64'
+
+def test_run_kql_to_parquet_row_groups(kusto_reader,tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    file_path = tmp_path / 'r.parquet'
+    assert kusto_reader.run_kql_to_parquet('rows 25',file_path,chunk_rows=10) == 25
+    f = pq.ParquetFile(file_path)
+    assert f.metadata.num_row_groups == 3
+    assert f.schema_arrow.field('id').type == pa.int64()
+    assert f.schema_arrow.field('ts').type == pa.timestamp('ns',tz='UTC')
+    # dynamic values are written as json text
+    assert f.schema_arrow.field('props').type == pa.string()
+    table = f.read()
+    assert table.column('props')[1].as_py() == '{"i": 1}'
+    assert table.column('amount')[24].as_py() is None
+
+def test_run_kql_to_parquet_empty_result(kusto_reader,tmp_path):
+    import pyarrow.parquet as pq
+    file_path = tmp_path / 'r.parquet'
+    assert kusto_reader.run_kql_to_parquet('rows 0',file_path) == 0
+    assert pq.read_table(file_path).column_names == [name for name,_ in columns]
+
+def test_stopping_early_closes_the_response(kusto_reader,monkeypatch):
+    import requests
+    closed = []
+    close  = requests.Response.close
+    monkeypatch.setattr(requests.Response,'close',lambda self: (closed.append(self.url),close(self)))
+    chunks = kusto_reader.iter_kql('rows 25',chunk_rows=10)
+    assert len(next(chunks)) == 10
+    assert closed == []
+    chunks.close()
+    assert closed == [kusto_reader.cluster + '/v2/rest/query']
+
+def test_error_while_writing_closes_the_response(kusto_reader,monkeypatch,tmp_path):
+    import requests
+    from azdsdr.readers import kusto as kusto_module
+    closed = []
+    close  = requests.Response.close
+    monkeypatch.setattr(requests.Response,'close',lambda self: (closed.append(self.url),close(self)))
+    def fail(chunks,file_path):
+        next(chunks)
+        raise OSError('disk full')
+    monkeypatch.setattr(kusto_module,'_write_parquet_chunks',fail)
+    with pytest.raises(OSError):
+        kusto_reader.run_kql_to_parquet('rows 25',str(tmp_path / 'out.parquet'),chunk_rows=10)
+    assert len(closed) == 1
@@ -0,0 +1,87 @@
+import datetime
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from azdsdr.readers.kusto_types import coerce_frame_to_schema,infer_csv_schema,infer_kusto_schema
+
+def test_infer_kusto_schema_from_dtypes_and_values():
+    df = pd.DataFrame({
+        'i'         :[1,2,3]
+        ,'f'        :[1.5,np.nan,2.0]
+        ,'b'        :[True,False,True]
+        ,'ts'       :pd.to_datetime(['2026-01-01','2026-01-02',None])
+        ,'td'       :pd.to_timedelta([1,2,3],unit='s')
+        ,'cat'      :pd.Categorical(['a','b','a'])
+        ,'text_long':['1','2',None]
+        ,'text_bool':['true','False',np.nan]
+        ,'text_dt'  :['2026-01-01T00:00:00Z','2026-01-02',None]
+        ,'guid'     :[str(uuid.uuid4()),str(uuid.uuid4()),None]
+        ,'json'     :['{"a":1}','[1,2]',None]
+        ,'objs'     :[{'a':1},[1],None]
+        ,'uuids'    :[uuid.uuid4(),None,uuid.uuid4()]
+        ,'dates'    :[datetime.date(2026,1,1),None,datetime.date(2026,1,3)]
+        ,'mixed'    :[1,'a',None]
+        ,'empty'    :[None,None,None]
+    })
+    assert dict(infer_kusto_schema(df)) == {
+        'i':'long','f':'real','b':'bool','ts':'datetime','td':'timespan','cat':'string'
+        ,'text_long':'long','text_bool':'bool','text_dt':'datetime','guid':'guid','json':'dynamic'
+        ,'objs':'dynamic','uuids':'guid','dates':'datetime','mixed':'string','empty':'string'
+    }
+    assert dict(infer_kusto_schema(df,column_types={'i':'int'}))['i'] == 'int'
+
+def test_leading_zero_ids_stay_strings(tmp_path):
+    df = pd.DataFrame({'id':['007','012','100'],'zip':['02134','10001',None],'n':['0','10','-3'],'x':['0.5','-0.25','1']})
+    assert dict(infer_kusto_schema(df)) == {'id':'string','zip':'string','n':'long','x':'real'}
+    csv_path = tmp_path / 'ids.csv'
+    csv_path.write_text('id,zip,n\n007,02134,0\n012,,10\n')
+    assert infer_csv_schema(csv_path) == [('id','string'),('zip','string'),('n','long')]
+
+def test_infer_csv_schema_in_chunks(tmp_path):
+    csv_path = tmp_path / 'data.csv'
+    # the second chunk turns `a` into a real and `b` into a string
+    rows = [f'{i},{i},,true' for i in range(5)] + ['1.5,x,,false']
+    csv_path.write_text('a,b,empty,flag\n' + '\n'.join(rows) + '\n')
+    assert infer_csv_schema(csv_path,chunk_rows=2) == [('a','real'),('b','string'),('empty','string'),('flag','bool')]
+    # only the sampled rows are read
+    assert infer_csv_schema(csv_path,sample_rows=5,chunk_rows=2)[1] == ('b','long')
+    assert infer_csv_schema(csv_path,column_types={'a':'string'})[0] == ('a','string')
+
+def test_infer_csv_schema_of_a_header_only_file(tmp_path):
+    csv_path = tmp_path / 'header.csv'
+    csv_path.write_text('a,b\n')
+    assert infer_csv_schema(csv_path,column_types={'b':'long'}) == [('a','string'),('b','long')]
+
+def test_coerce_keeps_missing_values():
+    df = pd.DataFrame({
+        's'         :['a',np.nan,'c']
+        ,'g'        :['6f1c0b5e-0000-4000-8000-000000000000',None,np.nan]
+        ,'b'        :['true',np.nan,'false']
+        ,'b_empty'  :['True','',None]
+        ,'n'        :['1',None,'3']
+        ,'r'        :['1.5','',np.nan]
+        ,'ts'       :['2026-01-01',None,'2026-01-03']
+        ,'d'        :[{'a':1},np.nan,'[1]']
+        ,'num_text' :[1,np.nan,'x']
+    })
+    schema = [('s','string'),('g','guid'),('b','bool'),('b_empty','bool'),('n','long'),('r','real'),('ts','datetime'),('d','dynamic'),('num_text','string')]
+    out = coerce_frame_to_schema(df,schema)
+    assert out['s'].tolist() == ['a',None,'c']
+    assert out['g'].tolist() == ['6f1c0b5e-0000-4000-8000-000000000000',None,None]
+    assert out['b'].tolist() == [True,pd.NA,False]
+    assert out['b_empty'].tolist() == [True,pd.NA,pd.NA]
+    assert str(out['b'].dtype) == 'boolean'
+    assert out['n'].tolist() == [1,pd.NA,3]
+    assert out['r'].isna().tolist() == [False,True,True]
+    assert out['ts'].isna().tolist() == [False,True,False]
+    assert out['d'].tolist() == ['{"a": 1}',None,'[1]']
+    assert out['num_text'].tolist() == ['1',None,'x']
+    # missing values are written as empty csv fields, not as text
+    csv_text = out[['s','b']].to_csv(index=False,header=False)
+    assert 'nan' not in csv_text.lower() and 'False\n,\n' not in csv_text
+
+def test_coerce_leaves_typed_columns_alone():
+    df = pd.DataFrame({'i':[1,2],'f':[1.0,np.nan]})
+    assert coerce_frame_to_schema(df,[('i','string'),('f','string')]) is df
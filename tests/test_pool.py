@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from azdsdr.readers import pool as pool_module
+from azdsdr.readers.pool import ConnectionPool
+
+class FakeCursor:
+    def __init__(self,connection) -> None:
+        self.connection = connection
+
+    def execute(self,sql_query):
+        self.connection.queries.append(sql_query)
+        if not self.connection.alive:
+            raise Exception('connection is broken')
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self,index) -> None:
+        self.index      = index
+        self.alive      = True
+        self.closed     = False
+        self.queries    = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+class FakeFactory:
+    '''
+    Connection factory raising for the first `failures` calls
+    '''
+    def __init__(self,failures=0) -> None:
+        self.failures       = failures
+        self.calls          = 0
+        self.connections    = []
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise Exception('connect failed')
+        conn = FakeConnection(len(self.connections))
+        self.connections.append(conn)
+        return conn
+
+def test_connections_are_bounded_and_reused():
+    factory     = FakeFactory()
+    pool        = ConnectionPool(factory,max_size=2)
+    lock        = threading.Lock()
+    in_use      = []
+    peak        = []
+
+    def borrow():
+        with pool.connection() as conn:
+            with lock:
+                in_use.append(conn)
+                peak.append(len(in_use))
+            time.sleep(0.05)
+            with lock:
+                in_use.remove(conn)
+
+    threads = [threading.Thread(target=borrow) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) == 2
+    assert len(factory.connections) == 2
+
+def test_recently_used_connection_is_not_checked():
+    factory = FakeFactory()
+    pool    = ConnectionPool(factory,health_check_idle_sec=60)
+    with pool.connection() as conn:
+        pass
+    with pool.connection() as again:
+        assert again is conn
+    assert conn.queries == []
+
+def test_idle_connection_is_checked_and_replaced_when_broken():
+    factory = FakeFactory()
+    pool    = ConnectionPool(factory,health_check_idle_sec=0,health_check_sql='SELECT 42')
+    with pool.connection() as conn:
+        pass
+    with pool.connection() as again:
+        assert again is conn
+    assert conn.queries == ['SELECT 42']
+
+    conn.alive = False
+    with pool.connection() as replaced:
+        assert replaced is not conn
+    assert conn.closed
+    assert len(factory.connections) == 2
+
+def test_broken_connection_is_discarded_after_an_error():
+    factory = FakeFactory()
+    pool    = ConnectionPool(factory,health_check_idle_sec=60)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            conn.alive = False
+            raise ValueError('query failed')
+    assert conn.closed
+    with pool.connection() as again:
+        assert again is not conn
+
+def test_reconnect_backs_off(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(pool_module.time,'sleep',sleeps.append)
+    factory = FakeFactory(failures=2)
+    pool    = ConnectionPool(factory,reconnect_times=3)
+    with pool.connection() as conn:
+        assert conn is factory.connections[0]
+    assert sleeps == [1,2]
+
+def test_reconnect_gives_up(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(pool_module.time,'sleep',sleeps.append)
+    pool = ConnectionPool(FakeFactory(failures=5),reconnect_times=3)
+    with pytest.raises(Exception,match='connect failed'):
+        with pool.connection():
+            pass
+    assert sleeps == [1,2]
+    # the slot is released when the connect fails
+    assert pool._slots.acquire(blocking=False)
+
+def test_close():
+    factory = FakeFactory()
+    pool    = ConnectionPool(factory)
+    with pool.connection() as in_use:
+        with pool.connection() as idle:
+            pass
+        pool.close()
+        assert idle.closed and not in_use.closed
+    assert in_use.closed
+    with pytest.raises(Exception,match='closed'):
+        with pool.connection():
+            pass
@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+from azdsdr.readers.scheduler import throttling_info
+
+def http_response(status,headers=None,body=b''):
+    import requests
+    response = requests.Response()
+    response.status_code    = status
+    response.reason         = 'reason'
+    response._content       = body
+    response.headers.update(headers or {})
+    return response
+
+def kusto_api_error(status,code='General_BadRequest',message='Request is invalid',error_type='Kusto.Data.Exceptions.SemanticException',headers=None):
+    from azure.kusto.data.exceptions import KustoApiError
+    error_dict = {'error':{'code':code,'message':message,'@type':error_type,'@message':message,'@permanent':True}}
+    return KustoApiError(error_dict,http_response=http_response(status,headers))
+
+def storage_error(status,error_code,headers=None):
+    from azure.core.exceptions import HttpResponseError
+    from azure.core.pipeline.transport import RequestsTransportResponse,HttpRequest
+    from azure.storage.blob._shared.response_handlers import process_storage_error
+    response = RequestsTransportResponse(
+        HttpRequest('GET','https://account.blob.core.windows.net/c/b')
+        ,http_response(status,{'x-ms-error-code':error_code,**(headers or {})})
+    )
+    try:
+        process_storage_error(HttpResponseError(response=response))
+    except HttpResponseError as err:
+        return err
+
+def test_kusto_throttling_error_with_retry_after():
+    from azure.kusto.data.exceptions import KustoThrottlingError
+    # raised by the Kusto client for http 429, with the response as second argument
+    error = KustoThrottlingError('The request was throttled by the server.',http_response(429,{'Retry-After':'7'}))
+    assert throttling_info(error) == (True,7.0)
+
+def test_kusto_service_errors():
+    assert throttling_info(kusto_api_error(503,code='ServiceUnavailable',message='Service is unavailable')) == (True,None)
+    assert throttling_info(kusto_api_error(400,code='TooManyRequests'))[0]
+    assert throttling_info(kusto_api_error(400,error_type='Kusto.DataNode.Exceptions.KustoRequestThrottledException'))[0]
+    # a semantic error about a throttle column is not throttling
+    error = kusto_api_error(400,message="Failed to resolve scalar expression named 'throttle_503'")
+    assert throttling_info(error) == (False,None)
+
+def test_azure_storage_errors():
+    pytest.importorskip('azure.storage.blob')
+    assert throttling_info(storage_error(503,'ServerBusy',{'Retry-After':'5'})) == (True,5.0)
+    assert throttling_info(storage_error(500,'ServerBusy'))[0]
+    assert throttling_info(storage_error(404,'BlobNotFound')) == (False,None)
+
+def test_aiohttp_response_error():
+    aiohttp = pytest.importorskip('aiohttp')
+    error = aiohttp.ClientResponseError(None,(),status=429,message='Too Many Requests',headers={'Retry-After':'3'})
+    assert throttling_info(error) == (True,3.0)
+
+def test_http_date_retry_after():
+    from email.utils import formatdate
+    from azure.kusto.data.exceptions import KustoThrottlingError
+    error = KustoThrottlingError('throttled',http_response(429,{'Retry-After':formatdate(time.time() + 60,usegmt=True)}))
+    throttled,retry_after = throttling_info(error)
+    assert throttled
+    assert 55 < retry_after <= 60
+
+def test_known_messages():
+    # odbc errors only carry a message
+    assert throttling_info(Exception('HY000','[Dremio][Connector] Query queue is full'))[0]
+    assert throttling_info(Exception('The request was throttled by the server.'))[0]
+    assert throttling_info(Exception('Too Many Requests'))[0]
+
+def test_unrelated_errors_mentioning_codes():
+    for message in [
+        'Query returned 503 rows'
+        ,'record 429 not found'
+        ,"column 'throttled_requests' does not exist"
+        ,'throttling policy of table T is invalid'
+    ]:
+        assert throttling_info(Exception(message)) == (False,None),message
+    assert throttling_info(kusto_api_error(400,message='Partition 503 failed to parse')) == (False,None)
+
+def test_bare_retry_later_is_not_throttling():
+    assert throttling_info(Exception('column retry_later_count not found, please retry later')) == (False,None)
+
+class Throttled(Exception):
+    def __init__(self,retry_after=None) -> None:
+        super().__init__('Too Many Requests')
+        self.status_code    = 429
+        self.headers        = {'Retry-After':str(retry_after)} if retry_after is not None else {}
+
+def test_retry_after_is_capped(monkeypatch):
+    from azdsdr.readers import scheduler as scheduler_module
+    from azdsdr.readers.scheduler import AdaptiveScheduler
+    sleeps = []
+    monkeypatch.setattr(scheduler_module.time,'sleep',sleeps.append)
+    scheduler   = AdaptiveScheduler(max_backoff_sec=0.05)
+    calls       = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise Throttled(retry_after=86400)
+        return 'done'
+
+    start = time.monotonic()
+    assert scheduler.run('cluster',fn) == 'done'
+    # the pause of the backend is capped too
+    assert time.monotonic() - start < 5
+    assert sleeps == [0.05]
+
+def test_non_idempotent_call_is_not_retried(monkeypatch):
+    from azdsdr.readers import scheduler as scheduler_module
+    from azdsdr.readers.scheduler import AdaptiveScheduler
+    sleeps = []
+    monkeypatch.setattr(scheduler_module.time,'sleep',sleeps.append)
+    scheduler   = AdaptiveScheduler(initial_limit=8)
+    calls       = []
+
+    def fn():
+        calls.append(1)
+        raise Throttled()
+
+    with pytest.raises(Throttled):
+        scheduler.run('ingest',fn,idempotent=False)
+    assert calls == [1]
+    assert sleeps == []
+    stats = scheduler.stats()['ingest']
+    assert stats['limit'] == 4
+    assert (stats['throttled'],stats['retries'],stats['failed']) == (1,0,1)
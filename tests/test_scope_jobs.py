@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+
+from azdsdr.readers.scope_jobs import ScopeJobError,parse_job_id,parse_job_state
+
+pytestmark = pytest.mark.skipif(os.name == 'nt',reason='the fake scope.exe is a posix script')
+
+fake_scope_exe = '''#!{python}
+import json,sys,time,uuid
+from pathlib import Path
+jobs_dir = Path({jobs_dir!r})
+with open(jobs_dir / 'calls.log','a') as f:
+    f.write(f'{{time.monotonic()}} {{sys.argv[1]}}\\n')
+if sys.argv[1] == 'submit':
+    # the json of `write_script`, after the #DECLARE lines of a scope query
+    script = json.loads(Path(sys.argv[3]).read_text().splitlines()[-1])
+    if script.get('submit') == 'fail':
+        print(f'Compile error, correlation id {{uuid.uuid4()}}')
+        sys.exit(1)
+    job_id = str(uuid.uuid4())
+    (jobs_dir / f'{{job_id}}.json').write_text(json.dumps({{'states':script['states'],'polls':0}}))
+    print(f'Job ID: {{job_id}}')
+elif sys.argv[1] == 'delete':
+    with open(jobs_dir / 'deleted.log','a') as f:
+        f.write(sys.argv[2] + '\\n')
+elif sys.argv[1] == 'jobstatus':
+    job_file    = jobs_dir / f'{{sys.argv[2]}}.json'
+    job         = json.loads(job_file.read_text())
+    state       = job['states'][min(job['polls'],len(job['states']) - 1)]
+    job['polls'] += 1
+    job_file.write_text(json.dumps(job))
+    print('no status available' if state == '?' else f'Job State: {{state}}')
+'''
+
+@pytest.fixture
+def cosmos_reader(tmp_path):
+    from azdsdr.readers import CosmosReader
+    exe_path = tmp_path / 'scope'
+    exe_path.write_text(fake_scope_exe.format(python=sys.executable,jobs_dir=str(tmp_path)))
+    exe_path.chmod(0o755)
+    return CosmosReader(scope_exe_path=str(exe_path),client_account='me@example.com',vc_path='vc://cosmos/vc')
+
+def write_script(tmp_path,name,states=(),submit='ok') -> str:
+    path = tmp_path / f'{name}.script'
+    path.write_text(json.dumps({'states':list(states),'submit':submit}))
+    return str(path)
+
+def calls(tmp_path) -> list:
+    lines = (tmp_path / 'calls.log').read_text().split('\n')
+    return [(float(t),cmd) for t,cmd in (line.split() for line in lines if line)]
+
+def test_jobs_reach_their_final_states(cosmos_reader,tmp_path):
+    scripts = [
+        write_script(tmp_path,'ok',['Queued','Running','CompletedSuccess'])
+        ,write_script(tmp_path,'failed',['Running','CompletedFailure'])
+        ,write_script(tmp_path,'bad',submit='fail')
+    ]
+    finished = []
+
+    async def main():
+        manager = cosmos_reader.job_manager(min_poll_sec=0.05,max_poll_sec=0.2)
+        jobs    = await manager.run_scripts(scripts,callback=finished.append)
+        return jobs,await manager.wait(jobs)
+
+    jobs,results = asyncio.run(main())
+    assert [job.state for job in jobs] == ['CompletedSuccess','CompletedFailure','SubmitFailed']
+    assert jobs[0].succeeded and results[0] is jobs[0]
+    assert isinstance(results[1],ScopeJobError) and results[1].job is jobs[1]
+    # the GUID of a failed submit is not taken as a job id
+    assert jobs[2].job_id is None
+    assert sorted(job.script_path for job in finished) == sorted(scripts)
+    assert all(job.finished_at is not None for job in jobs)
+
+def test_run_scope_many(cosmos_reader,tmp_path):
+    scripts = [write_script(tmp_path,f's{i}',['Running','CompletedSuccess']) for i in range(4)]
+    jobs    = cosmos_reader.run_scope_many(scripts,min_poll_sec=0.05,max_poll_sec=0.1)
+    assert [job.state for job in jobs] == ['CompletedSuccess'] * 4
+    # one polling round asks for the status of every live job
+    assert sum(cmd == 'jobstatus' for _,cmd in calls(tmp_path)) < 4 * 4
+
+def test_unparseable_status_fails_the_job(cosmos_reader,tmp_path):
+    script = write_script(tmp_path,'unknown',['Queued','?'])
+
+    async def main():
+        manager = cosmos_reader.job_manager(min_poll_sec=0.02,max_poll_sec=0.05,max_unknown_polls=3)
+        job     = await manager.submit(script)
+        with pytest.raises(ScopeJobError,match='no known state'):
+            await job
+        return job
+
+    job = asyncio.run(main())
+    assert job.state == 'Queued'
+    assert job.unknown_polls == 3
+
+def test_timeout(cosmos_reader,tmp_path):
+    script = write_script(tmp_path,'slow',['Running'])
+
+    async def main():
+        manager = cosmos_reader.job_manager(min_poll_sec=0.02,max_poll_sec=0.05,timeout_sec=0.3)
+        job     = await manager.submit(script)
+        with pytest.raises(ScopeJobError,match='timed out as Running'):
+            await job
+
+    asyncio.run(main())
+
+def test_submissions_do_not_starve_polling(cosmos_reader,tmp_path):
+    scripts = [write_script(tmp_path,f's{i}',['Running','CompletedSuccess']) for i in range(12)]
+
+    async def main():
+        # every submission wakes the loop sooner than `min_poll_sec`
+        manager = cosmos_reader.job_manager(min_poll_sec=0.3,max_poll_sec=0.4)
+        for script in scripts:
+            await manager.submit(script)
+            await asyncio.sleep(0.05)
+        submitted_at = time.monotonic()
+        await manager.wait()
+        return submitted_at
+
+    submitted_at = asyncio.run(main())
+    first_poll = min(t for t,cmd in calls(tmp_path) if cmd == 'jobstatus')
+    assert first_poll < submitted_at
+
+def test_parse_job_id():
+    job_id = str(uuid.uuid4())
+    other  = str(uuid.uuid4())
+    assert parse_job_id(f'Job ID: {job_id}') == job_id
+    assert parse_job_id(f'correlation {other}\nOperation Id = {job_id}') == job_id
+    # an unlabeled GUID is only trusted from a successful submit
+    assert parse_job_id(f'submitted {job_id}',returncode=0) == job_id
+    assert parse_job_id(f'failed, correlation {other}',returncode=1) is None
+    assert parse_job_id(f'failed, correlation {other}') is None
+    assert parse_job_state('Job State: Running') == 'Running'
+    assert parse_job_state('no status available') is None
+
+def test_check_job_status(cosmos_reader,tmp_path):
+    output = cosmos_reader.run_scope(write_script(tmp_path,'ok',['Queued','CompletedSuccess']))
+    assert isinstance(output,subprocess.CompletedProcess)
+    assert cosmos_reader.check_job_status(output,check_gap_min=0.0005) == 'CompletedSuccess'
+    output = cosmos_reader.run_scope(write_script(tmp_path,'unknown',['?']))
+    with pytest.raises(ScopeJobError,match='no known state'):
+        cosmos_reader.check_job_status(output,check_gap_min=0.0005,max_unknown_checks=2)
+    output = cosmos_reader.run_scope(write_script(tmp_path,'bad',submit='fail'))
+    with pytest.raises(ScopeJobError,match='return code 1'):
+        cosmos_reader.check_job_status(output,check_gap_min=0.0005)
+
+def test_check_job_status_of_submit_text(cosmos_reader,tmp_path):
+    output = cosmos_reader.run_scope(write_script(tmp_path,'ok',['CompletedSuccess']))
+    # the job id is read from the decoded stdout, not from the repr of the process
+    assert cosmos_reader.check_job_status(output.stdout.decode(),check_gap_min=0.0005) == 'CompletedSuccess'
+    with pytest.raises(ScopeJobError,match='no job id'):
+        cosmos_reader.check_job_status(f'submitted {uuid.uuid4()}',check_gap_min=0.0005)
+
+def job_script(states=(),submit='ok') -> str:
+    return json.dumps({'states':list(states),'submit':submit})
+
+def deleted(tmp_path) -> list:
+    deleted_log = tmp_path / 'deleted.log'
+    return deleted_log.read_text().split() if deleted_log.exists() else []
+
+@pytest.fixture
+def query_reader(cosmos_reader,tmp_path,monkeypatch):
+    '''
+    A reader whose job polls do not wait and whose downloads write a one row csv holding the stream path
+    '''
+    from azdsdr.readers import cosmos
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cosmos.time,'sleep',lambda sec: None)
+    cosmos_reader.downloads = []
+    def download_file_as_csv(source_file_path,target_file_path):
+        cosmos_reader.downloads.append(source_file_path)
+        with open(target_file_path,'w') as f:
+            f.write(f'stream,value\n{source_file_path},1\n')
+    cosmos_reader.download_file_as_csv = download_file_as_csv
+    return cosmos_reader
+
+def test_scope_query_outputs(query_reader,tmp_path):
+    dfs = query_reader.scope_query_outputs(job_script(['Running','CompletedSuccess']),['daily','by_market'],temp_data_path='/users/me/tmp')
+    assert list(dfs) == ['daily','by_market']
+    assert dfs['by_market']['stream'][0].endswith('_by_market.ss')
+    assert sorted(deleted(tmp_path)) == sorted('vc://cosmos/vc' + path for path in query_reader.downloads)
+    assert len(query_reader.downloads) == 2
+    # no temp script or csv file is left
+    assert not list(tmp_path.glob('execution_temp_*')) and not list(tmp_path.glob('temp_query_data_*'))
+
+def test_scope_query_outputs_to_parquet(query_reader,tmp_path):
+    row_cnts = query_reader.scope_query_outputs(job_script(['CompletedSuccess']),['a','b'],local_dir=str(tmp_path),output='parquet')
+    assert row_cnts == {'a':1,'b':1}
+    assert (tmp_path / 'a.parquet').exists() and (tmp_path / 'b.parquet').exists()
+    assert len(deleted(tmp_path)) == 2
+
+def test_scope_query_outputs_failed_job_deletes_the_streams(query_reader,tmp_path):
+    with pytest.raises(ScopeJobError,match='CompletedFailure'):
+        query_reader.scope_query_outputs(job_script(['Running','CompletedFailure']),['a','b'])
+    assert query_reader.downloads == []
+    assert len(deleted(tmp_path)) == 2
+    assert not list(tmp_path.glob('execution_temp_*'))
+
+def test_scope_query_failed_job_deletes_the_stream(query_reader,tmp_path):
+    with pytest.raises(ScopeJobError,match='CompletedFailure'):
+        query_reader.scope_query(job_script(['CompletedFailure']),temp_query_data=str(tmp_path / 'out.csv'))
+    assert len(deleted(tmp_path)) == 1
+    assert not (tmp_path / 'out.csv').exists()
+
+def test_scope_query(query_reader,tmp_path):
+    df = query_reader.scope_query(job_script(['CompletedSuccess']),temp_query_data=str(tmp_path / 'out.csv'))
+    assert df['stream'].tolist() == query_reader.downloads
+    assert deleted(tmp_path) == ['vc://cosmos/vc' + query_reader.downloads[0]]
+    assert not (tmp_path / 'out.csv').exists()